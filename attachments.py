@@ -0,0 +1,105 @@
+"""Files attached to a block by reference (/attach). The content stays on disk:
+the UI shows a short preview, and the text is read through mmap only when
+tokens are counted or the prompt is exported."""
+import codecs
+import mmap
+import os
+from contextlib import contextmanager
+
+PREVIEW_CHARS = 2000
+PREVIEW_LINES = 30
+CHUNK_BYTES = 1 << 20
+_WHITESPACE = b" \t\n\r\x0b\x0c"
+
+
+class Attachment:
+    __slots__ = ("path", "size", "mtime", "_preview")
+
+    def __init__(self, path):
+        self.path = os.path.abspath(os.path.expanduser(path))
+        st = os.stat(self.path)  # FileNotFoundError / PermissionError go to the caller
+        if not os.path.isfile(self.path):
+            raise IsADirectoryError(self.path)
+        self.size = st.st_size
+        self.mtime = st.st_mtime
+        self._preview = None
+
+    @property
+    def name(self):
+        return os.path.basename(self.path)
+
+    @contextmanager
+    def view(self):
+        """Read-only mmap of the file (an empty bytes object for empty files)"""
+        with open(self.path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                yield b""
+                return
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                yield mm
+            finally:
+                mm.close()
+
+    def preview(self):
+        """Header line plus the start of the file, for display only (read once)"""
+        if self._preview is None:
+            with open(self.path, "rb") as f:
+                head = f.read(PREVIEW_CHARS * 4)
+            text = codecs.getincrementaldecoder("utf-8")("replace").decode(head)
+            lines = text[:PREVIEW_CHARS].splitlines()
+            shown = "\n".join(lines[:PREVIEW_LINES])
+            header = f"[ATTACHED {self.name} // {format_size(self.size)}]"
+            if len(head) < self.size or len(text) > PREVIEW_CHARS or len(lines) > PREVIEW_LINES:
+                shown += "\n... [preview truncated]"
+            self._preview = f"{header}\n{shown}"
+        return self._preview
+
+    @property
+    def preview_lines(self):
+        return self.preview().count("\n") + 1
+
+    def iter_text(self, chunk_bytes=CHUNK_BYTES, strip=False):
+        """Decoded text in chunks that end on a line break where possible.
+        strip=True drops leading/trailing whitespace, like str.strip() for ASCII space."""
+        decoder = codecs.getincrementaldecoder("utf-8")("replace")
+        with self.view() as mm:
+            start, end = 0, len(mm)
+            if strip:
+                while start < end and mm[start] in _WHITESPACE:
+                    start += 1
+                while end > start and mm[end - 1] in _WHITESPACE:
+                    end -= 1
+            carry = ""
+            for offset in range(start, end, chunk_bytes):
+                text = carry + decoder.decode(mm[offset:min(offset + chunk_bytes, end)])
+                cut = text.rfind("\n") + 1
+                if cut:
+                    yield text[:cut]
+                    carry = text[cut:]
+                else:
+                    carry = text
+            carry += decoder.decode(b"", final=True)
+            if carry:
+                yield carry
+
+    def count_tokens(self, tokenizer, on_progress=None, keep_going=None):
+        """Counts chunk by chunk. on_progress(count so far) after each chunk;
+        returns None if keep_going() turns false first."""
+        total = 0
+        for chunk in self.iter_text():
+            if keep_going is not None and not keep_going():
+                return None
+            total += tokenizer.count(chunk)
+            if on_progress is not None:
+                on_progress(total)
+        return total
+
+
+def format_size(size):
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
@@ -0,0 +1,104 @@
+"""/attach with a big log: what the UI pays vs what export pays. No Flet needed.
+
+- attach: opening the file and reading the preview the block shows
+- count: chunked token count over the mmap (heuristic and BPE tokenizers)
+- export: streaming the prompt to a file with PromptDocument.write_to,
+  with the peak Python memory it needed
+- compile: the same prompt joined into one string, as COPY does
+
+The streamed output is checked against render_fragment on the whole text.
+
+Run from the repo root:  python benchmarks/bench_attach.py [size in MB, default 50]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from attachments import Attachment  # noqa: E402
+from prompt_compiler import render_fragment  # noqa: E402
+from prompt_document import PromptDocument  # noqa: E402
+from token_counter import HeuristicTokenizer, load_tokenizer  # noqa: E402
+
+LINE = "2024-05-01T12:00:{:02d}Z worker-{} INFO request {} served in {} ms <ok> & done\n"
+
+
+def ms_since(start):
+    return (time.perf_counter() - start) * 1000
+
+
+def write_log(path, size_mb):
+    target = size_mb * 1024 * 1024
+    written = 0
+    i = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n  \n")  # leading blank lines, which the export strips
+        while written < target:
+            chunk = "".join(LINE.format(j % 60, j % 8, j, j % 997) for j in range(i, i + 10000))
+            f.write(chunk)
+            written += len(chunk)
+            i += 10000
+        f.write("tail line without newline é")
+
+
+def build(attachment, escape):
+    document = PromptDocument(escape=escape)
+    document.add("ROLE", 1, "You are a log analyst.")
+    document.add("CONTEXT", 1, attachment=attachment)
+    document.add("TASK", 2, "Find the slowest requests.")
+    return document
+
+
+def main():
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    with tempfile.TemporaryDirectory() as root:
+        log = os.path.join(root, "app.log")
+        write_log(log, size_mb)
+
+        start = time.perf_counter()
+        attachment = Attachment(log)
+        attachment.preview()
+        print(f"attach + preview ({size_mb} MB): {ms_since(start):.2f} ms, "
+              f"{attachment.preview_lines} preview lines")
+
+        for name, tokenizer in (("heuristic", HeuristicTokenizer()), ("bpe", load_tokenizer())):
+            if name == "bpe" and isinstance(tokenizer, HeuristicTokenizer):
+                print("count bpe: skipped, no vocab file")
+                continue
+            chunks = []
+            start = time.perf_counter()
+            total = attachment.count_tokens(tokenizer, on_progress=chunks.append)
+            print(f"count {name}: {ms_since(start):.0f} ms, {total} tokens in {len(chunks)} chunks")
+
+        for escape in (False, True):
+            document = build(attachment, escape)
+            out = os.path.join(root, "prompt.xml")
+            start = time.perf_counter()
+            with open(out, "w", encoding="utf-8") as f:
+                document.write_to(f)
+            export_ms = ms_since(start)
+            tracemalloc.start()  # separate run: tracing slows the export several times over
+            with open(out, "w", encoding="utf-8") as f:
+                document.write_to(f)
+            peak_mb = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+            tracemalloc.stop()
+
+            start = time.perf_counter()
+            compiled = document.compile()
+            compile_ms = ms_since(start)
+
+            with open(log, encoding="utf-8") as f:
+                expected = render_fragment("context", f.read(), 0, escape)
+            with open(out, encoding="utf-8") as f:
+                exported = f.read()
+            assert exported == compiled
+            assert expected in exported, "streamed fragment differs from render_fragment"
+            print(f"export escape={escape}: {export_ms:.0f} ms, peak {peak_mb:.1f} MB traced; "
+                  f"compile to string: {compile_ms:.0f} ms ({len(compiled) / 1024 / 1024:.0f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Context caching of a stable prompt prefix, against the stub's fake caching API.
+
+Builds a prompt with a large ROLE/CONTEXT/CONSTRAINTS prefix and CALLS different
+TASKs, then sends them once as full prompts and once with the prefix going
+through llm_context_cache. The stub charges TOKEN_DELAY per input token it has
+to process, so only the uncached part costs time. Last, a /run-style evaluation
+grid over one document, checked to be served from the cached prefix.
+Needs google-genai installed.
+
+Run from the repo root:  python benchmarks/bench_context_cache.py
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import llm_response  # noqa: E402
+import prompt_eval  # noqa: E402
+from llm_context_cache import split_prompt  # noqa: E402
+from llm_stub import StubBackend  # noqa: E402
+from prompt_document import PromptDocument  # noqa: E402
+
+CALLS = 30
+TOKEN_DELAY = 0.00002  # 20 ms per 1,000 input tokens
+CONTEXT = "2024-05-01 12:00:00 worker-3 INFO request served in 41 ms\n" * 3000
+
+
+def build(task):
+    document = PromptDocument()
+    document.add("ROLE", 1, "You are a site reliability engineer reviewing production logs.")
+    document.add("CONTEXT", 1, CONTEXT)
+    document.add("CONSTRAINTS", 1, "Cite log lines.\nNo speculation.")
+    document.add("TASK", 1, task)
+    return document
+
+
+def run(label, calls):
+    latencies = []
+    for call in calls:
+        start = time.perf_counter()
+        call()
+        latencies.append((time.perf_counter() - start) * 1000)
+    print(f"{label:<14} p50 {statistics.median(latencies):>7.1f} ms  first {latencies[0]:>7.1f} ms  "
+          f"total {sum(latencies):>8.0f} ms")
+
+
+def main():
+    tasks = [f"Find the slowest request in window {i}." for i in range(CALLS)]
+    documents = [build(task) for task in tasks]
+    with StubBackend(token_delay=TOKEN_DELAY) as stub:
+        llm_response.configure(api_key="stub", base_url=stub.url, timeout=30)
+        prefix, _ = split_prompt(documents[0].blocks)
+        print(f"{CALLS} calls, prefix ~{len(prefix) // 4:,} tokens, suffix ~{len(tasks[0]) // 4 + 5} tokens")
+
+        run("full prompt", [lambda d=d: llm_response.get_response(d.compile(), use_cache=False, hedge=False)
+                            for d in documents])
+
+        def cached_call(document):
+            prefix, suffix = split_prompt(document.blocks)
+            return llm_response.get_response(suffix, use_cache=False, hedge=False, prefix=prefix)
+        run("cached prefix", [lambda d=d: cached_call(d) for d in documents])
+
+        print(llm_response.context_cache.stats.report())
+
+        stats = llm_response.context_cache.stats
+        hits = stats.hits
+        prefix, suffix = split_prompt(documents[0].blocks)
+        grid = prompt_eval.build_grid([llm_response.MODEL], [0.0, 0.5, 1.0], [0.9, 1.0])
+        started = time.perf_counter()
+        rows = asyncio.run(prompt_eval.evaluate(suffix, grid, 6, rate=0, use_cache=False, hedge=False,
+                                                prefix=prefix))
+        print(f"grid           {prompt_eval.summary(rows, time.perf_counter() - started)}, "
+              f"{stats.hits - hits} prefix hits")
+        print(f"stub: {stub.caches_created} cache(s) created, {len(stub.caches)} live")
+    sys.exit(0 if stats.hits - hits == len(grid) else 1)
+
+
+if __name__ == "__main__":
+    main()
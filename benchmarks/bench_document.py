@@ -0,0 +1,153 @@
+"""Headless PromptDocument benchmarks, 10 to 10,000 blocks. No Flet needed.
+
+Per workspace size, times building the document, counting tokens (full and after
+one edit), compiling the XML (cold and after one edit), inserting a snippet and
+the structural edits (delete, move, indent).
+
+Run from the repo root:
+    python benchmarks/bench_document.py                       # print the table
+    python benchmarks/bench_document.py --save base.json      # record a baseline
+    python benchmarks/bench_document.py --compare base.json   # exit 1 on a regression
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prompt_document import PromptDocument  # noqa: E402
+from token_counter import TokenCounter, load_tokenizer  # noqa: E402
+
+SIZES = [10, 100, 1000, 10000]
+TAGS = ["ROLE", "CONTEXT", "TASK", "CONSTRAINTS", "OUTPUT", "FORMAT", "EXAMPLES"]
+SNIPPET = "Always answer in valid JSON.\nNever invent fields.\n" * 20
+
+# A case counts as a regression when it is this much slower than the baseline,
+# and by more than the noise floor
+REGRESSION_RATIO = 1.5
+NOISE_FLOOR_MS = 0.05
+
+
+def text_for(i):
+    return f"Block {i} explains part {i % 17} of the task in some detail.\n" * (1 + i % 4)
+
+
+def build(n):
+    document = PromptDocument()
+    for i in range(n):
+        document.add(TAGS[i % len(TAGS)], 1 + i % 3, text_for(i))
+    return document
+
+
+def timed(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def wait_for_total(counter, action):
+    """Runs action and waits until the counter's worker reports a new total"""
+    done = threading.Event()
+    counter.on_total = lambda total: done.set()
+    action()
+    done.wait(30)
+
+
+def run_size(n, tokenizer):
+    results = {}
+    results["build"] = timed(lambda: build(n), repeat=3)
+    document = build(n)
+    blocks = document.blocks
+    middle = blocks[n // 2]
+
+    counter = TokenCounter(on_total=lambda total: None, tokenizer=tokenizer)
+
+    def count_all():
+        counter.clear()
+        wait_for_total(counter, lambda: [counter.update(b, b.text) for b in document.blocks])
+    results["tokens_full"] = timed(count_all, repeat=3)
+
+    edits = iter(range(10 ** 9))
+
+    def count_one_edit():
+        document.set_text(middle, f"edited {next(edits)}\n" + middle.text)
+        wait_for_total(counter, lambda: counter.update(middle, middle.text))
+    results["tokens_edit"] = timed(count_one_edit)
+
+    def compile_cold():
+        document.compiler.invalidate()
+        document.compile()
+    results["xml_cold"] = timed(compile_cold, repeat=3)
+
+    def compile_after_edit():
+        document.set_text(middle, f"edited {next(edits)}\n" + middle.text)
+        document.compile()
+    document.compile()
+    results["xml_edit"] = timed(compile_after_edit)
+
+    def insert_snippet():
+        # What the picker does: the snippet goes onto the end of the focused block
+        original = middle.text
+        document.insert_snippet(middle, SNIPPET)
+        document.compile()
+        document.set_text(middle, original)
+    results["snippet_insert"] = timed(insert_snippet)
+
+    def delete_and_append():
+        block = document.blocks[n // 3]
+        document.delete(block)
+        document.append(block)
+        document.blocks  # the view re-reads the order after a structural edit
+    results["delete"] = timed(delete_and_append)
+
+    results["move"] = timed(lambda: document.move(middle, 0))
+    results["indent"] = timed(lambda: document.indent(middle, 1 + (middle.indent_level % 3)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    args = parser.parse_args()
+
+    tokenizer = load_tokenizer()
+    print(f"tokenizer: {type(tokenizer).__name__}")
+    all_results = {}
+    columns = None
+    for n in SIZES:
+        results = run_size(n, tokenizer)
+        all_results[str(n)] = results
+        if columns is None:
+            columns = list(results)
+            print(f"{'blocks':>7} " + " ".join(f"{c:>14}" for c in columns) + "   (ms)")
+        print(f"{n:>7} " + " ".join(f"{results[c]:>14.3f}" for c in columns))
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(all_results, f, indent=2)
+        print(f"saved -> {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = []
+        for size, results in all_results.items():
+            for case, ms in results.items():
+                before = baseline.get(size, {}).get(case)
+                if before and ms > before * REGRESSION_RATIO and ms - before > NOISE_FLOOR_MS:
+                    regressions.append(f"{case} @ {size} blocks: {before:.3f} -> {ms:.3f} ms")
+        if regressions:
+            print("REGRESSIONS:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print("no regressions against " + args.compare)
+
+
+if __name__ == "__main__":
+    main()
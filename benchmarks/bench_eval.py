@@ -0,0 +1,92 @@
+"""Evaluation-grid throughput against the stub, by concurrency.
+
+Runs a 3 models x 4 temperatures x 3 top_p grid (36 calls) with the stub
+taking DELAY per call, with no rate limit so only --concurrency bounds it.
+The stub counts requests in flight, to check the bound holds; the response
+cache and hedging are off so every cell is exactly one request. Needs
+google-genai installed; no network access.
+
+Run from the repo root:  python benchmarks/bench_eval.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import llm_response  # noqa: E402
+import prompt_eval  # noqa: E402
+from llm_cache import ResponseCache  # noqa: E402
+from llm_stub import StubBackend  # noqa: E402
+from prompt_document import PromptDocument  # noqa: E402
+
+DELAY = 0.2
+MODELS = ["gemini-2.5-flash", "gemini-2.5-pro", "gemini-2.5-flash-lite"]
+TEMPERATURES = [0.0, 0.3, 0.7, 1.0]
+TOP_PS = [0.8, 0.9, 1.0]
+CONCURRENCY = [1, 4, 16, 36]
+
+
+class InFlight:
+    """Stub delay that tracks the most requests it has served at once"""
+
+    def __init__(self):
+        self.now = self.peak = self.total = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, body):
+        with self.lock:
+            self.now += 1
+            self.total += 1
+            self.peak = max(self.peak, self.now)
+        time.sleep(DELAY)
+        with self.lock:
+            self.now -= 1
+        return 0
+
+
+def main():
+    document = PromptDocument()
+    document.add("ROLE", 1, "You are a terse release-notes writer.")
+    document.add("TASK", 1, "Summarise the changes below in three bullets.")
+    document.add("CONTEXT", 1, "Fixed a crash on save.\nAdded /run.\nFaster imports.")
+    prompt = document.compile()
+    grid = prompt_eval.build_grid(MODELS, TEMPERATURES, TOP_PS)
+
+    ok = True
+    in_flight = InFlight()
+    with StubBackend(delay=in_flight) as stub:
+        llm_response.configure(api_key="stub", base_url=stub.url, timeout=30)
+        llm_response.get_response("warm up", use_cache=False, hedge=False)
+        print(f"{len(grid)} calls, stub {DELAY * 1000:.0f} ms per call")
+        for concurrency in CONCURRENCY:
+            in_flight.peak = 0
+            first = []
+            started = time.perf_counter()
+            rows = asyncio.run(prompt_eval.evaluate(
+                prompt, grid, concurrency, rate=0,
+                on_row=lambda row: first.append(time.perf_counter() - started) if not first else None,
+                use_cache=False, hedge=False))
+            elapsed = time.perf_counter() - started
+            print(f"concurrency {concurrency:>3}: {prompt_eval.summary(rows, elapsed)}, "
+                  f"first row {first[0] * 1000:.0f} ms, peak in flight {in_flight.peak}")
+            ok &= all(row["error"] is None and row["total_tokens"] for row in rows)
+            ok &= in_flight.peak <= concurrency
+
+        with tempfile.TemporaryDirectory() as tmp:
+            llm_response.response_cache = ResponseCache(path=os.path.join(tmp, "cache.sqlite3"))
+            for attempt in ("first", "repeat"):
+                sent = in_flight.total
+                started = time.perf_counter()
+                rows = asyncio.run(prompt_eval.evaluate(prompt, grid, 36, rate=0, hedge=False))
+                print(f"cached, {attempt:<6}: {prompt_eval.summary(rows, time.perf_counter() - started)}, "
+                      f"{in_flight.total - sent} requests sent")
+            ok &= all(row["cached"] for row in rows) and in_flight.total == sent
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
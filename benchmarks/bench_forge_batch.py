@@ -0,0 +1,66 @@
+"""Batch /forge throughput at different concurrency levels, against the local stub.
+
+Each stub call takes STUB_DELAY seconds, so sequential throughput is about
+1/STUB_DELAY req/s and the batch should scale close to linearly until the
+token bucket kicks in. The last rows add a rate limit, then 429s from the
+stub itself, so they go through get_response's hedging and circuit breaker
+before the batch backoff retries them: 20% of requests at random, then every
+request for QUOTA_OUTAGE seconds. Needs google-genai installed.
+
+Run from the repo root:  python benchmarks/bench_forge_batch.py
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import llm_batch  # noqa: E402
+import llm_response  # noqa: E402
+from llm_stub import StubBackend  # noqa: E402
+
+PROMPTS = 48
+STUB_DELAY = 0.1
+QUOTA_OUTAGE = 1.5  # seconds of nothing but 429s
+
+
+def run(label, archetypes, **kwargs):
+    order = []
+
+    async def forge_one(archetype):
+        return await llm_response.get_response_async(llm_response.forge_prompt(archetype), use_cache=False)
+
+    start = time.perf_counter()
+    results = asyncio.run(llm_batch.run_batch_async(archetypes, forge_one,
+                                                    on_result=lambda i, *_: order.append(i), **kwargs))
+    elapsed = time.perf_counter() - start
+    failed = sum(1 for _, error in results if error is not None)
+    in_order = order == list(range(len(archetypes)))
+    print(f"{label:<28} {elapsed:>7.2f} s {len(archetypes) / elapsed:>8.1f} req/s "
+          f"{failed:>3} failed  in order: {in_order}  breaker {llm_response.breaker.state}")
+    return failed
+
+
+def main():
+    archetypes = [f"archetype number {i}" for i in range(PROMPTS)]
+    failed = 0
+    with StubBackend(delay=STUB_DELAY) as stub:
+        llm_response.configure(api_key="stub", base_url=stub.url, timeout=10)
+        print(f"{PROMPTS} prompts, stub latency {STUB_DELAY * 1000:.0f} ms")
+        for concurrency in (1, 4, 16):
+            failed += run(f"concurrency {concurrency}", archetypes, concurrency=concurrency, rate=None)
+        failed += run("concurrency 16, 20 req/s", archetypes, concurrency=16, rate=20, burst=5)
+
+        stub.status = lambda body: 429 if random.random() < 0.2 else 200
+        failed += run("concurrency 16, 20% 429s", archetypes, concurrency=16, rate=None, backoff=0.05)
+
+        outage_ends = time.monotonic() + QUOTA_OUTAGE
+        stub.status = lambda body: 429 if time.monotonic() < outage_ends else 200
+        failed += run(f"concurrency 16, {QUOTA_OUTAGE:g} s of 429s", archetypes, concurrency=16, rate=None)
+    sys.exit(0 if failed == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
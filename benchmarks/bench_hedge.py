@@ -0,0 +1,81 @@
+"""Tail latency of get_response with and without hedging, against a delay-injecting stub.
+
+The stub answers in FAST seconds, except for SLOW_RATE of requests that stall for
+SLOW seconds. Without hedging those stalls show up as p99; with hedging a second
+request fires after the adaptive p95 delay and the first answer wins. Also shows
+the per-call deadline and the circuit breaker. Needs google-genai installed.
+
+Run from the repo root:  python benchmarks/bench_hedge.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import llm_response  # noqa: E402
+from llm_hedge import CircuitBreaker, CircuitOpenError  # noqa: E402
+from llm_stub import StubBackend  # noqa: E402
+
+CALLS = 200
+FAST = 0.03
+SLOW = 1.5
+SLOW_RATE = 0.05
+
+
+def injected_delay(body):
+    return SLOW if random.random() < SLOW_RATE else FAST
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run(label, stub, hedge):
+    stub.requests = 0
+    latencies, hedged = [], 0
+    for i in range(CALLS):
+        result = llm_response.get_response_result(f"prompt {i}", timeout=10, use_cache=False, hedge=hedge)
+        latencies.append(result.latency_ms)
+        hedged += result.hedged
+    print(f"{label:<12} p50 {percentile(latencies, 0.5):>7.1f} ms  p95 {percentile(latencies, 0.95):>7.1f} ms  "
+          f"p99 {percentile(latencies, 0.99):>7.1f} ms  max {max(latencies):>7.1f} ms  "
+          f"{hedged} hedged, {stub.requests} requests")
+
+
+def main():
+    random.seed(7)
+    with StubBackend(delay=injected_delay) as stub:
+        llm_response.configure(api_key="stub", base_url=stub.url, timeout=10)
+        print(f"{CALLS} calls, {SLOW_RATE:.0%} stall for {SLOW * 1000:.0f} ms")
+        run("no hedge", stub, hedge=False)
+        run("hedged", stub, hedge=True)
+        print(f"hedge delay settled at {llm_response.latency_tracker.hedge_delay() * 1000:.0f} ms")
+
+        stub.delay = 5.0
+        start = time.perf_counter()
+        try:
+            llm_response.get_response("stalled", timeout=0.5, use_cache=False)
+        except TimeoutError as e:
+            print(f"deadline     gave up after {(time.perf_counter() - start) * 1000:.0f} ms ({e})")
+
+    with StubBackend(status=503) as stub:
+        llm_response.configure(base_url=stub.url)
+        llm_response.breaker = CircuitBreaker(threshold=3, reset_after=60)
+        failures = fast_fails = 0
+        start = time.perf_counter()
+        for i in range(20):
+            try:
+                llm_response.get_response(f"down {i}", timeout=5, use_cache=False, hedge=False)
+            except CircuitOpenError:
+                fast_fails += 1
+            except Exception:
+                failures += 1
+        print(f"breaker      {failures} real failures, {fast_fails} fast-failed, "
+              f"{stub.requests} requests reached the server in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
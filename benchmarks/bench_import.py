@@ -0,0 +1,91 @@
+"""Bulk import/export of 100k snippets against one save_snippet() call per snippet.
+
+The JSONL has some repeated bodies (filed once per tag) and a few broken
+lines, which must be counted and skipped. The export is imported into a fresh
+library to check nothing was lost; peak memory is measured in a separate run,
+since tracemalloc slows everything down.
+
+Run from the repo root:  python benchmarks/bench_import.py
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import snippet_io  # noqa: E402
+from snippet_manager import SnippetManager  # noqa: E402
+
+SNIPPETS = 100_000
+DUPLICATES = 2_000
+INVALID = 100
+ONE_BY_ONE = 2_000  # save_snippet() baseline, extrapolated to SNIPPETS
+TAGS = ["ROLE", "CONTEXT", "TASK", "CONSTRAINTS", "OUTPUT", "FORMAT", "EXAMPLES"]
+
+
+def body(i):
+    return f"Snippet {i} says: keep answers short, cite sources, and check case {i % 97}.\n" * (1 + i % 4)
+
+
+def write_input(path):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(SNIPPETS):
+            f.write(json.dumps({"tag": TAGS[i % len(TAGS)], "name": f"snippet {i}", "content": body(i)}) + "\n")
+        for i in range(DUPLICATES):  # same tag and body as an earlier one
+            f.write(json.dumps({"tag": TAGS[i % len(TAGS)], "name": f"copy {i}", "content": body(i)}) + "\n")
+        for i in range(INVALID):
+            f.write('{"tag": "ROLE", "name": ' if i % 2 else '{"tag": "ROLE", "content": "no name"}\n')
+            f.write("\n")
+
+
+def import_into(tmp, name, source):
+    manager = SnippetManager(os.path.join(tmp, name))
+    started = time.perf_counter()
+    stats = snippet_io.import_path(manager, source)
+    return manager, stats, time.perf_counter() - started
+
+
+def main():
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "input.jsonl")
+        write_input(source)
+
+        baseline = SnippetManager(os.path.join(tmp, "one_by_one.json"))
+        started = time.perf_counter()
+        for i in range(ONE_BY_ONE):
+            baseline.save_snippet(TAGS[i % len(TAGS)], f"snippet {i}", body(i))
+        per_save = (time.perf_counter() - started) / ONE_BY_ONE
+        print(f"save_snippet x {ONE_BY_ONE:,}: {per_save * 1000:.2f} ms each, "
+              f"~{per_save * SNIPPETS:.0f} s for {SNIPPETS:,}")
+
+        manager, stats, elapsed = import_into(tmp, "bulk.json", source)
+        print(f"import:  {snippet_io.summary(stats)} in {elapsed:.2f} s")
+        ok &= stats["imported"] == SNIPPETS and stats["duplicates"] == DUPLICATES and stats["invalid"] == INVALID
+
+        again = snippet_io.import_path(manager, source)
+        print(f"re-run:  {snippet_io.summary(again)}")
+        ok &= again["imported"] == 0
+
+        for as_dir, target in ((False, os.path.join(tmp, "export.jsonl")), (True, os.path.join(tmp, "export_dir"))):
+            started = time.perf_counter()
+            count = snippet_io.export_path(manager, target, as_dir)
+            exported = time.perf_counter() - started
+            _, round_trip, elapsed = import_into(tmp, f"round_trip_{as_dir}.json", target)
+            print(f"export {'dir  ' if as_dir else 'jsonl'}: {count:,} in {exported:.2f} s, "
+                  f"re-imported {round_trip['imported']:,} in {elapsed:.2f} s")
+            ok &= count == SNIPPETS and round_trip["imported"] == SNIPPETS
+
+        tracemalloc.start()
+        import_into(tmp, "traced.json", source)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"import peak memory: {peak / 2**20:.1f} MB (input file {os.path.getsize(source) / 2**20:.1f} MB)")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Codebase ingestion: walk + hash + count + dump of a synthetic tree. No Flet needed.
+
+- cold: empty cache, every file read, hashed and counted
+- warm: nothing changed, so only the walk and the dump's own reads remain
+- touched: one file in TOUCH edited between runs
+
+Each is run with one worker and with the default pool. Then a cold run under a
+small total budget checks that skipped files' texts aren't held (peak memory).
+
+Run from the repo root:  python benchmarks/bench_ingest.py [files, default 3000]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import code_ingest  # noqa: E402
+from token_counter import load_tokenizer  # noqa: E402
+
+FILES_PER_DIR = 20
+TOUCH = 10
+BUDGET = 20_000  # tokens for the budgeted run, a handful of files
+BODY = "def handler_{i}(request):\n    # handles request {i}\n    return {{'id': {i}, 'ok': True}}\n\n" * 30
+
+
+def build_tree(root, n):
+    for i in range(n):
+        directory = os.path.join(root, f"pkg{i // (FILES_PER_DIR * 10)}", f"mod{i // FILES_PER_DIR}")
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"file{i}.py"), "w") as f:
+            f.write(BODY.format(i=i))
+        if i % FILES_PER_DIR == 0:
+            with open(os.path.join(directory, "build.log"), "w") as f:
+                f.write("ignored\n")
+            with open(os.path.join(directory, "data.bin"), "wb") as f:
+                f.write(os.urandom(1024))
+    os.makedirs(os.path.join(root, "venv", "lib"), exist_ok=True)
+    with open(os.path.join(root, "venv", "lib", "site.py"), "w") as f:
+        f.write("ignored\n")
+    with open(os.path.join(root, ".gitignore"), "w") as f:
+        f.write("*.log\npkg0/mod0/\n")
+
+
+def run(root, cache, out, workers, tokenizer):
+    start = time.perf_counter()
+    files, texts, stats = code_ingest.ingest(root, max_total_tokens=10 ** 9, workers=workers,
+                                             cache=cache, tokenizer=tokenizer)
+    code_ingest.dump(root, files, texts, out, cache, workers)
+    return (time.perf_counter() - start) * 1000, stats
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    tokenizer = load_tokenizer()
+    print(f"{n} files, tokenizer {type(tokenizer).__name__}")
+    print(f"{'workers':>8} {'cold ms':>9} {'warm ms':>9} {'touched ms':>11} {'walk ms':>8} {'files':>6} {'tokens':>10}")
+    for workers in (1, code_ingest.WORKERS):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = os.path.join(tmp, "repo")
+            build_tree(root, n)
+            cache_dir = os.path.join(tmp, "cache")
+            out = os.path.join(tmp, "dump.txt")
+
+            cold_ms, stats = run(root, code_ingest.IngestCache(root, cache_dir), out, workers, tokenizer)
+            warm_ms, _ = run(root, code_ingest.IngestCache(root, cache_dir), out, workers, tokenizer)
+            for i in range(TOUCH):
+                path = os.path.join(root, f"pkg{i // (FILES_PER_DIR * 10)}", f"mod{i // FILES_PER_DIR + 1}",
+                                    f"file{i + FILES_PER_DIR}.py")
+                with open(path, "a") as f:
+                    f.write("# edited\n")
+            touched_ms, touched = run(root, code_ingest.IngestCache(root, cache_dir), out, workers, tokenizer)
+            assert touched["read"] == TOUCH, touched
+            assert stats["files"] == n - FILES_PER_DIR  # pkg0/mod0 is gitignored
+
+            print(f"{workers:>8} {cold_ms:>9.0f} {warm_ms:>9.0f} {touched_ms:>11.0f} "
+                  f"{stats['walk_s'] * 1000:>8.0f} {stats['files']:>6} {stats['tokens']:>10,}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, "repo")
+        build_tree(root, n)
+        tracemalloc.start()
+        files, texts, stats = code_ingest.ingest(root, max_total_tokens=BUDGET, tokenizer=tokenizer,
+                                                 cache=code_ingest.IngestCache(root, os.path.join(tmp, "cache")))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        tree_mb = sum(os.path.getsize(os.path.join(d, f)) for d, _, fs in os.walk(root) for f in fs) / 2 ** 20
+        assert len(texts) == stats["files"]
+        print(f"budget {BUDGET:,} tokens: {stats['files']} files kept, {stats['skipped']} skipped, "
+              f"peak {peak / 2 ** 20:.1f} MB (tree {tree_mb:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""get_response latency and connection reuse against the local stub backend.
+
+Compares a fresh genai.Client per call (the old behaviour) with the shared
+client, sync and async. The response cache and hedging are off, so every call
+is one request, and the cache points at a temp file in case anything does
+write to it. Needs google-genai installed; no network access.
+
+Run from the repo root:  python benchmarks/bench_llm.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Before llm_response is imported: never touch the user's cache
+os.environ["PROMPTMASTER_LLM_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(), "llm_cache.sqlite3")
+
+from google import genai  # noqa: E402
+from google.genai import types  # noqa: E402
+
+import llm_response  # noqa: E402
+from llm_stub import StubBackend  # noqa: E402
+
+CALLS = 50
+
+
+def fresh_client_call(url, prompt):
+    client = genai.Client(api_key="stub", http_options=types.HttpOptions(base_url=url))
+    return client.models.generate_content(model=llm_response.MODEL, contents=prompt,
+                                          config=llm_response.build_config()).text
+
+
+def run(label, stub, fn):
+    stub.requests = stub.connections = 0
+    start = time.perf_counter()
+    fn()
+    ms = (time.perf_counter() - start) / CALLS * 1000
+    print(f"{label:<22} {ms:>8.2f} ms/call {stub.connections:>6} connections for {stub.requests} requests")
+
+
+def main():
+    with StubBackend() as stub:
+        llm_response.configure(api_key="stub", base_url=stub.url, timeout=10)
+
+        run("client per call", stub, lambda: [fresh_client_call(stub.url, f"p{i}") for i in range(CALLS)])
+        run("shared client", stub, lambda: [llm_response.get_response(f"p{i}", use_cache=False, hedge=False) for i in range(CALLS)])
+
+        async def sequential():
+            for i in range(CALLS):
+                await llm_response.get_response_async(f"p{i}", use_cache=False, hedge=False)
+        run("shared client (async)", stub, lambda: asyncio.run(sequential()))
+
+
+if __name__ == "__main__":
+    main()
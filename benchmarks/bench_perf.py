@@ -0,0 +1,58 @@
+"""Cost of the perf instrumentation, disabled and enabled.
+
+Run from the repo root:  python benchmarks/bench_perf.py
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CALLS = 200_000
+
+SNIPPET = f"""
+import sys, time
+sys.path.insert(0, {ROOT!r})
+import perf
+
+@perf.timed("decorated")
+def work():
+    pass
+
+def bare():
+    pass
+
+def run(label, fn):
+    start = time.perf_counter()
+    for _ in range({CALLS}):
+        fn()
+    print(f"{{label:<26}} {{(time.perf_counter() - start) / {CALLS} * 1e9:>8.0f}} ns/call")
+
+def with_timer():
+    with perf.timer("block"):
+        pass
+
+print("PROMPTMASTER_PERF=" + ("1" if perf.ENABLED else "unset"))
+run("  bare function", bare)
+run("  @perf.timed", work)
+run("  with perf.timer()", with_timer)
+"""
+
+
+def main():
+    with tempfile.TemporaryDirectory() as out:
+        for enabled in (False, True):
+            env = dict(os.environ, PROMPTMASTER_PERF_DIR=out)
+            env.pop("PROMPTMASTER_PROFILE", None)
+            if enabled:
+                env["PROMPTMASTER_PERF"] = "1"
+            else:
+                env.pop("PROMPTMASTER_PERF", None)
+            # Separate interpreters, since the switch is read once at import
+            result = subprocess.run([sys.executable, "-c", SNIPPET], env=env, capture_output=True, text=True)
+            print("\n".join(line for line in result.stdout.splitlines() if not line.startswith("[perf]")
+                            and "calls  avg" not in line))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Python-side frame time for the block workspace at 50, 500 and 2000 blocks.
+
+"full" builds every PromptBlock control, the way the plain ft.Column did.
+"virtual" drives VirtualBlockList through a scroll from top to bottom and
+reports the mean and worst render() time per scroll event.
+
+Needs flet installed. Run from the repo root:  python benchmarks/bench_render.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from block_view import VirtualBlockList  # noqa: E402
+from prompt_document import BlockData, PromptDocument  # noqa: E402
+from prompt_blocks import PromptBlock  # noqa: E402
+
+BLOCK_COUNTS = [50, 500, 2000]
+SCROLL_STEP_PX = 120
+VIEWPORT_PX = 900
+
+
+class RecordingScheduler:
+    """Stands in for UpdateScheduler; there is no client to send to here"""
+
+    def __init__(self):
+        self.marks = 0
+
+    def mark(self, *controls):
+        self.marks += 1
+
+    def flush(self):
+        pass
+
+
+class ScrollEvent:
+    def __init__(self, pixels):
+        self.pixels = pixels
+        self.viewport_dimension = VIEWPORT_PX
+
+
+def make_block(data, lightweight):
+    noop = lambda *a: None  # noqa: E731
+    block = PromptBlock(
+        tag_name=data.tag_name, border_color=data.border_color,
+        delete_callback=noop, parent_focus_callback=noop, text_change_callback=noop,
+        save_request_callback=noop, snippet_request_callback=noop, on_focus_callback=noop,
+        indent_level=data.indent_level, value=data.text, lightweight=lightweight,
+    )
+    block.data = data
+    block.build()  # Flet calls this when the control is first sent
+    return block
+
+
+def workspace(n):
+    return [BlockData("CONTEXT", 1 + i % 3, "white", "line of context\n" * (i % 5)) for i in range(n)]
+
+
+def main():
+    print(f"{'blocks':>7} {'full ms':>9} {'virtual mean ms':>16} {'virtual max ms':>15} {'live controls':>14}")
+    for n in BLOCK_COUNTS:
+        items = workspace(n)
+
+        start = time.perf_counter()
+        for data in items:
+            make_block(data, lightweight=n > 40)
+        full = (time.perf_counter() - start) * 1000
+
+        document = PromptDocument()
+        view = VirtualBlockList(RecordingScheduler(), document, make_block)
+        for data in items:
+            document.append(data)
+        view.render()
+
+        frames = []
+        total_px = view._prefix_sums()[-1]
+        for px in range(0, int(total_px), SCROLL_STEP_PX):
+            start = time.perf_counter()
+            view._on_scroll(ScrollEvent(px))
+            frames.append((time.perf_counter() - start) * 1000)
+
+        mean = sum(frames) / len(frames)
+        print(f"{n:>7} {full:>9.2f} {mean:>16.3f} {max(frames):>15.3f} {len(view.column.controls) - 2:>14}")
+
+
+if __name__ == "__main__":
+    main()
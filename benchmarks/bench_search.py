@@ -0,0 +1,78 @@
+"""Query latency of the snippet picker's search index, plus recall checks for
+matches buried behind thousands of near misses. Exits 1 if a recall check
+misses or a query at 100k snippets takes over TARGET_MS.
+
+Run from the repo root:  python benchmarks/bench_search.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from snippet_search import SnippetSearchIndex, extract_terms  # noqa: E402
+
+SIZES = [1_000, 10_000, 100_000]
+WORDS = ["python", "senior", "architect", "insurance", "reviewer", "concise", "json", "schema",
+         "security", "audit", "summarize", "translate", "persona", "socratic", "tutor", "sql"]
+# Prefix hits, then mid-word and 1-2 char queries (no prefix shortcut), then misses
+QUERIES = ["py", "arch", "senior arch", "json schema", "tutor", "sql audit 12",
+           "view", "ecur", "ers", "q", "ql", "99", "insurnce", "zzz", "zz"]
+ROUNDS = 200
+TARGET_MS = 1.0
+
+
+def build_index(n, rng):
+    entries = []
+    for i in range(n):
+        name = " ".join(rng.sample(WORDS, 2)) + f" {i}"
+        body = " ".join(rng.choices(WORDS, k=40))
+        entries.append({"name": name, "size": len(body), "hash": str(i), "terms": extract_terms(body)})
+    return SnippetSearchIndex.build(entries)
+
+
+def check_recall():
+    """Exact matches must be found however many near misses share their trigrams"""
+    entries = [{"name": f"abcx bcdx {i}", "size": 0, "hash": str(i), "terms": []} for i in range(5000)]
+    entries.append({"name": "my abcd notes", "size": 0, "hash": "name", "terms": []})
+    entries.append({"name": "checklist", "size": 0, "hash": "body",
+                    "terms": extract_terms("please review the diff for security issues")})
+    index = SnippetSearchIndex.build(entries)
+    ok = True
+    for query, expected in (("abcd", "name"), ("revi", "body"), ("secur revi", "body")):
+        found = [entry["hash"] for entry in index.search(query)]
+        hit = bool(found) and found[0] == expected
+        ok &= hit
+        print(f"recall {query!r:<14} {'ok' if hit else 'MISSED'}")
+    return ok
+
+
+def main():
+    ok = check_recall()
+    rng = random.Random(7)
+    print(f"{'snippets':>10} {'build s':>9} {'add ms':>8} " + " ".join(f"{q[:8]:>9}" for q in QUERIES))
+    for n in SIZES:
+        start = time.perf_counter()
+        index = build_index(n, rng)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for i in range(ROUNDS):
+            index.add({"name": f"saved {i}", "size": 0, "hash": "", "terms": []})
+        add_ms = (time.perf_counter() - start) / ROUNDS * 1000
+
+        row = []
+        for query in QUERIES:
+            start = time.perf_counter()
+            for _ in range(ROUNDS):
+                index.search(query)
+            row.append((time.perf_counter() - start) / ROUNDS * 1000)
+        print(f"{n:>10} {build:>9.2f} {add_ms:>8.3f} " + " ".join(f"{ms:>9.3f}" for ms in row))
+    print(f"(query times in ms, slowest {max(row):.3f})")
+    ok &= max(row) <= TARGET_MS
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Load test: many app sessions sharing one snippet library. No Flet needed.
+
+SESSIONS threads play Flet web sessions: each searches the picker, loads a
+tag and now and then saves a snippet. PROCESSES extra worker processes save
+into the same files at the same time (a multi-worker deployment). Compactions
+run along the way, since the journal passes COMPACT_EVERY.
+
+Two setups:
+- per-session: a SnippetManager per session, checking mtimes on every read
+- shared: shared_manager(), one in-memory copy plus change notifications
+
+Afterwards a fresh manager must see every save (no lost writes), and in the
+shared setup every session must have been told about every save (an
+"add" event, or a "reload" after which it re-reads the library).
+
+Run from the repo root:  python benchmarks/bench_sessions.py
+"""
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import snippet_manager  # noqa: E402
+from snippet_manager import SnippetManager, shared_manager  # noqa: E402
+
+SESSIONS = 50
+PROCESSES = 2
+OPS = 200              # per session
+SAVE_EVERY = 20        # one op in SAVE_EVERY is a save
+PROCESS_SAVES = 100    # per worker process
+TAGS = ["ROLE", "CONTEXT", "TASK", "CONSTRAINTS"]
+SEED_SNIPPETS = 2000
+
+
+def seed(path):
+    manager = SnippetManager(path)
+    for i in range(SEED_SNIPPETS):
+        manager.save_snippet(TAGS[i % len(TAGS)], f"seed {i}", f"seed body {i % 300} with some words")
+    manager.compact()
+
+
+def worker_process(path, worker, start):
+    start.wait()
+    manager = SnippetManager(path, auto_refresh=False)
+    for i in range(PROCESS_SAVES):
+        manager.save_snippet(TAGS[i % len(TAGS)], f"proc {worker} #{i}", f"from process {worker}, save {i}")
+        time.sleep(0.002)
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def run(label, path, make_manager):
+    reads, saves, seen = [], [], []
+    lock = threading.Lock()
+    barrier = threading.Barrier(SESSIONS + 1)
+    managers = []
+
+    def session(n):
+        rng = random.Random(n)
+        manager = make_manager()
+        heard = set()
+
+        def listener(event, tag, entry):
+            if event == "add":
+                heard.add(entry["name"])
+            else:  # "reload": another process compacted, so re-read the lot like the app does
+                heard.update(e["name"] for _, e in manager.all_snippets() if not e["name"].startswith("seed"))
+        manager.subscribe(listener)
+        with lock:
+            managers.append(manager)
+            seen.append(heard)
+        barrier.wait()
+        my_reads, my_saves = [], []
+        for i in range(OPS):
+            start = time.perf_counter()
+            if i % SAVE_EVERY == SAVE_EVERY - 1:
+                manager.save_snippet(rng.choice(TAGS), f"session {n} #{i}", f"session {n} wrote this at op {i}")
+                my_saves.append(time.perf_counter() - start)
+            elif i % 2:
+                manager.search_snippets(rng.choice(TAGS), rng.choice(["seed", "body 1", "sess", ""]))
+                my_reads.append(time.perf_counter() - start)
+            else:
+                manager.load_snippets(rng.choice(TAGS))
+                my_reads.append(time.perf_counter() - start)
+        with lock:
+            reads.extend(my_reads)
+            saves.extend(my_saves)
+
+    start_event = multiprocessing.Event()
+    processes = [multiprocessing.Process(target=worker_process, args=(path, w, start_event)) for w in range(PROCESSES)]
+    for process in processes:
+        process.start()
+    threads = [threading.Thread(target=session, args=(n,)) for n in range(SESSIONS)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    start_event.set()
+    for thread in threads:
+        thread.join()
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - started
+
+    expected = SEED_SNIPPETS + SESSIONS * (OPS // SAVE_EVERY) + PROCESSES * PROCESS_SAVES
+    time.sleep(snippet_manager.WATCH_SECONDS * 2.5)  # let watchers pick up the last process saves
+    found = len(SnippetManager(path).all_snippets())
+    new_saves = expected - SEED_SNIPPETS
+    notified = min(len(heard) for heard in seen)
+    reloads = sum(m.reloads for m in {id(m): m for m in managers}.values())
+    print(f"{label:<12} {elapsed:>6.2f} s  read p50 {percentile(reads, 0.5) * 1000:>6.3f} ms  "
+          f"p99 {percentile(reads, 0.99) * 1000:>7.3f} ms  save p50 {statistics.median(saves) * 1000:>6.2f} ms  "
+          f"p99 {percentile(saves, 0.99) * 1000:>7.2f} ms  reloads {reloads:>5}  "
+          f"lost {expected - found}  least notified {notified}/{new_saves}")
+    return expected == found
+
+
+def main():
+    ok = True
+    print(f"{SESSIONS} sessions x {OPS} ops + {PROCESSES} processes x {PROCESS_SAVES} saves, "
+          f"{SEED_SNIPPETS} seeded snippets")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "per_session.json")
+        seed(path)
+        ok &= run("per-session", path, lambda: SnippetManager(path))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "shared.json")
+        seed(path)
+        ok &= run("shared", path, lambda: shared_manager(path))
+        shared_manager(path).close()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Load/save latency of SnippetManager as the library grows.
+
+Run from the repo root:  python benchmarks/bench_snippets.py
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from snippet_manager import BLOB_DIR_SUFFIX, BlobStore, SnippetManager  # noqa: E402
+
+SIZES = [1_000, 10_000, 50_000]
+TAGS = ["ROLE", "CONTEXT", "TASK", "CONSTRAINTS", "OUTPUT", "FORMAT", "EXAMPLES"]
+ROUNDS = 50
+
+
+def build_library(path, n):
+    blobs = BlobStore(path + BLOB_DIR_SUFFIX)
+    data = {tag: [] for tag in TAGS}
+    for i in range(n):
+        # Bodies repeat so the blob store dedups them and the build stays quick
+        digest, size = blobs.put(f"content body {i % 500} " * 8)
+        data[TAGS[i % len(TAGS)]].append({"name": f"snippet {i}", "size": size, "hash": digest})
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+def timed(fn, rounds=ROUNDS):
+    start = time.perf_counter()
+    for i in range(rounds):
+        fn(i)
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def main():
+    print(f"{'snippets':>10} {'cold load ms':>14} {'warm load ms':>14} {'save ms':>10}")
+    for n in SIZES:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "snippets.json")
+            build_library(path, n)
+            mgr = SnippetManager(path)
+
+            start = time.perf_counter()
+            mgr.load_snippets("ROLE")
+            cold = (time.perf_counter() - start) * 1000
+
+            warm = timed(lambda i: mgr.load_snippets(TAGS[i % len(TAGS)]))
+            save = timed(lambda i: mgr.save_snippet("TASK", f"bench {i}", "x" * 200))
+            print(f"{n:>10} {cold:>14.2f} {warm:>14.3f} {save:>10.3f}")
+            mgr.compact()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Cold start: import time of main.py and time to first frame, against a budget.
+
+Each measurement is a fresh interpreter, repeated RUNS times; the median is
+compared with the budget and the script exits 1 when it is over.
+
+- import: `python -X importtime -c "import main"`, with the heaviest modules listed
+- first frame: spawns `python main.py` with PROMPTMASTER_STARTUP_PROBE=exit and
+  times it until main() has sent its first page.add (needs Flet and a display)
+
+Without Flet installed only the Flet-free app modules can be imported, and the
+report says so.
+
+Run from the repo root:  python benchmarks/bench_startup.py
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = 5
+IMPORT_BUDGET_MS = 400
+FIRST_FRAME_BUDGET_MS = 2500
+FIRST_FRAME_TIMEOUT_S = 60
+
+# Modules that must stay out of the startup path (Flet itself brings in asyncio)
+DEFERRED = ["google.genai", "dotenv", "llm_response", "llm_hedge", "llm_batch"]
+HEADLESS_MODULES = ["snippet_manager", "token_counter", "ui_scheduler", "prompt_document",
+                    "command_engine", "workspace_store", "attachments", "perf"]
+
+
+def has_flet():
+    probe = subprocess.run([sys.executable, "-c", "import flet"], capture_output=True)
+    return probe.returncode == 0
+
+
+def import_profile(statement, baseline=()):
+    """Returns (total ms, {module: cumulative ms}) for one cold import,
+    leaving out modules in `baseline` (what a bare interpreter loads anyway)"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+                            cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        try:
+            modules[name[1:].rstrip()] = int(cumulative) / 1000  # nested imports keep their indent
+        except ValueError:
+            continue  # header row
+    modules = {name: ms for name, ms in modules.items() if name not in baseline}
+    top_level = [ms for name, ms in modules.items() if not name.startswith(" ")]
+    return sum(top_level), modules
+
+
+def first_frame_ms():
+    env = dict(os.environ, PROMPTMASTER_STARTUP_PROBE="exit")
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "main.py"], cwd=ROOT, env=env,
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    try:
+        for line in proc.stdout:
+            if line.startswith("[startup] first frame"):
+                return (time.perf_counter() - start) * 1000
+    finally:
+        try:
+            proc.wait(timeout=FIRST_FRAME_TIMEOUT_S)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    return None
+
+
+def main():
+    failed = False
+    flet = has_flet()
+    statement = "import main" if flet else "import " + ", ".join(HEADLESS_MODULES)
+    label = "main.py" if flet else "app modules (Flet not installed)"
+
+    baseline = set(import_profile("pass")[1])
+    runs = [import_profile(statement, baseline) for _ in range(RUNS)]
+    median = statistics.median(total for total, _ in runs)
+    _, modules = runs[-1]
+    print(f"import {label}: median {median:.0f} ms over {RUNS} runs (budget {IMPORT_BUDGET_MS} ms)")
+    heaviest = sorted(((ms, name) for name, ms in modules.items() if not name.startswith(" ")), reverse=True)[:8]
+    for ms, name in heaviest:
+        print(f"  {ms:>8.1f} ms  {name}")
+    leaked = [name for name in DEFERRED if name in {n.strip() for n in modules}]
+    if leaked:
+        print(f"  imported at startup but should be deferred: {', '.join(leaked)}")
+        failed = True
+    if median > IMPORT_BUDGET_MS:
+        failed = True
+
+    if flet:
+        frames = [first_frame_ms() for _ in range(RUNS)]
+        frames = [ms for ms in frames if ms is not None]
+        if frames:
+            median = statistics.median(frames)
+            print(f"first frame: median {median:.0f} ms over {len(frames)} runs (budget {FIRST_FRAME_BUDGET_MS} ms)")
+            failed |= median > FIRST_FRAME_BUDGET_MS
+        else:
+            print("first frame: app never reported a frame (no display?)")
+    else:
+        print("first frame: skipped, needs Flet")
+
+    print("OVER BUDGET" if failed else "within budget")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
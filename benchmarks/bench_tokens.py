@@ -0,0 +1,61 @@
+"""Per-keystroke cost of token counting with many blocks.
+
+Compares the old full rescan (sum of len() over every block, / 4) against
+TokenCounter, which only queues the edited block and recounts it off-thread.
+
+Run from the repo root:  python benchmarks/bench_tokens.py
+"""
+import math
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from token_counter import TokenCounter, load_tokenizer  # noqa: E402
+
+BLOCK_COUNTS = [50, 200, 1000]
+BLOCK_TEXT = "You are a meticulous reviewer. Check every claim against the context. " * 40
+KEYSTROKES = 500
+
+
+def full_rescan(texts):
+    return math.ceil(sum(len(t) for t in texts) / 4)
+
+
+def main():
+    tokenizer = load_tokenizer()
+    print(f"tokenizer: {type(tokenizer).__name__}")
+    print(f"{'blocks':>8} {'rescan us/key':>14} {'queue us/key':>13} {'settle ms':>10}")
+    for n in BLOCK_COUNTS:
+        texts = [BLOCK_TEXT] * n
+
+        start = time.perf_counter()
+        for _ in range(KEYSTROKES):
+            full_rescan(texts)
+        rescan = (time.perf_counter() - start) / KEYSTROKES * 1e6
+
+        settled = threading.Event()
+        counter = TokenCounter(on_total=lambda total: settled.set(), tokenizer=tokenizer)
+        blocks = list(range(n))
+        for block in blocks:
+            counter.update(block, BLOCK_TEXT)
+        settled.wait()
+
+        # Type into one block; the UI thread only pays for update()
+        text = BLOCK_TEXT
+        settled.clear()
+        start = time.perf_counter()
+        for i in range(KEYSTROKES):
+            text += "x"
+            counter.update(blocks[n // 2], text)
+        queued = time.perf_counter() - start
+        settled.wait()
+        settle = (time.perf_counter() - start) * 1000
+
+        print(f"{n:>8} {rescan:>14.2f} {queued / KEYSTROKES * 1e6:>13.2f} {settle:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Event handling while a /forge streams.
+
+A session loop gets a keystroke every KEY_INTERVAL while a forge streams from
+the stub, then an ESC halfway through. The forge runs as a TaskScope task over
+stream_response_async() and the handlers run on the loop, as in the app.
+Reports keystroke latency (dispatch to handled), how long ESC takes to stop
+the forge, and how many block updates the stream caused; exits 1 if keystroke
+p99 or ESC->stopped go over their targets. (The thread-per-forge baseline this
+used to compare against went with the sync stream_response.) Needs
+google-genai installed.
+
+Run from the repo root:  python benchmarks/bench_ui_async.py
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import llm_response  # noqa: E402
+from llm_stub import StubBackend  # noqa: E402
+from task_scope import TaskScope  # noqa: E402
+
+CHUNKS = 40
+CHUNK_DELAY = 0.05  # 2 s streams
+KEY_INTERVAL = 0.005
+ABORT_AFTER = 1.0
+RUNS = 3
+KEY_P99_TARGET_MS = 5.0
+ABORT_TARGET_MS = 50.0
+
+
+def key_work():
+    """Stands in for on_input_change: a completion lookup on a small dict"""
+    return sorted(k for k in KEYS if k.startswith("/f"))
+
+
+KEYS = [f"/{chr(97 + i % 26)}{i}" for i in range(2000)]
+
+
+class Session:
+    def __init__(self):
+        self.updates = 0
+        self.text = ""
+        self.latencies = []
+        self.abort_ms = None
+
+    def set_text(self, text):
+        self.text = text.strip()
+        self.updates += 1
+
+
+async def type_keys(session, handle, until):
+    while time.perf_counter() < until:
+        dispatched = time.perf_counter()
+        await handle()
+        session.latencies.append((time.perf_counter() - dispatched) * 1000)
+        await asyncio.sleep(KEY_INTERVAL)
+
+
+async def run_async(prompt):
+    tasks = TaskScope()
+    session = Session()
+    ended = asyncio.Event()
+
+    async def forge():
+        text = ""
+        try:
+            async for chunk in llm_response.stream_response_async(prompt, use_cache=False):
+                text += chunk
+                session.set_text(text)
+        finally:
+            ended.set()
+
+    tasks.start("forge", forge())
+
+    async def keystroke():
+        key_work()
+
+    keys = asyncio.ensure_future(type_keys(session, keystroke, time.perf_counter() + ABORT_AFTER * 1.5))
+    await asyncio.sleep(ABORT_AFTER)
+    pressed = time.perf_counter()
+    tasks.cancel()  # async ESC handler
+    await ended.wait()
+    session.abort_ms = (time.perf_counter() - pressed) * 1000
+    await keys
+    await tasks.close()
+    return session
+
+
+def report(label, sessions):
+    latencies = sorted(ms for s in sessions for ms in s.latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    abort = statistics.median(s.abort_ms for s in sessions)
+    updates = statistics.median(s.updates for s in sessions)
+    print(f"{label:<8} key p50 {statistics.median(latencies):>6.3f} ms  p99 {p99:>6.3f} ms  "
+          f"ESC->stopped {abort:>6.1f} ms  updates before abort {updates:>4.0f}")
+    return p99 <= KEY_P99_TARGET_MS and abort <= ABORT_TARGET_MS
+
+
+def main():
+    with StubBackend(chunks=CHUNKS, chunk_delay=CHUNK_DELAY) as stub:
+        llm_response.configure(api_key="stub", base_url=stub.url, timeout=30)
+        prompt = llm_response.forge_prompt("a grumpy build engineer")
+        llm_response.get_response("warm up", use_cache=False, hedge=False)  # client, connection pool
+
+        sessions = [asyncio.run(run_async(prompt)) for _ in range(RUNS)]
+        print(f"{RUNS} forges, {CHUNKS} chunks {CHUNK_DELAY * 1000:.0f} ms apart, "
+              f"keystroke every {KEY_INTERVAL * 1000:.0f} ms, ESC after {ABORT_AFTER:.1f} s")
+        ok = report("async", sessions)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Workspace autosave and restore costs. No Flet needed.
+
+- keystroke: what autosave adds to one edit on the typing thread
+- save: one background autosave after editing EDITS blocks
+- compact: folding everything into a fresh snapshot
+- restore: startup with bodies left on disk, then the cost of reading them all
+- count: token counts for a restored workspace, from the snapshot (bodies unread)
+
+Run from the repo root:  python benchmarks/bench_workspace.py
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prompt_document import PromptDocument  # noqa: E402
+from token_counter import TokenCounter  # noqa: E402
+from workspace_store import WorkspaceStore  # noqa: E402
+
+SIZES = [100, 1000, 10000]
+EDITS = 50
+KEYSTROKES = 20000
+
+
+def ms_since(start):
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    print(f"{'blocks':>7} {'keystroke us':>13} {'save ms':>9} {'compact ms':>11} "
+          f"{'restore ms':>11} {'count ms':>9} {'read all ms':>12} {'file KB':>9}")
+    counter = TokenCounter(lambda total: None)
+    for n in SIZES:
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "workspace.json")
+            document = PromptDocument()
+            store = WorkspaceStore(path, interval=3600, count_tokens=counter.count_text)  # saves are driven by hand below
+            store.attach(document)
+            blocks = [document.add("CONTEXT", 1 + i % 3, f"Block {i} body text.\n" * (1 + i % 8)) for i in range(n)]
+            store.save()
+
+            # Typing: plain set_text vs set_text with the autosave listener attached
+            bare = PromptDocument()
+            target = bare.add("TASK", 1, "")
+            start = time.perf_counter()
+            for i in range(KEYSTROKES):
+                bare.set_text(target, "x" * (i % 50))
+            bare_us = ms_since(start) * 1000 / KEYSTROKES
+            start = time.perf_counter()
+            for i in range(KEYSTROKES):
+                document.set_text(blocks[0], "x" * (i % 50))
+            keystroke_us = ms_since(start) * 1000 / KEYSTROKES - bare_us
+
+            for block in blocks[:EDITS]:
+                document.set_text(block, block.text + "edited\n")
+            start = time.perf_counter()
+            store.save()
+            save_ms = ms_since(start)
+
+            start = time.perf_counter()
+            store.compact()
+            compact_ms = ms_since(start)
+            store.close()
+            size_kb = sum(os.path.getsize(os.path.join(root, f)) for f in os.listdir(root)) / 1024
+
+            restored = PromptDocument()
+            start = time.perf_counter()
+            WorkspaceStore(path).restore(restored)
+            restore_ms = ms_since(start)
+
+            expected = sum(block.saved_tokens[1] for block in restored.blocks)
+            settled = threading.Event()
+            start = time.perf_counter()
+            restored_counter = TokenCounter(lambda total: total == expected and settled.set(), counter.tokenizer)
+            for block in restored.blocks:
+                restored_counter.update(block)
+            assert settled.wait(60)
+            count_ms = ms_since(start)
+            assert not any(block.loaded for block in restored.blocks), "counting read a body"
+
+            start = time.perf_counter()
+            for block in restored.blocks:
+                block.text
+            read_ms = ms_since(start)
+            assert restored.compile() == document.compile()
+
+            print(f"{n:>7} {keystroke_us:>13.2f} {save_ms:>9.2f} {compact_ms:>11.2f} "
+                  f"{restore_ms:>11.2f} {count_ms:>9.2f} {read_ms:>12.2f} {size_kb:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
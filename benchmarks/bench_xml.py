@@ -0,0 +1,85 @@
+"""COPY PROMPT cost: the original generate_nested_xml against PromptCompiler.
+
+Run from the repo root:  python benchmarks/bench_xml.py
+"""
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prompt_compiler import PromptCompiler  # noqa: E402
+
+WORKSPACES = [(20, 2_000), (200, 2_000), (10, 2_000_000)]  # (blocks, chars per block)
+ROUNDS = 20
+
+
+class Block:
+    def __init__(self, tag_name, indent_level, text):
+        self.tag_name = tag_name
+        self.indent_level = indent_level
+        self.text = text
+
+
+def legacy_generate_nested_xml(blocks):
+    xml_output = []
+    stack = []
+    for block in blocks:
+        current_level = block.indent_level
+        tag = block.tag_name.lower().replace(" ", "_")
+        content = block.text.strip()
+
+        while stack and stack[-1][1] >= current_level:
+            closing_tag, _ = stack.pop()
+            indent = "  " * len(stack)
+            xml_output.append(f"{indent}</{closing_tag}>")
+
+        indent_str = "  " * len(stack)
+        xml_output.append(f"{indent_str}<{tag}>")
+        if content:
+            content_indent = indent_str + "  "
+            formatted_content = "\n".join([f"{content_indent}{line}" for line in content.splitlines()])
+            xml_output.append(formatted_content)
+        stack.append((tag, current_level))
+
+    while stack:
+        closing_tag, _ = stack.pop()
+        indent = "  " * len(stack)
+        xml_output.append(f"{indent}</{closing_tag}>")
+    return "\n".join(xml_output)
+
+
+def build_workspace(n, chars):
+    line = "Log line with some context about the request and the response.\n"
+    text = (line * (chars // len(line) + 1))[:chars]
+    return [Block(["ROLE", "CONTEXT", "TASK"][i % 3], 1 + i % 3, text) for i in range(n)]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        fn()
+    return (time.perf_counter() - start) / ROUNDS * 1000
+
+
+def main():
+    print(f"{'blocks':>7} {'chars':>10} {'legacy ms':>10} {'cold ms':>9} {'edit ms':>9} {'stream ms':>10}")
+    for n, chars in WORKSPACES:
+        blocks = build_workspace(n, chars)
+        compiler = PromptCompiler(text_of=lambda b: b.text)
+        assert compiler.compile(blocks) == legacy_generate_nested_xml(blocks)
+
+        legacy = timed(lambda: legacy_generate_nested_xml(blocks))
+        cold = timed(lambda: PromptCompiler(text_of=lambda b: b.text).compile(blocks))
+
+        def edit_and_compile():
+            blocks[0].text = blocks[0].text[:-1] + "x"
+            compiler.compile(blocks)
+        edit = timed(edit_and_compile)
+        stream = timed(lambda: compiler.write_to(blocks, io.StringIO()))
+        print(f"{n:>7} {chars:>10} {legacy:>10.2f} {cold:>9.2f} {edit:>9.2f} {stream:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import bisect
+
+import flet as ft
+
+# Height estimates (px) for blocks that aren't on screen; close enough for spacers
+BLOCK_CHROME_PX = 70      # header row, padding, border and bottom margin
+LINE_PX = 22
+OVERSCAN_PX = 800         # Extra rows kept materialized above and below the viewport
+DEFAULT_VIEWPORT_PX = 900
+
+# Above this many blocks, new controls skip shadows and animations
+LIGHTWEIGHT_THRESHOLD = 40
+
+
+def estimate_height(data):
+    min_lines = 1 if data.indent_level > 1 else 3
+    return BLOCK_CHROME_PX + LINE_PX * max(data.line_count, min_lines)
+
+
+class VirtualBlockList:
+    """Scrolling view of a PromptDocument that only keeps PromptBlock controls for
+    the rows near the viewport. Off-screen rows are replaced by two spacers of the
+    right height. Edits go through the document; the view follows its events.
+
+    make_block(data, lightweight) builds the control for a row; the control's
+    `data` attribute must point back at its BlockData.
+    """
+
+    def __init__(self, ui, document, make_block):
+        self.ui = ui
+        self.document = document
+        self.make_block = make_block
+        self._controls = {}         # BlockData -> PromptBlock for the materialized window
+        self._offsets = None        # prefix sums of estimated heights, rebuilt lazily
+        self._heights = {}          # BlockData -> height used in the last prefix sums
+        self._window = None
+        self._scroll_px = 0
+        self._viewport_px = DEFAULT_VIEWPORT_PX
+
+        self.top_spacer = ft.Container(height=0)
+        self.bottom_spacer = ft.Container(height=0)
+        self.column = ft.Column(
+            controls=[self.top_spacer, self.bottom_spacer],
+            scroll=ft.ScrollMode.HIDDEN,
+            expand=True,
+            on_scroll=self._on_scroll,
+            on_scroll_interval=50,
+        )
+
+        document.subscribe(self._on_document_change)
+
+    @property
+    def items(self):
+        return self.document.blocks
+
+    def __len__(self):
+        return len(self.document)
+
+    # --- Document events ---
+
+    def _on_document_change(self, event, data):
+        if event == "text":
+            # Only the spacer estimates care about text, and only when the line count moves
+            if self._heights.get(data) != estimate_height(data):
+                self._offsets = None
+        elif event == "append":
+            self._offsets = None   # the caller scrolls to it with ensure_visible
+        elif event == "clear":
+            self._controls.clear()
+            self._heights.clear()
+            self._offsets = None
+            self._scroll_px = 0
+            self.render()
+        else:
+            # delete, move, indent: the row's control (if any) is stale or gone
+            self._controls.pop(data, None)
+            self._heights.pop(data, None)
+            self._offsets = None
+            self.render(force=True)
+
+    def control_for(self, data):
+        return self._controls.get(data)
+
+    # --- Windowing ---
+
+    def _prefix_sums(self):
+        if self._offsets is None:
+            offsets = [0]
+            heights = {}
+            total = 0
+            for data in self.items:
+                h = estimate_height(data)
+                heights[data] = h
+                total += h
+                offsets.append(total)
+            self._offsets = offsets
+            self._heights = heights
+        return self._offsets
+
+    def _on_scroll(self, e):
+        self._scroll_px = e.pixels
+        if e.viewport_dimension:
+            self._viewport_px = e.viewport_dimension
+        self.render()
+
+    def render(self, force=False):
+        offsets = self._prefix_sums()
+        n = len(self.items)
+        top = max(self._scroll_px - OVERSCAN_PX, 0)
+        bottom = self._scroll_px + self._viewport_px + OVERSCAN_PX
+        start = max(bisect.bisect_right(offsets, top) - 1, 0)
+        end = min(bisect.bisect_left(offsets, bottom), n)
+        window = (start, end, offsets[start], offsets[n])
+        if window == self._window and not force:
+            return
+        self._window = window
+
+        lightweight = n > LIGHTWEIGHT_THRESHOLD
+        visible = self.items[start:end]
+        controls = {}
+        for data in visible:
+            block = self._controls.get(data)
+            if block is None:
+                block = self.make_block(data, lightweight)
+            controls[data] = block
+        # Rows that scrolled away are dropped; their text already lives in BlockData
+        self._controls = controls
+
+        self.top_spacer.height = offsets[start]
+        self.bottom_spacer.height = offsets[n] - offsets[end]
+        self.column.controls = [self.top_spacer, *controls.values(), self.bottom_spacer]
+        self.ui.mark(self.column)
+
+    def ensure_visible(self, data):
+        """Scrolls to the block, materializes it and returns its control"""
+        offsets = self._prefix_sums()
+        index = self.document.index(data)
+        self._scroll_px = offsets[index]
+        self.render(force=True)
+        self.ui.flush()
+        self.column.scroll_to(offset=offsets[index], duration=0)
+        return self._controls.get(data)
@@ -0,0 +1,442 @@
+"""Dump a source tree as <path>...</path> sections for a CONTEXT block.
+
+Replaces code_dumper.sh. The tree is walked with a thread pool, skipping the
+same names the script did plus anything .gitignore'd (nested .gitignore files
+and ! negation included). Each file's hash and token count is cached by
+size + mtime, so a re-run only reads files that changed, and a dump whose
+files are all unchanged is not rewritten at all. Files over the per-file
+budget, or past the total budget, are left out and reported.
+
+    python code_ingest.py . -o dump.txt
+    python code_ingest.py path/to/repo --max-total-tokens 200000 > dump.txt
+    python code_ingest.py --split      # code_dump/<dir>_code_dump.txt, like the old script
+
+In the app, /ingest <dir> dumps a tree and attaches the result as a CONTEXT block.
+"""
+import argparse
+import fnmatch
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from file_util import atomic_write
+from token_counter import load_tokenizer
+
+OUTPUT_DIR = "code_dump"
+# Matched against each path component (the script grepped the whole path)
+IGNORE_PATTERN = rf"(\.git|__pycache__|venv|env|\.idea|\.vscode|\.DS_Store|{OUTPUT_DIR})"
+INCLUDE = ["*.py", "Dockerfile", "docker-compose.yml", "requirements.txt"]
+
+CACHE_DIR = os.getenv(
+    "PROMPTMASTER_INGEST_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "promptmaster", "ingest"),
+)
+WORKERS = min(32, (os.cpu_count() or 1) * 4)  # mostly waiting on the disk
+MAX_FILE_TOKENS = 50_000
+MAX_TOTAL_TOKENS = 1_000_000
+BINARY_SNIFF = 8192
+READ_AHEAD = 64  # files read ahead of the budget check, and of the writer when dumping
+
+
+# --- .gitignore ---
+
+def _glob_to_regex(pattern):
+    out = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            out.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            out.append("[^/]")
+            i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 2:]:
+            end = pattern.index("]", i + 2)
+            body = pattern[i + 1:end]
+            out.append("[" + ("^" + body[1:] if body.startswith("!") else body) + "]")
+            i = end + 1
+        elif pattern[i] == "\\" and i + 1 < len(pattern):
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            out.append(re.escape(pattern[i]))
+            i += 1
+    return "".join(out)
+
+
+class IgnoreRules:
+    """Patterns from one .gitignore, matched against paths relative to its directory"""
+
+    def __init__(self, lines):
+        self.rules = []  # (regex, negate, dir_only)
+        for line in lines:
+            line = line.rstrip("\r\n").rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            if negate or line.startswith("\\"):
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
+                continue
+            # A slash anywhere but the end anchors the pattern to this directory
+            regex = _glob_to_regex(line.lstrip("/"))
+            if "/" not in line:
+                regex = "(?:.*/)?" + regex
+            self.rules.append((re.compile(regex + r"\Z", re.S), negate, dir_only))
+
+    def match(self, relpath, is_dir):
+        """True (ignored) / False (re-included) from the last matching rule, None if none match"""
+        result = None
+        for regex, negate, dir_only in self.rules:
+            if (is_dir or not dir_only) and regex.match(relpath):
+                result = not negate
+        return result
+
+
+def is_ignored(relpath, is_dir, rules):
+    """rules: ((base dir, IgnoreRules), ...) from the root down; deeper files win"""
+    ignored = False
+    for base, ignore in rules:
+        if base:
+            if not relpath.startswith(base + "/"):
+                continue
+            decided = ignore.match(relpath[len(base) + 1:], is_dir)
+        else:
+            decided = ignore.match(relpath, is_dir)
+        if decided is not None:
+            ignored = decided
+    return ignored
+
+
+# --- Walking ---
+
+def walk(root, include=INCLUDE, ignore=IGNORE_PATTERN, workers=WORKERS):
+    """Sorted [(relative path, stat)] of the files to dump; directories are scanned in parallel"""
+    ignore_re = re.compile(ignore) if ignore else None
+    include_re = re.compile("|".join(fnmatch.translate(p) for p in include))
+
+    def scan(rel, rules):
+        try:
+            entries = list(os.scandir(os.path.join(root, rel) if rel else root))
+        except OSError as e:
+            print(f"Error scanning {rel or root}: {e}", file=sys.stderr)
+            return [], [], rules
+        if any(entry.name == ".gitignore" for entry in entries):
+            try:
+                with open(os.path.join(root, rel, ".gitignore"), encoding="utf-8", errors="replace") as f:
+                    rules = rules + ((rel, IgnoreRules(f)),)
+            except OSError as e:
+                print(f"Error reading {rel}/.gitignore: {e}", file=sys.stderr)
+        dirs, files = [], []
+        for entry in entries:
+            if ignore_re is not None and ignore_re.fullmatch(entry.name):
+                continue
+            child = f"{rel}/{entry.name}" if rel else entry.name
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+                if is_ignored(child, is_dir, rules):
+                    continue
+                if is_dir:
+                    dirs.append(child)
+                elif include_re.match(entry.name) and entry.is_file():
+                    files.append((child, entry.stat()))
+            except OSError:
+                continue  # vanished or unreadable mid-walk
+        return dirs, files, rules
+
+    found = []
+    with ThreadPoolExecutor(workers) as pool:
+        pending = {pool.submit(scan, "", ())}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                dirs, files, rules = future.result()
+                found.extend(files)
+                pending.update(pool.submit(scan, d, rules) for d in dirs)
+    found.sort(key=lambda item: item[0])
+    return found
+
+
+# --- Cache ---
+
+class IngestCache:
+    """Per-root {path: [size, mtime_ns, sha1, tokens]}, plus a manifest hash per dump written.
+    cache_dir=None keeps it in memory only."""
+
+    def __init__(self, root, cache_dir=CACHE_DIR):
+        key = hashlib.sha1(os.path.abspath(root).encode("utf-8")).hexdigest()[:16]
+        self.path = os.path.join(cache_dir, f"{key}.json") if cache_dir else None
+        self.files = {}
+        self.outputs = {}
+        if self.path is None:
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.files = data.get("files", {})
+            self.outputs = data.get("outputs", {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"Error loading ingest cache: {e}", file=sys.stderr)
+
+    def get(self, relpath, st):
+        entry = self.files.get(relpath)
+        if entry is not None and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+            return entry
+        return None
+
+    def put(self, relpath, st, sha1, tokens):
+        self.files[relpath] = [st.st_size, st.st_mtime_ns, sha1, tokens]
+
+    def save(self, keep=None):
+        """Writes the cache; with `keep`, forgets files that are no longer in the tree"""
+        if keep is not None:
+            self.files = {path: self.files[path] for path in keep if path in self.files}
+        if self.path is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            atomic_write(self.path, json.dumps({"files": self.files, "outputs": self.outputs}).encode("utf-8"))
+        except OSError as e:
+            print(f"Error saving ingest cache: {e}", file=sys.stderr)
+
+
+# --- Ingesting ---
+
+class IngestedFile:
+    __slots__ = ("path", "sha1", "tokens", "cached", "skipped")
+
+    def __init__(self, path, sha1, tokens, cached):
+        self.path = path
+        self.sha1 = sha1
+        self.tokens = tokens
+        self.cached = cached
+        self.skipped = None  # "binary", "file budget" or "total budget"
+
+
+def read_text(path):
+    """File contents as text, or None for binary files"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if b"\0" in data[:BINARY_SNIFF]:
+        return None
+    return data.decode("utf-8", errors="replace")
+
+
+def ingest(root, include=INCLUDE, ignore=IGNORE_PATTERN, max_file_tokens=MAX_FILE_TOKENS,
+           max_total_tokens=MAX_TOTAL_TOKENS, workers=WORKERS, cache=None, tokenizer=None):
+    """Walks `root` and picks the files to dump, in path order, within the budgets.
+
+    Returns (files, texts, stats). `texts` holds the contents of picked files that
+    had to be read for hashing; dump() reads the rest when it needs them.
+    """
+    tokenizer = tokenizer or load_tokenizer()
+    cache = cache if cache is not None else IngestCache(root)
+    stats = {"files": 0, "cached": 0, "read": 0, "skipped": 0, "tokens": 0}
+
+    started = time.perf_counter()
+    found = walk(root, include, ignore, workers)
+    stats["walk_s"] = time.perf_counter() - started
+
+    def fingerprint(item):
+        relpath, st = item
+        try:
+            text = read_text(os.path.join(root, relpath))
+        except OSError as e:
+            print(f"Error reading {relpath}: {e}", file=sys.stderr)
+            return relpath, st, None, None
+        if text is None:
+            return relpath, st, None, -1
+        return relpath, st, text, tokenizer.count(text)
+
+    def read(item):
+        if isinstance(item, IngestedFile):
+            return item, None
+        relpath, st, text, tokens = item.result()
+        stats["read"] += 1
+        if tokens is None:
+            return None, None  # unreadable; already reported
+        sha1 = hashlib.sha1(text.encode("utf-8")).hexdigest() if text is not None else ""
+        cache.put(relpath, st, sha1, tokens)
+        return IngestedFile(relpath, sha1, tokens, False), text
+
+    def budgeted():
+        """(file, text) in path order. Stale files are read a window ahead, so only the
+        texts of files that make the budget are ever kept"""
+        window = deque()
+        with ThreadPoolExecutor(workers) as pool:
+            for relpath, st in found:
+                entry = cache.get(relpath, st)
+                if entry is not None:
+                    window.append(IngestedFile(relpath, entry[2], entry[3], True))
+                else:
+                    window.append(pool.submit(fingerprint, (relpath, st)))
+                if len(window) > READ_AHEAD:
+                    yield read(window.popleft())
+            while window:
+                yield read(window.popleft())
+
+    started = time.perf_counter()
+    files = {}
+    texts = {}
+    total = 0
+    picked = []
+    for file, text in budgeted():
+        if file is None:
+            continue
+        files[file.path] = file
+        if file.tokens < 0:
+            file.skipped = "binary"
+        elif file.tokens > max_file_tokens:
+            file.skipped = "file budget"
+        elif total + file.tokens > max_total_tokens:
+            file.skipped = "total budget"  # later, smaller files may still fit
+        else:
+            total += file.tokens
+            stats["cached"] += file.cached
+            if text is not None:
+                texts[file.path] = text
+        if file.skipped:
+            stats["skipped"] += 1
+        picked.append(file)
+    stats["read_s"] = time.perf_counter() - started
+    stats["files"] = len(picked) - stats["skipped"]
+    stats["tokens"] = total
+    cache.save(files)
+    return picked, texts, stats
+
+
+def manifest(files):
+    """Hash of which files a dump holds and their contents"""
+    digest = hashlib.sha1()
+    for file in files:
+        if not file.skipped:
+            digest.update(f"{file.path}\0{file.sha1}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def iter_dump(root, files, texts, workers=WORKERS):
+    """The dump in code_dumper.sh's format, a file at a time. Files not already
+    in `texts` are read a few ahead of the consumer."""
+    files = [file for file in files if not file.skipped]
+
+    def load(file):
+        text = texts.get(file.path)
+        if text is None:
+            try:
+                text = read_text(os.path.join(root, file.path)) or ""
+            except OSError as e:
+                print(f"Error reading {file.path}: {e}", file=sys.stderr)
+                text = ""
+        return file.path, text
+
+    with ThreadPoolExecutor(workers) as pool:
+        for start in range(0, len(files), READ_AHEAD):
+            for path, text in pool.map(load, files[start:start + READ_AHEAD]):
+                yield f"<{path}>\n{text}\n</{path}>\n\n"
+
+
+def dump(root, files, texts, path, cache=None, workers=WORKERS):
+    """Writes the dump to `path`; returns False (and writes nothing) if the same
+    files with the same contents were dumped there last time"""
+    key = manifest(files)
+    target = os.path.abspath(path)
+    if cache is not None and cache.outputs.get(target) == key and os.path.exists(target):
+        return False
+    tmp_path = f"{target}.tmp"
+    with open(tmp_path, "w", encoding="utf-8", newline="\n") as f:
+        for section in iter_dump(root, files, texts, workers):
+            f.write(section)
+    os.replace(tmp_path, target)
+    if cache is not None:
+        cache.outputs[target] = key
+        cache.save()
+    return True
+
+
+def summary(stats):
+    return (f"{stats['files']} files, {stats['tokens']:,} tokens ({stats['cached']} cached, "
+            f"{stats['read']} read, {stats['skipped']} skipped) | walk {stats['walk_s'] * 1000:.0f} ms, "
+            f"read {stats['read_s'] * 1000:.0f} ms")
+
+
+# --- CLI ---
+
+def split_dumps(root, files):
+    """Groups files like code_dumper.sh: root files in one dump, each top-level dir in its own"""
+    groups = {}
+    for file in files:
+        top = file.path.split("/", 1)[0] if "/" in file.path else None
+        name = f"{top}_code_dump.txt" if top else "root_folder_code_dump.txt"
+        groups.setdefault(name, []).append(file)
+    return groups
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dump a source tree as <path>...</path> sections.")
+    parser.add_argument("root", nargs="?", default=".")
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    parser.add_argument("--split", action="store_true",
+                        help=f"one dump per top-level directory in {OUTPUT_DIR}/, like code_dumper.sh")
+    parser.add_argument("--include", action="append", help=f"file name glob (repeatable; default {INCLUDE})")
+    parser.add_argument("--ignore", default=IGNORE_PATTERN, help="regex for path components to skip")
+    parser.add_argument("--max-file-tokens", type=int, default=MAX_FILE_TOKENS)
+    parser.add_argument("--max-total-tokens", type=int, default=MAX_TOTAL_TOKENS)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--no-cache", action="store_true", help="hash and count every file again")
+    parser.add_argument("--quiet", action="store_true", help="skip the report")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    cache = IngestCache(args.root, cache_dir=None if args.no_cache else CACHE_DIR)
+    files, texts, stats = ingest(args.root, args.include or INCLUDE, args.ignore, args.max_file_tokens,
+                                 args.max_total_tokens, args.workers, cache)
+
+    write_started = time.perf_counter()
+    try:
+        if args.split:
+            os.makedirs(OUTPUT_DIR, exist_ok=True)
+            for name, group in split_dumps(args.root, files).items():
+                if not any(not file.skipped for file in group):
+                    continue
+                changed = dump(args.root, group, texts, os.path.join(OUTPUT_DIR, name), cache, args.workers)
+                if not args.quiet:
+                    print(f"  [{'OK' if changed else 'UNCHANGED'}] {OUTPUT_DIR}/{name}", file=sys.stderr)
+        elif args.output:
+            changed = dump(args.root, files, texts, args.output, cache, args.workers)
+            if not changed and not args.quiet:
+                print(f"  [UNCHANGED] {args.output}", file=sys.stderr)
+        else:
+            for section in iter_dump(args.root, files, texts, args.workers):
+                sys.stdout.write(section)
+            sys.stdout.flush()
+    except BrokenPipeError:
+        sys.stdout = open(os.devnull, "w")
+        return 0
+    stats["write_s"] = time.perf_counter() - write_started
+
+    if not args.quiet:
+        for file in files:
+            if file.skipped:
+                print(f"  [SKIP] {file.path} ({file.skipped}, {max(file.tokens, 0):,} tokens)", file=sys.stderr)
+        print(f"{summary(stats)}, write {stats['write_s'] * 1000:.0f} ms, "
+              f"total {time.perf_counter() - started:.2f} s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+SUGGESTION_LIMIT = 8
+_EMPTY = ()
+
+# Built-in commands take free-text arguments, so nothing is suggested once one is typed.
+# Matched as whole words: a tag like /forgery or /running_notes still completes.
+BUILTIN_COMMANDS = frozenset(["/forge", "/attach", "/export", "/ingest", "/import", "/run"])
+
+
+class Suggestion:
+    __slots__ = ("kind", "name", "label", "detail", "color", "level", "payload")
+
+    def __init__(self, kind, name, label, detail, color, level=1, payload=None):
+        self.kind = kind          # "tag" or "snippet"
+        self.name = name          # what gets executed: tag name or snippet name
+        self.label = label        # left column, e.g. "/role"
+        self.detail = detail      # right column, e.g. "<ROLE>"
+        self.color = color
+        self.level = level
+        self.payload = payload
+
+
+class _Node:
+    __slots__ = ("children", "top")
+
+    def __init__(self):
+        self.children = {}
+        self.top = []             # best completions under this prefix, already capped
+
+
+class PrefixTrie:
+    """Each node keeps its own capped completion list, so a lookup is a walk down
+    len(prefix) nodes and returns a list that already exists."""
+
+    def __init__(self, limit=SUGGESTION_LIMIT):
+        self.limit = limit
+        self.root = _Node()
+
+    def insert(self, key, item):
+        node = self.root
+        if len(node.top) < self.limit:
+            node.top.append(item)
+        for ch in key:
+            child = node.children.get(ch)
+            if child is None:
+                child = node.children[ch] = _Node()
+            node = child
+            if len(node.top) < self.limit:
+                node.top.append(item)
+
+    def complete(self, prefix):
+        node = self.root
+        for ch in prefix:
+            node = node.children.get(ch)
+            if node is None:
+                return _EMPTY
+        return node.top
+
+
+class CommandEngine:
+    """Completions for the command bar.
+
+    /tag       built-in sections, then custom tags used before at level 1
+    //tag      custom sub-tags used before with // or ///
+    ///tag     same list, nested one level deeper
+    @name      saved snippets, by name
+    """
+
+    def __init__(self, commands, colors, snippet_source=None):
+        self.colors = colors
+        self._top = PrefixTrie()
+        self._sub = PrefixTrie()
+        self._snippets = PrefixTrie()
+        self._known = set()       # (trie id, key) pairs already inserted
+        self._snippet_source = snippet_source
+        self._last = (None, _EMPTY)
+
+        for key, tag in commands.items():
+            self._insert(self._top, key, Suggestion("tag", key, f"/{key}", f"<{tag}>", colors[key], 1))
+
+    def _insert(self, trie, key, item):
+        marker = (id(trie), key)
+        if marker not in self._known:
+            self._known.add(marker)
+            trie.insert(key, item)
+            self._last = (None, _EMPTY)
+
+    def remember_tag(self, tag, level):
+        key = tag.strip().lower()
+        if not key:
+            return
+        if level == 1:
+            self._insert(self._top, key, Suggestion("tag", key, f"/{key}", f"<{key.upper()}>",
+                                                    self.colors["default"], 1))
+        else:
+            self._insert(self._sub, key, Suggestion("tag", key, f"//{key}", f"<{key.upper()}>",
+                                                    self.colors["default"], level))
+
+    def add_snippet(self, section_tag, entry):
+        key = entry["name"].strip().lower()
+        color = self.colors.get(section_tag.lower(), self.colors["default"])
+        self._insert(self._snippets, f"{key}\0{section_tag}", Suggestion(
+            "snippet", entry["name"], f"@{entry['name']}", f"<{section_tag.upper()}>", color, 1,
+            payload=(section_tag, entry)))
+
+    def reset_snippets(self, snippet_source):
+        """Drops the @name completions; they are rebuilt from snippet_source on next use"""
+        trie_id = id(self._snippets)
+        self._known = {marker for marker in self._known if marker[0] != trie_id}
+        self._snippets = PrefixTrie()
+        self._snippet_source = snippet_source
+        self._last = (None, _EMPTY)
+
+    def _load_snippets(self):
+        source, self._snippet_source = self._snippet_source, None
+        if source is not None:
+            for section_tag, entry in source():
+                self.add_snippet(section_tag, entry)
+
+    def suggest(self, text):
+        """Returns the completions for the raw command bar text (cached for the last text)"""
+        if text == self._last[0]:
+            return self._last[1]
+        val = text.strip().lower()
+        command = val.split(maxsplit=1)[0] if val else ""
+        if command in BUILTIN_COMMANDS:
+            result = _EMPTY
+        elif val.startswith("///"):
+            result = self._sub.complete(val[3:].strip())
+        elif val.startswith("//"):
+            result = self._sub.complete(val[2:].strip())
+        elif val.startswith("/"):
+            result = self._top.complete(val[1:].strip())
+        elif val.startswith("@"):
+            self._load_snippets()
+            result = self._snippets.complete(val[1:].strip())
+        else:
+            result = _EMPTY
+        self._last = (text, result)
+        return result
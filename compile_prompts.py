@@ -0,0 +1,215 @@
+"""Compile prompt definitions to nested XML without the GUI.
+
+A definition is the same tag/level structure the command bar builds:
+
+    {"id": "support-bot", "blocks": [
+        {"tag": "role", "text": "You are a support agent."},
+        {"tag": "//examples", "text": "..."},            # slashes set the level
+        {"tag": "tone", "level": 3, "text": "Friendly"}
+    ]}
+
+Input is JSONL on stdin (one definition per line), or files: .jsonl, .json (one
+definition, a list, or {"prompts": [...]}) and .yaml/.yml (needs PyYAML).
+Output is streamed as JSONL {"id", "prompt"} (or raw prompts with --format text),
+in input order, with only a bounded number of batches in flight.
+
+    python compile_prompts.py prompts.jsonl -o compiled.jsonl
+    cat prompts.jsonl | python compile_prompts.py --workers 8 > compiled.jsonl
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from prompt_compiler import PromptCompiler
+from prompt_document import MAX_LEVEL, BlockData
+
+BATCH_SIZE = 500          # definitions per task sent to a worker
+IN_FLIGHT_PER_WORKER = 4  # batches queued per worker before we stop reading input
+
+
+class DefinitionError(ValueError):
+    pass
+
+
+# --- Compiling ---
+
+def parse_block(spec):
+    if not isinstance(spec, dict):
+        raise DefinitionError(f"block must be an object, got {type(spec).__name__}")
+    tag = str(spec.get("tag", "")).strip()
+    slashes = len(tag) - len(tag.lstrip("/"))
+    tag = tag.lstrip("/").strip()
+    if not tag:
+        raise DefinitionError("block without a tag")
+    level = slashes or spec.get("level", 1)
+    if not isinstance(level, int) or not 1 <= level <= MAX_LEVEL:
+        raise DefinitionError(f"level for {tag!r} must be 1-{MAX_LEVEL}, got {level!r}")
+    return BlockData(tag.upper(), level, text=str(spec.get("text", "")))
+
+
+def compile_definition(definition, escape=False):
+    """Returns (id, prompt). Same nesting rules as the GUI's generate_nested_xml."""
+    if not isinstance(definition, dict) or not isinstance(definition.get("blocks"), list):
+        raise DefinitionError('definition needs a "blocks" list')
+    blocks = [parse_block(spec) for spec in definition["blocks"]]
+    compiler = PromptCompiler(escape=escape, text_of=lambda block: block.text)
+    return definition.get("id"), compiler.compile(blocks)
+
+
+def format_record(prompt_id, prompt, error, fmt):
+    if fmt == "text":
+        if prompt is None:
+            print(f"Error compiling {prompt_id}: {error}", file=sys.stderr)
+            return ""
+        return prompt + "\n\n"
+    if prompt is None:
+        return json.dumps({"id": prompt_id, "error": error}) + "\n"
+    return json.dumps({"id": prompt_id, "prompt": prompt}, ensure_ascii=False) + "\n"
+
+
+def compile_batch(batch, escape=False, fmt="jsonl"):
+    """Worker entry point. Items are JSON lines (str) or parsed definitions.
+    Returns (formatted output, prompts compiled, error count), so the parent
+    only has to copy text to the output. Error records don't count as prompts."""
+    lines = []
+    compiled = errors = 0
+    for position, item in batch:
+        try:
+            definition = json.loads(item) if isinstance(item, str) else item
+            prompt_id, prompt = compile_definition(definition, escape)
+        except (ValueError, TypeError) as e:
+            errors += 1
+            lines.append(format_record(position, None, str(e), fmt))
+            continue
+        compiled += 1
+        lines.append(format_record(prompt_id if prompt_id is not None else position, prompt, None, fmt))
+    return "".join(lines), compiled, errors
+
+
+# --- Input ---
+
+def iter_file(path):
+    lower = path.lower()
+    if lower.endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError:
+            sys.exit("Error: reading YAML needs PyYAML (pip install pyyaml)")
+        with open(path, encoding="utf-8") as f:
+            for document in yaml.safe_load_all(f):
+                yield from definitions_in(document)
+    elif lower.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            yield from definitions_in(json.load(f))
+    else:
+        # JSONL: lines go to the workers unparsed, so parsing runs in parallel too
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield line
+
+
+def definitions_in(document):
+    if isinstance(document, dict) and isinstance(document.get("prompts"), list):
+        yield from document["prompts"]
+    elif isinstance(document, list):
+        yield from document
+    elif document is not None:
+        yield document
+
+
+def iter_inputs(paths):
+    if not paths or paths == ["-"]:
+        for line in sys.stdin:
+            if line.strip():
+                yield line
+        return
+    for path in paths:
+        yield from iter_file(path)
+
+
+def iter_batches(items, size):
+    batch = []
+    for position, item in enumerate(items):
+        batch.append((position, item))
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# --- Running ---
+
+def run(items, out, workers, batch_size=BATCH_SIZE, fmt="jsonl", escape=False):
+    """Compiles everything in `items` and writes it to `out` in input order.
+    Returns counts of prompts compiled, errors and bytes written."""
+    stats = {"prompts": 0, "errors": 0, "bytes": 0}
+
+    def write(result):
+        text, compiled, errors = result
+        out.write(text)
+        stats["prompts"] += compiled
+        stats["errors"] += errors
+        stats["bytes"] += len(text)
+
+    batches = iter_batches(items, batch_size)
+    if workers <= 1:
+        for batch in batches:
+            write(compile_batch(batch, escape, fmt))
+        return stats
+
+    # Bounded window of batches: reading input waits on the oldest result, so
+    # memory stays flat no matter how long the input is
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for batch in batches:
+            pending.append(pool.submit(compile_batch, batch, escape, fmt))
+            if len(pending) >= workers * IN_FLIGHT_PER_WORKER:
+                write(pending.popleft().result())
+        while pending:
+            write(pending.popleft().result())
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile prompt definitions to nested XML.")
+    parser.add_argument("inputs", nargs="*", help="JSON/JSONL/YAML files; JSONL on stdin if omitted or -")
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    parser.add_argument("--format", choices=["jsonl", "text"], default="jsonl")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="worker processes; 1 compiles in this process")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--escape", action="store_true", help="XML-escape block text")
+    parser.add_argument("--quiet", action="store_true", help="skip the throughput report")
+    args = parser.parse_args(argv)
+
+    out = open(args.output, "w", encoding="utf-8", newline="\n") if args.output else sys.stdout
+    started = time.perf_counter()
+    try:
+        stats = run(iter_inputs(args.inputs), out, args.workers, args.batch_size, args.format, args.escape)
+        out.flush()
+    except BrokenPipeError:
+        # Downstream stopped reading (e.g. | head); not an error for a filter
+        sys.stdout = open(os.devnull, "w")
+        return 0
+    finally:
+        if out is not sys.stdout and out is not sys.__stdout__:
+            out.close()
+    elapsed = time.perf_counter() - started
+
+    if not args.quiet:
+        rate = stats["prompts"] / elapsed if elapsed else 0.0
+        mb = stats["bytes"] / 1e6
+        print(f"{stats['prompts']} prompts ({stats['errors']} errors) in {elapsed:.2f} s: "
+              f"{rate:,.0f} prompts/s, {mb / elapsed if elapsed else 0:.1f} MB/s output, "
+              f"{args.workers} worker(s)", file=sys.stderr)
+    return 1 if stats["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
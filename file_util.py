@@ -0,0 +1,51 @@
+"""Small file helpers shared by the snippet library, the workspace and code ingest"""
+
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def atomic_write(path, data: bytes):
+    """Write to a temp file, fsync it, then swap it in so readers never see half a file"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class FileLock:
+    """Advisory lock file shared by every process (e.g. several web workers) using the same files"""
+
+    def __init__(self, path):
+        self.path = path
+
+    @contextmanager
+    def hold(self, blocking=True):
+        """Yields True once the lock is held, or False right away if blocking=False and it is taken"""
+        with open(self.path, "a+b") as f:
+            f.seek(0)
+            try:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+                else:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+            except OSError:
+                if blocking:
+                    raise
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
@@ -0,0 +1,120 @@
+import asyncio
+import os
+import random
+import threading
+import time
+
+from llm_hedge import CircuitOpenError, is_quota_error
+
+# Tune to the account's quota; 429s beyond this are retried with backoff,
+# and calls turned away by an open circuit breaker wait for it to close
+DEFAULT_CONCURRENCY = int(os.getenv("GEMINI_CONCURRENCY", "4"))
+DEFAULT_RATE = float(os.getenv("GEMINI_RPS", "5"))   # requests per second, sustained
+DEFAULT_BURST = 5
+MAX_RETRIES = 4
+BACKOFF_BASE = 0.5        # seconds
+BACKOFF_CAP = 8.0
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, up to `capacity` banked"""
+
+    def __init__(self, rate=DEFAULT_RATE, capacity=DEFAULT_BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self):
+        """Takes a token and returns 0, or returns how long to wait for one"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+    async def acquire_async(self):
+        while True:
+            wait = self._take()
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+
+def _retry_delay(exc, attempt, base, cap):
+    """Seconds to wait before retrying exc, or None if it isn't worth retrying"""
+    jitter = random.uniform(0, min(cap, base * 2 ** attempt))
+    if isinstance(exc, CircuitOpenError):
+        return exc.retry_after + jitter  # jitter so the waiters don't all come back at once
+    return jitter if is_quota_error(exc) else None
+
+
+async def call_with_retry_async(fn, *args, retries=MAX_RETRIES, base=BACKOFF_BASE, cap=BACKOFF_CAP, bucket=None):
+    """Awaits fn(*args), retrying quota errors with full-jitter exponential backoff, and an open
+    circuit once the breaker is due to let a call through again"""
+    attempt = 0
+    while True:
+        if bucket is not None:
+            await bucket.acquire_async()
+        try:
+            return await fn(*args)
+        except Exception as e:
+            delay = _retry_delay(e, attempt, base, cap) if attempt < retries else None
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+async def run_batch_async(items, fn, concurrency=DEFAULT_CONCURRENCY, rate=DEFAULT_RATE, burst=DEFAULT_BURST,
+                          on_result=None, retries=MAX_RETRIES, backoff=BACKOFF_BASE, ordered=True):
+    """Awaits fn(item) for every item, on the caller's event loop, with retries
+    (call_with_retry_async) and a rate limit. Returns [(result, error), ...].
+
+    `concurrency` workers pull items one at a time, so no more than that many
+    calls are ever in flight. on_result(index, item, result, error) fires in
+    submission order, or with ordered=False as each call finishes. Cancelling
+    the awaiting task cancels every call still running.
+    """
+    bucket = TokenBucket(rate, burst) if rate else None
+    results = [None] * len(items)
+    done = [False] * len(items)
+    next_to_emit = 0
+    queue = iter(enumerate(items))
+
+    def emit(index):
+        if on_result is None:
+            return
+        result, error = results[index]
+        try:
+            on_result(index, items[index], result, error)
+        except Exception as e:
+            print(f"Error in batch result handler: {e}")
+
+    async def worker():
+        nonlocal next_to_emit
+        for index, item in queue:
+            try:
+                results[index] = (await call_with_retry_async(fn, item, retries=retries, base=backoff,
+                                                              bucket=bucket), None)
+            except Exception as e:
+                results[index] = (None, e)
+            done[index] = True
+            if not ordered:
+                emit(index)
+                continue
+            while next_to_emit < len(items) and done[next_to_emit]:
+                emit(next_to_emit)
+                next_to_emit += 1
+
+    workers = [asyncio.ensure_future(worker()) for _ in range(min(concurrency, len(items)))]
+    try:
+        await asyncio.gather(*workers)
+    finally:
+        for task in workers:
+            task.cancel()
+    return results
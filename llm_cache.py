@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Point several machines at the same file to share forged personas.
+CACHE_PATH = os.getenv(
+    "PROMPTMASTER_LLM_CACHE_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "promptmaster", "llm_cache.sqlite3"),
+)
+CACHE_ENABLED = os.getenv("PROMPTMASTER_LLM_CACHE", "1") != "0"
+MAX_BYTES = int(os.getenv("PROMPTMASTER_LLM_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+TTL_SECONDS = float(os.getenv("PROMPTMASTER_LLM_CACHE_TTL", str(30 * 24 * 3600)))
+
+
+def cache_key(model, prompt, config, backend=None):
+    """Hash of everything that changes the answer. Transport options (timeouts) are left out.
+    `backend` is the endpoint for anything but the real API (a base_url, the stub), so its
+    answers never come back for a real call."""
+    config = {k: v for k, v in config.items() if k != "http_options"}
+    key = {"model": model, "prompt": prompt, "config": config}
+    if backend:
+        key["backend"] = backend
+    blob = json.dumps(key, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """LRU response store in SQLite, with a size cap and TTL.
+
+    SQLite's file locking (WAL mode plus a busy timeout) keeps it safe when
+    several app instances share one file. Each thread gets its own connection.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_bytes=MAX_BYTES, ttl=TTL_SECONDS, enabled=CACHE_ENABLED):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+                " created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed)")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, hit):
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        try:
+            conn = self._conn()
+            row = conn.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            now = time.time()
+            if row is None:
+                self._count(False)
+                return None
+            if now - row[1] > self.ttl:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._count(False)
+                return None
+            conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._count(True)
+            return row[0]
+        except sqlite3.Error as e:
+            print(f"LLM cache read failed: {e}")
+            return None
+
+    def put(self, key, value):
+        if not self.enabled or value is None:
+            return
+        try:
+            conn = self._conn()
+            now = time.time()
+            size = len(value.encode("utf-8"))
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                    (key, value, size, now, now),
+                )
+                conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+                self._evict(conn)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            print(f"LLM cache write failed: {e}")
+
+    def _evict(self, conn):
+        """Drops least recently used entries until the store fits under max_bytes"""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        while total > self.max_bytes:
+            row = conn.execute("SELECT key, size FROM responses ORDER BY accessed LIMIT 1").fetchone()
+            if row is None:
+                break
+            conn.execute("DELETE FROM responses WHERE key = ?", (row[0],))
+            total -= row[1]
+
+    def clear(self):
+        self._conn().execute("DELETE FROM responses")
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "enabled": self.enabled, "path": self.path}
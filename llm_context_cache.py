@@ -0,0 +1,233 @@
+"""Gemini context caching for prompts that share a long, stable prefix.
+
+Prompts built in the editor usually differ only in their TASK: the ROLE,
+CONTEXT and CONSTRAINTS in front stay the same from call to call. The first
+time a prefix is seen the full prompt goes out as usual and, alongside it, the
+prefix is registered as cached content with a TTL. Later calls send only the
+suffix plus the cache handle, so the prefix is neither uploaded nor processed
+again. Handles are tracked here with their expiry, extended while in use, and
+recreated if the server has dropped them.
+
+The backend is anything with the four async methods of GeminiCacheBackend;
+llm_stub.StubBackend fakes the REST endpoints for offline runs.
+"""
+import asyncio
+import hashlib
+import math
+import os
+import threading
+import time
+
+from prompt_compiler import PromptCompiler
+
+CACHE_TTL = int(os.getenv("GEMINI_CACHE_TTL", "600"))            # seconds
+MIN_CACHE_TOKENS = int(os.getenv("GEMINI_CACHE_MIN_TOKENS", "1024"))  # Gemini won't cache less
+REFRESH_MARGIN = 60  # seconds; a handle closer than this to expiry is extended before use
+STABLE_TAGS = ("ROLE", "CONTEXT", "CONSTRAINTS")
+
+
+def split_prompt(blocks, stable_tags=STABLE_TAGS, escape=False):
+    """(prefix, suffix) of the compiled prompt, split before the first top-level
+    block whose tag isn't stable. prefix + "\\n" + suffix is the full prompt;
+    either side may be empty."""
+    blocks = list(blocks)
+    cut = 0
+    for i, block in enumerate(blocks):
+        if block.indent_level == 1 and block.tag_name.upper() not in stable_tags:
+            break
+        cut = i + 1  # children of a stable block go with it
+    compiler = PromptCompiler(escape=escape, text_of=lambda block: block.text)
+    return compiler.compile(blocks[:cut]), compiler.compile(blocks[cut:])
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / 4)
+
+
+def cached_tokens(response):
+    """Input tokens the server says it served from cached content"""
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, "cached_content_token_count", None) or 0
+
+
+def is_not_found(exc):
+    """404 / NOT_FOUND: the server no longer has the cached content"""
+    if getattr(exc, "code", None) == 404 or getattr(exc, "status_code", None) == 404:
+        return True
+    return "NOT_FOUND" in str(exc)
+
+
+class CacheHandle:
+    __slots__ = ("name", "model", "tokens", "expires_at", "full_latency", "hits")
+
+    def __init__(self, name, model, tokens, expires_at):
+        self.name = name
+        self.model = model
+        self.tokens = tokens
+        self.expires_at = expires_at
+        self.full_latency = None  # seconds the uncached call took, to estimate savings
+        self.hits = 0
+
+
+class ContextCacheStats:
+    """Running totals; report() is a one-line summary"""
+
+    def __init__(self):
+        self.calls = 0
+        self.hits = 0
+        self.misses = 0           # full prompt sent, prefix being registered
+        self.bypassed = 0         # prefix too small to cache
+        self.created = 0
+        self.extended = 0
+        self.recreated = 0        # server had dropped a handle we thought was live
+        self.tokens_saved = 0     # input tokens served from the cache
+        self.latency_saved = 0.0  # seconds, against the prefix's uncached call
+
+    def report(self):
+        return (f"{self.calls} calls: {self.hits} hits, {self.misses} misses, {self.bypassed} too small | "
+                f"{self.created} caches created, {self.extended} extended, {self.recreated} recreated | "
+                f"saved {self.tokens_saved:,} input tokens, ~{self.latency_saved * 1000:.0f} ms")
+
+
+class GeminiCacheBackend:
+    """Context caching through the google-genai async client"""
+
+    def __init__(self, get_client):
+        self.get_client = get_client
+
+    async def create(self, model, prefix, ttl):
+        """Returns (name, expires_at epoch, token count)"""
+        cache = await self.get_client().aio.caches.create(
+            model=model,
+            config={"contents": [prefix], "ttl": f"{ttl}s", "display_name": "promptmaster-prefix"},
+        )
+        usage = getattr(cache, "usage_metadata", None)
+        tokens = getattr(usage, "total_token_count", None) or estimate_tokens(prefix)
+        return cache.name, cache.expire_time.timestamp(), tokens
+
+    async def extend(self, name, ttl):
+        cache = await self.get_client().aio.caches.update(name=name, config={"ttl": f"{ttl}s"})
+        return cache.expire_time.timestamp()
+
+    async def delete(self, name):
+        await self.get_client().aio.caches.delete(name=name)
+
+    async def generate(self, model, contents, config, cached_content=None):
+        """Returns the SDK response, for its text and usage_metadata"""
+        if cached_content is not None:
+            config = dict(config, cached_content=cached_content)
+        return await self.get_client().aio.models.generate_content(model=model, contents=contents, config=config)
+
+
+class ContextCache:
+    """Prefix -> cache handle bookkeeping. Use from one event loop."""
+
+    def __init__(self, backend, ttl=CACHE_TTL, min_tokens=MIN_CACHE_TOKENS):
+        self.backend = backend
+        self.ttl = ttl
+        self.min_tokens = min_tokens
+        self.stats = ContextCacheStats()
+        self._handles = {}   # key -> CacheHandle
+        self._creating = {}  # key -> Task registering the prefix
+        self._lock = threading.Lock()  # stats are read from other threads
+
+    @staticmethod
+    def key(model, prefix):
+        return hashlib.sha256(f"{model}\0{prefix}".encode("utf-8")).hexdigest()
+
+    def handles(self):
+        """Live handles, for display: [(name, tokens, seconds left, hits)]"""
+        now = time.time()
+        return [(h.name, h.tokens, h.expires_at - now, h.hits) for h in self._handles.values() if h.expires_at > now]
+
+    def _count(self, **deltas):
+        with self._lock:
+            for name, value in deltas.items():
+                setattr(self.stats, name, getattr(self.stats, name) + value)
+
+    async def _register(self, key, model, prefix):
+        try:
+            name, expires_at, tokens = await self.backend.create(model, prefix, self.ttl)
+        except Exception as e:
+            print(f"Error creating context cache: {e}")
+            return None
+        handle = CacheHandle(name, model, tokens, expires_at)
+        self._handles[key] = handle
+        self._count(created=1)
+        return handle
+
+    async def _usable(self, key):
+        """The handle for `key` if it is live, extending it when it's about to expire"""
+        handle = self._handles.get(key)
+        if handle is None:
+            return None
+        remaining = handle.expires_at - time.time()
+        if remaining > min(REFRESH_MARGIN, self.ttl / 4):
+            return handle
+        if remaining <= 1:
+            del self._handles[key]
+            return None
+        try:
+            handle.expires_at = await self.backend.extend(handle.name, self.ttl)
+        except Exception as e:
+            print(f"Error extending context cache: {e}")
+            self._handles.pop(key, None)
+            return None
+        self._count(extended=1)
+        return handle
+
+    async def generate(self, model, prefix, suffix, config):
+        """Response to prefix + suffix, using (or setting up) a cache for the prefix"""
+        self._count(calls=1)
+        full_prompt = f"{prefix}\n{suffix}" if prefix and suffix else prefix or suffix
+        if not prefix or not suffix or estimate_tokens(prefix) < self.min_tokens:
+            self._count(bypassed=1)
+            return await self.backend.generate(model, full_prompt, config)
+
+        key = self.key(model, prefix)
+        handle = await self._usable(key)
+        if handle is not None:
+            started = time.perf_counter()
+            try:
+                response = await self.backend.generate(model, suffix, config, handle.name)
+            except Exception as e:
+                if not is_not_found(e):
+                    raise
+                # Evicted early (or deleted elsewhere): forget it and take the miss path
+                self._handles.pop(key, None)
+                self._count(recreated=1)
+            else:
+                elapsed = time.perf_counter() - started
+                handle.hits += 1
+                saved = handle.full_latency - elapsed if handle.full_latency is not None else 0.0
+                self._count(hits=1, tokens_saved=cached_tokens(response) or handle.tokens,
+                            latency_saved=max(saved, 0.0))
+                return response
+
+        # Miss: the full prompt goes out now, and the prefix is registered alongside it
+        self._count(misses=1)
+        task = self._creating.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._register(key, model, prefix))
+            self._creating[key] = task
+            task.add_done_callback(lambda _: self._creating.pop(key, None))
+        started = time.perf_counter()
+        response = await self.backend.generate(model, full_prompt, config)
+        elapsed = time.perf_counter() - started
+
+        def note_latency(done):
+            handle = None if done.cancelled() else done.result()
+            if handle is not None and handle.full_latency is None:
+                handle.full_latency = elapsed
+        task.add_done_callback(note_latency)  # runs right away if it has already finished
+        return response
+
+    async def close(self):
+        """Deletes every cache we created; they would expire on their own, but cost storage until then"""
+        handles, self._handles = list(self._handles.values()), {}
+        for handle in handles:
+            try:
+                await self.backend.delete(handle.name)
+            except Exception as e:
+                if not is_not_found(e):
+                    print(f"Error deleting context cache: {e}")
@@ -0,0 +1,177 @@
+"""Tail-latency helpers for LLM calls: adaptive hedging, deadlines and a circuit breaker."""
+import asyncio
+import threading
+import time
+from collections import deque
+
+HEDGE_DEFAULT = 2.0       # seconds to wait before hedging, until we have latency samples
+HEDGE_MIN = 0.05
+HEDGE_MAX = 10.0
+MIN_SAMPLES = 20
+WINDOW = 200
+
+BREAKER_THRESHOLD = 5     # consecutive failures before the breaker opens
+BREAKER_RESET = 30.0      # seconds before a trial call is let through again
+
+
+class CircuitOpenError(RuntimeError):
+    def __init__(self, message, retry_after=0.0):
+        super().__init__(message)
+        self.retry_after = retry_after  # seconds until the breaker lets a trial call through
+
+
+def is_quota_error(exc):
+    """429 / RESOURCE_EXHAUSTED from the Gemini API (or the stub)"""
+    if getattr(exc, "code", None) == 429 or getattr(exc, "status_code", None) == 429:
+        return True
+    return "RESOURCE_EXHAUSTED" in str(exc) or "429" in str(exc)
+
+
+class CallResult:
+    """Response text plus how we got it"""
+    __slots__ = ("text", "latency_ms", "attempts", "hedged", "winner", "cached", "usage")
+
+    def __init__(self, text, latency_ms, attempts=1, hedged=False, winner=1, cached=False, usage=None):
+        self.text = text
+        self.latency_ms = latency_ms
+        self.attempts = attempts  # requests actually sent
+        self.hedged = hedged      # whether a second request was fired
+        self.winner = winner      # which attempt answered (1-based)
+        self.cached = cached
+        self.usage = usage        # {"prompt", "output", "total"} token counts, when the call reports them
+
+    def __repr__(self):
+        return (f"CallResult({self.latency_ms:.0f} ms, attempts={self.attempts}, "
+                f"hedged={self.hedged}, winner={self.winner}, cached={self.cached})")
+
+
+class LatencyTracker:
+    """Sliding window of recent successful call latencies"""
+
+    def __init__(self, window=WINDOW, default=HEDGE_DEFAULT, min_samples=MIN_SAMPLES):
+        self.default = default
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q):
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def hedge_delay(self):
+        """p95 of recent calls; slower than that is worth a second request"""
+        if len(self._samples) < self.min_samples:
+            return self.default
+        return min(HEDGE_MAX, max(HEDGE_MIN, self.percentile(0.95)))
+
+
+class CircuitBreaker:
+    """Fails fast after repeated errors instead of making every caller wait for a timeout.
+
+    closed -> open after `threshold` consecutive failures; after `reset_after`
+    seconds one trial call goes through (half-open) and decides which way it flips.
+    Quota errors don't count: the service is up, we're just over our share, and
+    the caller's backoff deals with that.
+    """
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, reset_after=BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_after:
+            return "half_open"
+        return "open"
+
+    def retry_after(self):
+        """Seconds until a trial call is let through; 0 when calls go through now"""
+        with self._lock:
+            if self.opened_at is None:
+                return 0.0
+            return max(0.0, self.opened_at + self.reset_after - time.monotonic())
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self, exc=None):
+        with self._lock:
+            self._trial = False  # a trial that hit the quota just lets the next one through
+            if exc is not None and is_quota_error(exc):
+                return
+            self.failures += 1
+            if self.opened_at is not None or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+async def hedged(make_attempt, deadline, hedge_delay, max_attempts=2):
+    """Runs make_attempt() and, if it hasn't answered after hedge_delay, a second copy.
+
+    The first successful attempt wins and the others are cancelled (which closes
+    their connections). A failed attempt starts the next one right away, unless it
+    failed on quota: another request then would only add to the overload, so no
+    more are started. Raises TimeoutError once `deadline` seconds pass without an answer.
+    Returns (value, attempts_started, winning_attempt).
+    """
+    loop = asyncio.get_running_loop()
+    give_up = loop.time() + deadline
+    tasks = {}  # task -> attempt number
+    last_error = None
+
+    def launch():
+        tasks[asyncio.ensure_future(make_attempt())] = len(tasks) + 1
+
+    launch()
+    try:
+        while True:
+            remaining = give_up - loop.time()
+            if remaining <= 0:
+                raise TimeoutError(f"no response within {deadline:.1f} s")
+            pending = [t for t in tasks if not t.done()]
+            can_hedge = len(tasks) < max_attempts and not is_quota_error(last_error)
+            if not pending:
+                # Everything so far failed
+                if not can_hedge:
+                    raise last_error
+                launch()
+                continue
+
+            wait = min(remaining, hedge_delay) if can_hedge else remaining
+            done, _ = await asyncio.wait(pending, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result(), len(tasks), tasks[task]
+                last_error = task.exception()
+
+            if not done and can_hedge and loop.time() < give_up:
+                launch()  # first attempt is slower than usual: race a second one
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
@@ -1,27 +1,281 @@
 from google import genai
+from google.genai import types
+import asyncio
+import atexit
 import os
+import threading
+import time
 from dotenv import load_dotenv
+from llm_cache import ResponseCache, cache_key
+import perf
+from llm_hedge import CallResult, CircuitBreaker, CircuitOpenError, LatencyTracker, hedged
+from llm_context_cache import ContextCache, GeminiCacheBackend
 load_dotenv()
 
-def get_response(prompt):
-    client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
-    config = {
-        "temperature": 0.1,
-        "top_p": 0.9,
-        # We keep safety settings loose to avoid false positives
-        "safety_settings": [
-            {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
-            {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
-            {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
-            {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
-        ]
-    }
-    
-    response = client.models.generate_content(
-        model="gemini-2.5-flash",
-        contents=prompt,
-        config=config
-    )
-    return response.text
-
-# print(get_response("Tell me a joke"))
\ No newline at end of file
+MODEL = "gemini-2.5-flash"
+
+# Seconds; per-call timeouts override this
+DEFAULT_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "60"))
+
+# GEMINI_HEDGE=0 turns off the backup request fired when a call runs past the recent p95
+HEDGE_ENABLED = os.getenv("GEMINI_HEDGE", "1") != "0"
+
+# Point the SDK somewhere else, e.g. the local llm_stub server
+BASE_URL = os.getenv("GEMINI_BASE_URL")
+
+GENERATION_CONFIG = {
+    "temperature": 0.1,
+    "top_p": 0.9,
+    # We keep safety settings loose to avoid false positives
+    "safety_settings": [
+        {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
+        {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
+        {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
+        {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
+    ]
+}
+
+# Shared on-disk memo of past answers; PROMPTMASTER_LLM_CACHE=0 turns it off
+response_cache = ResponseCache()
+
+# Shared across calls: recent latencies drive the hedge delay, errors trip the breaker
+latency_tracker = LatencyTracker()
+breaker = CircuitBreaker()
+
+# Stable prompt prefixes (prefix= below) are registered as Gemini cached content;
+# context_cache.stats reports the tokens and time that saved
+context_cache = ContextCache(GeminiCacheBackend(lambda: get_client()))
+
+_client = None
+_client_lock = threading.Lock()
+_settings = {"api_key": None, "base_url": BASE_URL, "timeout": DEFAULT_TIMEOUT}
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def configure(api_key=None, base_url=None, timeout=None):
+    """Changes client settings. The shared client is rebuilt on next use."""
+    global _client
+    with _client_lock:
+        if api_key is not None:
+            _settings["api_key"] = api_key
+        if base_url is not None:
+            _settings["base_url"] = base_url
+        if timeout is not None:
+            _settings["timeout"] = timeout
+        _client = None
+
+
+def get_client():
+    """One long-lived client per process, so calls reuse its pooled HTTP connections"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = genai.Client(
+                api_key=_settings["api_key"] or os.getenv("GEMINI_API_KEY"),
+                http_options=types.HttpOptions(
+                    base_url=_settings["base_url"],
+                    timeout=int(_settings["timeout"] * 1000),
+                ),
+            )
+        return _client
+
+
+def forge_prompt(archetype_text):
+    """Meta-prompt that turns a short archetype into a full System Role"""
+    return f"""
+            Act as an expert Prompt Engineer.
+            Generate a detailed, high-quality System Role (Persona) based on this brief description: "{archetype_text}".
+            
+            Requirements:
+            1. Start directly with "You are..."
+            2. Define the Tone, Style, and Philosophy of the persona.
+            3. Keep it under 150 words.
+            4. Be specific and distinct.
+            """
+
+
+def build_config(timeout=None, **overrides):
+    config = dict(GENERATION_CONFIG, **overrides)
+    if timeout is not None:
+        config["http_options"] = {"timeout": int(timeout * 1000)}
+    return config
+
+
+def _background_loop():
+    """All async SDK traffic runs on this one loop, so the aio client's pool stays valid"""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="llm-loop", daemon=True).start()
+            atexit.register(_close_context_cache)
+        return _loop
+
+
+def _close_context_cache():
+    # Cached content is billed for storage until its TTL runs out
+    if context_cache.handles():
+        try:
+            asyncio.run_coroutine_threadsafe(context_cache.close(), _loop).result(timeout=5)
+        except Exception as e:
+            print(f"Error deleting context caches: {e}")
+
+
+def _cache_key(model, prompt, config):
+    return cache_key(model, prompt, config, backend=_settings["base_url"])
+
+
+def _check_breaker():
+    if not breaker.allow():
+        wait = breaker.retry_after()
+        raise CircuitOpenError(f"Gemini calls failing, paused for {wait:.0f} s", retry_after=wait)
+
+
+def _usage(response):
+    usage = getattr(response, "usage_metadata", None)
+    prompt_tokens = getattr(usage, "prompt_token_count", None) or 0
+    output_tokens = getattr(usage, "candidates_token_count", None) or 0
+    total = getattr(usage, "total_token_count", None) or prompt_tokens + output_tokens
+    return {"prompt": prompt_tokens, "output": output_tokens, "total": total}
+
+
+async def _call(prompt, deadline, model, use_cache, hedge, prefix=None, overrides=None):
+    started = time.perf_counter()
+    deadline = deadline or _settings["timeout"]
+    config = build_config(deadline, **(overrides or {}))
+    key = _cache_key(model, f"{prefix}\n{prompt}" if prefix else prompt, config) if use_cache else None
+    cached = response_cache.get(key) if key else None
+    if cached is not None:
+        return CallResult(cached, (time.perf_counter() - started) * 1000, attempts=0, cached=True)
+
+    _check_breaker()
+    client = get_client()
+
+    async def attempt():
+        attempt_started = time.perf_counter()
+        if prefix:
+            response = await context_cache.generate(model, prefix, prompt, config)
+        else:
+            response = await client.aio.models.generate_content(
+                model=model,
+                contents=prompt,
+                config=config
+            )
+        latency_tracker.record(time.perf_counter() - attempt_started)
+        return response
+
+    hedge_delay = latency_tracker.hedge_delay() if hedge else deadline
+    try:
+        response, attempts, winner = await hedged(attempt, deadline, hedge_delay, max_attempts=2 if hedge else 1)
+    except Exception as e:
+        breaker.record_failure(e)
+        raise
+    breaker.record_success()
+    text = response.text
+    if key:
+        response_cache.put(key, text)
+    return CallResult(text, (time.perf_counter() - started) * 1000, attempts, attempts > 1, winner,
+                      usage=_usage(response))
+
+
+@perf.timed("get_response")
+def get_response_result(prompt, timeout=None, model=MODEL, use_cache=True, hedge=HEDGE_ENABLED, prefix=None):
+    """get_response with latency/attempt metadata. `timeout` is the deadline for the
+    whole call, hedge included; past it a TimeoutError is raised.
+
+    With `prefix` (e.g. from llm_context_cache.split_prompt) the model sees
+    prefix + "\\n" + prompt, and the prefix is sent through a context cache."""
+    future = asyncio.run_coroutine_threadsafe(_call(prompt, timeout, model, use_cache, hedge, prefix),
+                                              _background_loop())
+    return future.result()
+
+
+def get_response(prompt, timeout=None, model=MODEL, use_cache=True, hedge=HEDGE_ENABLED, prefix=None):
+    return get_response_result(prompt, timeout, model, use_cache, hedge, prefix).text
+
+
+async def stream_response_async(prompt, timeout=None, model=MODEL, use_cache=True):
+    """Yields the response text in chunks as the model produces them, as an async
+    generator. A cached answer comes back as a single chunk. The request runs on
+    the SDK loop; chunks that arrive while the consumer is busy come out joined, so a
+    slow consumer takes fewer, bigger steps. Cancelling the consumer, or closing the
+    generator, cancels the request."""
+    config = build_config(timeout)
+    key = _cache_key(model, prompt, config) if use_cache else None
+    cached = response_cache.get(key) if key else None
+    if cached is not None:
+        yield cached
+        return
+
+    _check_breaker()
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    finished = object()
+
+    async def pump():
+        started = time.perf_counter()
+        parts = []
+        try:
+            stream = await get_client().aio.models.generate_content_stream(
+                model=model,
+                contents=prompt,
+                config=config
+            )
+            async for chunk in stream:
+                if chunk.text:
+                    if not parts:
+                        perf.observe("stream_first_token", time.perf_counter() - started)
+                    parts.append(chunk.text)
+                    loop.call_soon_threadsafe(queue.put_nowait, chunk.text)
+        except Exception as e:
+            breaker.record_failure(e)
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+            return
+        breaker.record_success()
+        perf.observe("stream_response", time.perf_counter() - started)
+        if key:
+            response_cache.put(key, "".join(parts))
+        loop.call_soon_threadsafe(queue.put_nowait, finished)
+
+    future = asyncio.run_coroutine_threadsafe(pump(), _background_loop())
+    try:
+        while True:
+            items = [await queue.get()]
+            while not queue.empty():
+                items.append(queue.get_nowait())
+            text = "".join(item for item in items if isinstance(item, str))
+            if text:
+                yield text
+            last = items[-1]
+            if last is finished:
+                return
+            if isinstance(last, Exception):
+                raise last
+    finally:
+        future.cancel()  # no-op once the stream has finished
+
+
+async def get_response_result_async(prompt, timeout=None, model=MODEL, use_cache=True, hedge=HEDGE_ENABLED,
+                                    prefix=None):
+    """Same as get_response_result, awaitable from any event loop"""
+    future = asyncio.run_coroutine_threadsafe(_call(prompt, timeout, model, use_cache, hedge, prefix),
+                                              _background_loop())
+    return await asyncio.wrap_future(future)
+
+
+async def get_response_async(prompt, timeout=None, model=MODEL, use_cache=True, hedge=HEDGE_ENABLED, prefix=None):
+    return (await get_response_result_async(prompt, timeout, model, use_cache, hedge, prefix)).text
+
+
+async def evaluate_async(prompt, model=MODEL, timeout=None, use_cache=True, hedge=HEDGE_ENABLED, prefix=None,
+                         **overrides):
+    """get_response_result_async with generation overrides (temperature=, top_p=...),
+    for comparing settings. Goes through the same response cache, hedging, breaker
+    and context cache as every other call; the overrides are part of the cache key.
+    A cached answer comes back with usage None."""
+    future = asyncio.run_coroutine_threadsafe(_call(prompt, timeout, model, use_cache, hedge, prefix, overrides),
+                                              _background_loop())
+    return await asyncio.wrap_future(future)
+
+# print(get_response("Tell me a joke"))
@@ -0,0 +1,267 @@
+"""Local stand-in for the Gemini REST API, for offline latency and throughput tests.
+
+    with StubBackend(delay=0.05) as stub:
+        llm_response.configure(api_key="stub", base_url=stub.url)
+        llm_response.get_response("hello")
+        print(stub.requests, stub.connections)
+
+Also fakes context caching (cachedContents create/get/patch/delete, and the
+cachedContent field of generateContent), with TTL expiry and usage metadata.
+"""
+import itertools
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def echo_reply(prompt):
+    return f"You are a stub persona for: {prompt.strip()[:80]}"
+
+
+def prompt_text(body):
+    parts = []
+    for content in body.get("contents", []):
+        for part in content.get("parts", []):
+            parts.append(part.get("text", ""))
+    return "".join(parts)
+
+
+def count_tokens(text):
+    return max(len(text) // 4, 1)
+
+
+def response_json(text, prompt_tokens=0, cached_tokens=0):
+    usage = {
+        "promptTokenCount": prompt_tokens,
+        "candidatesTokenCount": count_tokens(text),
+    }
+    if cached_tokens:
+        usage["cachedContentTokenCount"] = cached_tokens
+    return {
+        "candidates": [{
+            "content": {"role": "model", "parts": [{"text": text}]},
+            "finishReason": "STOP",
+        }],
+        "usageMetadata": usage,
+    }
+
+
+# How the real API names its error statuses
+_REASONS = {429: "RESOURCE_EXHAUSTED", 500: "INTERNAL", 503: "UNAVAILABLE", 504: "DEADLINE_EXCEEDED"}
+
+
+def _timestamp(epoch):
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def _expiry(body, now):
+    """Expiry time from a cachedContents body: {"ttl": "300s"} or {"expireTime": ...}"""
+    if "expireTime" in body:
+        return datetime.strptime(body["expireTime"].replace("Z", "+0000"), "%Y-%m-%dT%H:%M:%S.%f%z").timestamp()
+    return now + float(str(body.get("ttl", "3600s")).rstrip("s"))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse is visible
+    # Headers and body go out as separate writes; with Nagle on, a kept-alive connection
+    # waits out the client's delayed ACK (~40 ms) on every reply
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.stub.lock:
+            self.server.stub.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        try:
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client gave up (deadline, or a hedge won)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_error(self, status, message, reason):
+        self._send_json(status, {"error": {"code": status, "message": message, "status": reason}})
+
+    def do_POST(self):
+        stub = self.server.stub
+        body = self._read_body()
+        with stub.lock:
+            stub.requests += 1
+
+        if self.path.split("?")[0].endswith("/cachedContents"):
+            self._send_json(200, stub.create_cache(body))
+            return
+
+        # The cached prefix is already processed server side; only new input costs time
+        cached_text = ""
+        if body.get("cachedContent"):
+            cache = stub.get_cache(body["cachedContent"])
+            if cache is None:
+                self._send_error(404, f"CachedContent not found: {body['cachedContent']}", "NOT_FOUND")
+                return
+            cached_text = cache["text"]
+        prompt = prompt_text(body)
+
+        delay = stub.delay(body) if callable(stub.delay) else stub.delay
+        delay += stub.token_delay * count_tokens(prompt)
+        if delay:
+            time.sleep(delay)
+
+        status = stub.status(body) if callable(stub.status) else stub.status
+        if status != 200:
+            self._send_error(status, "stub error", _REASONS.get(status, "UNKNOWN"))
+            return
+
+        text = stub.reply(cached_text + prompt)
+        cached_tokens = count_tokens(cached_text) if cached_text else 0
+        prompt_tokens = cached_tokens + count_tokens(prompt)
+        if ":streamGenerateContent" in self.path:
+            self._stream(text)
+        else:
+            self._send_json(200, response_json(text, prompt_tokens, cached_tokens))
+
+    def _cache_request(self, handle):
+        stub = self.server.stub
+        name = self.path.split("?")[0].split("/v1beta/", 1)[-1]
+        with stub.lock:
+            stub.requests += 1
+        cache = stub.get_cache(name)
+        if cache is None:
+            self._send_error(404, f"CachedContent not found: {name}", "NOT_FOUND")
+            return
+        self._send_json(200, handle(name, cache))
+
+    def do_GET(self):
+        self._cache_request(lambda name, cache: self.server.stub.cache_json(name))
+
+    def do_PATCH(self):
+        body = self._read_body()
+        self._cache_request(lambda name, cache: self.server.stub.update_cache(name, body))
+
+    def do_DELETE(self):
+        self._cache_request(lambda name, cache: self.server.stub.delete_cache(name))
+
+    def _stream(self, text):
+        """Server-sent events, one candidate chunk each, like ?alt=sse"""
+        stub = self.server.stub
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        size = max(len(text) // stub.chunks, 1)
+        try:
+            for i in range(0, len(text), size):
+                if i and stub.chunk_delay:
+                    time.sleep(stub.chunk_delay)
+                event = f"data: {json.dumps(response_json(text[i:i + size]))}\r\n\r\n".encode("utf-8")
+                self.wfile.write(f"{len(event):X}\r\n".encode("ascii") + event + b"\r\n")
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client cancelled mid-stream
+
+
+class StubBackend:
+    """Threaded HTTP server on 127.0.0.1 that answers generateContent calls.
+
+    delay:  seconds per request, or a callable taking the request body
+    reply:  callable prompt -> response text
+    status: HTTP status to answer with (e.g. 429 to simulate quota errors), or a
+            callable taking the request body
+    chunks, chunk_delay: how streamGenerateContent splits and paces the reply
+    token_delay: extra seconds per input token not served from a context cache
+    """
+
+    def __init__(self, delay=0.0, reply=echo_reply, status=200, chunks=8, chunk_delay=0.0, port=0,
+                 token_delay=0.0):
+        self.delay = delay
+        self.token_delay = token_delay
+        self.reply = reply
+        self.status = status
+        self.chunks = chunks
+        self.chunk_delay = chunk_delay
+        self.requests = 0
+        self.connections = 0
+        self.caches = {}        # name -> {"model", "text", "tokens", "expires", "created"}
+        self.caches_created = 0
+        self._cache_ids = itertools.count(1)
+        self.lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread = None
+
+    # --- Context caching ---
+
+    def create_cache(self, body):
+        now = time.time()
+        text = prompt_text(body)
+        with self.lock:
+            name = f"cachedContents/stub{next(self._cache_ids)}"
+            self.caches[name] = {"model": body.get("model", ""), "text": text, "tokens": count_tokens(text),
+                                 "expires": _expiry(body, now), "created": now}
+            self.caches_created += 1
+        return self.cache_json(name)
+
+    def get_cache(self, name):
+        """The live cache entry, or None once it has expired (expired entries are dropped)"""
+        with self.lock:
+            cache = self.caches.get(name)
+            if cache is not None and cache["expires"] <= time.time():
+                del self.caches[name]
+                cache = None
+            return cache
+
+    def cache_json(self, name):
+        cache = self.caches[name]
+        return {
+            "name": name,
+            "model": cache["model"],
+            "createTime": _timestamp(cache["created"]),
+            "updateTime": _timestamp(cache["created"]),
+            "expireTime": _timestamp(cache["expires"]),
+            "usageMetadata": {"totalTokenCount": cache["tokens"]},
+        }
+
+    def update_cache(self, name, body):
+        with self.lock:
+            self.caches[name]["expires"] = _expiry(body, time.time())
+        return self.cache_json(name)
+
+    def delete_cache(self, name):
+        with self.lock:
+            self.caches.pop(name, None)
+        return {}
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -1,11 +1,31 @@
 import flet as ft
 from prompt_blocks import PromptBlock
-from snippet_manager import SnippetManager 
-from llm_response import get_response
-import math
-import threading
-
-def main(page: ft.Page):
+from snippet_manager import shared_manager
+from token_counter import TokenCounter
+from ui_scheduler import UpdateScheduler
+from block_view import VirtualBlockList
+from prompt_document import PromptDocument
+from workspace_store import WorkspaceLocked, WorkspaceStore, new_workspace_key, workspace_path
+from attachments import Attachment
+from command_engine import CommandEngine
+from suggestion_pool import SuggestionRowPool
+from task_scope import TaskScope, run_cpu
+import perf
+import asyncio
+import importlib
+import os
+import shlex
+import time
+
+# The Gemini SDK (llm_response) and llm_batch are imported on first /forge,
+# or by warm_up() once the first frame is on screen.
+STARTUP_PROBE = os.getenv("PROMPTMASTER_STARTUP_PROBE")  # "1": announce the first frame, "exit": then quit
+IDLE_HINT = "TYPE / TO INITIATE..."
+WORKSPACE_KEY = "promptmaster.workspace"  # browser storage entry naming a web session's workspace
+
+async def main(page: ft.Page):
+    # Handlers that start long work are async: it runs as tasks on this session's
+    # loop, owned by `tasks`, so it can be cancelled; CPU work goes to run_cpu().
     # --- 1. App Configuration ---
     page.title = "PROMPT_MASTER_v1.0"
     page.theme_mode = ft.ThemeMode.DARK
@@ -13,7 +33,9 @@ def main(page: ft.Page):
     page.window_width = 800
     page.window_height = 900
     
-    snippet_mgr = SnippetManager()
+    snippet_mgr = shared_manager() # One library for every session, kept in sync across processes
+    ui = UpdateScheduler(page) # Batches control updates, at most one flush per frame
+    tasks = TaskScope() # In-flight work; a new command, CLEAR, ESC or closing the page cancels it
     
     NEON_COLORS = {
         "role":        ft.colors.CYAN_400,
@@ -31,7 +53,10 @@ def main(page: ft.Page):
         "last_main_key": "default",
         "temp_save_block": None, 
         "active_snippet_block": None,
-        "focused_block": None
+        "focused_block": None,
+        "snippet_results": [],
+        "forge": None, # {'data': BlockData} while a /forge task is running
+        "keystroke_at": None # perf_counter() of the last edit, only tracked with PROMPTMASTER_PERF=1
     }
     
     COMMANDS = {
@@ -57,11 +82,35 @@ def main(page: ft.Page):
         animate=ft.animation.Animation(500, "easeOutCubic"), 
     )
 
-    blocks_column = ft.Column(scroll=ft.ScrollMode.HIDDEN, expand=True)
+    # The prompt itself, UI-free; everything below renders it or edits it
+    document = PromptDocument()
+
+    # Only blocks near the viewport get real controls; the rest is plain BlockData
+    block_view = VirtualBlockList(ui, document, make_block=lambda data, lightweight: build_block_control(data, lightweight))
+    blocks_column = block_view.column
 
     suggestion_list = ft.ListView(height=0, spacing=2, padding=0)
+    suggestion_rows = SuggestionRowPool(suggestion_list) # Rows are reused, never rebuilt
+
+    command_engine = CommandEngine(COMMANDS, NEON_COLORS, snippet_source=snippet_mgr.all_snippets)
+
+    # Shown above the list while picking a snippet; filters as you type
+    snippet_filter_field = ft.TextField(
+        hint_text="FILTER SNIPPETS...",
+        hint_style=ft.TextStyle(color=ft.colors.GREEN_900, font_family="Courier New"),
+        bgcolor=ft.colors.BLACK,
+        color=ft.colors.GREEN_400,
+        cursor_color=ft.colors.GREEN_400,
+        text_style=ft.TextStyle(font_family="Courier New"),
+        border=ft.InputBorder.NONE,
+        content_padding=10,
+        visible=False,
+        on_change=lambda e: refresh_snippet_results(),
+        on_submit=lambda e: insert_top_snippet(),
+    )
+
     suggestion_container = ft.Container(
-        content=suggestion_list,
+        content=ft.Column([snippet_filter_field, suggestion_list], spacing=0),
         bgcolor=ft.colors.BLACK,
         visible=False,
         border=ft.border.all(1, ft.colors.GREEN_400),
@@ -71,14 +120,13 @@ def main(page: ft.Page):
     )
 
     command_input = ft.TextField(
-        hint_text="TYPE / TO INITIATE...",
+        hint_text=IDLE_HINT,
         hint_style=ft.TextStyle(color=ft.colors.GREEN_900, font_family="Courier New"),
         bgcolor=ft.colors.BLACK,
         color=ft.colors.GREEN_400,
         cursor_color=ft.colors.GREEN_400,
         text_style=ft.TextStyle(font_family="Courier New", weight="bold"),
         expand=True,
-        on_submit=lambda e: execute_command(),
         height=50,
         content_padding=15,
         border_color=ft.colors.GREEN_700,
@@ -108,7 +156,6 @@ def main(page: ft.Page):
     copy_button = ft.ElevatedButton(
         text="COPY PROMPT", icon=ft.icons.COPY, bgcolor=ft.colors.PINK_600, color=ft.colors.WHITE,
         style=ft.ButtonStyle(shape=ft.RoundedRectangleBorder(radius=0), padding=20),
-        on_click=lambda e: copy_to_clipboard(e)
     )
 
     bottom_actions_row = ft.Row(
@@ -149,14 +196,15 @@ def main(page: ft.Page):
     # --- Clear Confirmation Dialog ---
     def close_clear_dialog(e=None):
         clear_dialog.open = False
-        page.update()
+        ui.mark_page()
 
     def perform_clear(e=None):
-        blocks_column.controls.clear()
-        app_state["focused_block"] = None
-        calculate_tokens()
-        toggle_ui_state()
-        close_clear_dialog()
+        with ui.action("clear"):
+            cancel_work()
+            document.clear()
+            app_state["focused_block"] = None
+            toggle_ui_state()
+            close_clear_dialog()
 
     clear_dialog = ft.AlertDialog(
         modal=True,
@@ -174,20 +222,90 @@ def main(page: ft.Page):
     def open_clear_dialog():
         page.dialog = clear_dialog
         clear_dialog.open = True
-        page.update()
+        ui.mark_page()
+
+    # --- Evaluation Results Dialog (/run) ---
+    eval_status = ft.Text("", font_family="Courier New", color=ft.colors.GREEN_400)
+    eval_header = ft.Text("", font_family="Courier New", size=12, color=ft.colors.CYAN_400)
+    eval_cache = ft.Text("", font_family="Courier New", size=12, color=ft.colors.GREY_500)
+    eval_rows = ft.ListView(spacing=2, height=360, width=900)
+
+    def close_eval_dialog(e=None):
+        # Closing the table abandons the run
+        if tasks.cancel("run"):
+            set_status()
+        eval_dialog.open = False
+        ui.mark_page()
+
+    eval_dialog = ft.AlertDialog(
+        modal=True,
+        title=ft.Text("EVALUATION MATRIX", font_family="Courier New", color=ft.colors.CYAN_400),
+        content=ft.Column([eval_status, eval_cache, eval_header, eval_rows], tight=True),
+        actions=[
+            ft.TextButton("CLOSE", on_click=close_eval_dialog),
+        ],
+        actions_alignment=ft.MainAxisAlignment.END,
+        bgcolor=ft.colors.GREY_900,
+        shape=ft.RoundedRectangleBorder(radius=0)
+    )
 
     # --- 4. Logic Functions ---
 
-    def calculate_tokens():
-        total_chars = 0
-        for block in blocks_column.controls:
-            total_chars += len(block.content_field.value)
-        est_tokens = math.ceil(total_chars / 4)
-        token_text.value = f"[Token Count: {est_tokens}]"
-        page.update()
+    def show_token_total(total):
+        # Called from the counter's worker thread (or whichever thread changed the total)
+        with ui.action("token_count"):
+            if token_counter.estimated:
+                # No tokenizer vocabulary: say so rather than pass chars / 4 off as a count
+                token_text.value = f"[Token Count: ~{total}]"
+                token_text.tooltip = "ESTIMATE (CHARS / 4) // RUN: python token_counter.py --fetch"
+            else:
+                token_text.value = f"[Token Count: {total}]"
+            ui.mark(token_text)
+        if app_state["keystroke_at"] is not None:
+            perf.observe("keystroke_to_tokens", time.perf_counter() - app_state["keystroke_at"])
+            app_state["keystroke_at"] = None
+
+    token_counter = TokenCounter(on_total=show_token_total)
+
+    def calculate_tokens(data=None):
+        """Queues a recount of one block; with no block, just forgets deleted ones"""
+        with perf.timer("calculate_tokens"):
+            if data is not None and data.attachment is not None:
+                # Counted chunk by chunk off an mmap; the total climbs as it goes
+                token_counter.count_attachment(data)
+            elif data is not None:
+                # A body still on disk is read (and counted) on the counter's thread
+                token_counter.update(data, data.text if data.loaded else None)
+            else:
+                token_counter.retain(document.blocks)
+
+    def on_document_change(event, data):
+        # Token counts follow the document; the block view subscribes on its own
+        if event in ("append", "text"):
+            calculate_tokens(data)
+        elif event == "delete":
+            token_counter.remove(data)
+        elif event == "clear":
+            token_counter.clear()
+
+    document.subscribe(on_document_change)
+
+    def on_block_text_change(block_instance):
+        if perf.ENABLED:
+            app_state["keystroke_at"] = time.perf_counter()
+        with perf.timer("keystroke"):
+            document.set_text(block_instance.data, block_instance.content_field.value)
+
+    def set_block_text(data, text):
+        """Sets a block's text from code; works whether or not its control is on screen"""
+        document.set_text(data, text)
+        control = block_view.control_for(data)
+        if control is not None:
+            control.content_field.value = text
+            ui.mark(control.content_field)
 
     def toggle_ui_state():
-        has_items = len(blocks_column.controls) > 0
+        has_items = len(document) > 0
         if has_items:
             header_container.height = 120 
             header_title.size = 28
@@ -198,55 +316,177 @@ def main(page: ft.Page):
             header_title.size = 50
             header_tagline.size = 16
         bottom_actions_row.visible = has_items
-        page.update()
+        ui.mark(header_container, bottom_actions_row)
 
     def generate_nested_xml():
-        xml_output = []
-        stack = [] 
-        for block in blocks_column.controls:
-            current_level = block.indent_level
-            tag = block.tag_name.lower().replace(" ", "_")
-            content = block.content_field.value.strip()
-
-            while stack and stack[-1][1] >= current_level:
-                closing_tag, _ = stack.pop()
-                indent = "  " * len(stack)
-                xml_output.append(f"{indent}</{closing_tag}>")
-
-            indent_str = "  " * len(stack)
-            xml_output.append(f"{indent_str}<{tag}>")
-            if content:
-                content_indent = indent_str + "  "
-                formatted_content = "\n".join([f"{content_indent}{line}" for line in content.splitlines()])
-                xml_output.append(formatted_content)
-            stack.append((tag, current_level))
-
-        while stack:
-            closing_tag, _ = stack.pop()
-            indent = "  " * len(stack)
-            xml_output.append(f"{indent}</{closing_tag}>")
-        return "\n".join(xml_output)
-
-    def copy_to_clipboard(e):
-        final_string = generate_nested_xml()
-        page.set_clipboard(final_string)
-        page.snack_bar = ft.SnackBar(ft.Text("DATA_COPIED_TO_CLIPBOARD", font_family="Courier New"))
+        # Fragments are cached per block, so only edited blocks get re-rendered
+        with perf.timer("generate_xml"):
+            return document.compile()
+
+    def split_nested_xml():
+        # ROLE/CONTEXT/CONSTRAINTS up front go through the context cache; the rest is sent each call
+        from llm_context_cache import split_prompt
+        with perf.timer("split_xml"):
+            return split_prompt(document.blocks)
+
+    def show_message(message):
+        page.snack_bar = ft.SnackBar(ft.Text(message, font_family="Courier New"))
         page.snack_bar.open = True
-        page.update()
+        ui.mark_page()
+
+    def set_status(text=None):
+        """Progress of the running command, shown in the (still usable) command bar"""
+        command_input.hint_text = text or IDLE_HINT
+        ui.mark(command_input)
+
+    def cancel_work():
+        """Cancels whatever the last command is still doing; its task unwinds on its own"""
+        if tasks.cancel():
+            set_status()
+
+    def write_prompt(path):
+        # Attached files are streamed, never joined in memory
+        with perf.timer("export_prompt"), open(os.path.expanduser(path), "w", encoding="utf-8") as f:
+            document.write_to(f)
+
+    async def export_prompt(path):
+        try:
+            await run_cpu(write_prompt, path)
+        except OSError as e:
+            print(f"Error exporting prompt: {e}")
+            show_message("ERROR: EXPORT_FAILED")
+            return
+        show_message(f"PROMPT EXPORTED // {path}")
+
+    def attach_file(path):
+        try:
+            attachment = Attachment(path)
+            attachment.preview()  # read now, so a bad file fails here rather than mid-render
+        except OSError as e:
+            print(f"Error attaching file: {e}")
+            show_message("ERROR: ATTACH_FAILED")
+            return
+        add_block("context", 1, attachment=attachment)
+
+    def ingest_tree(root):
+        import code_ingest
+        cache = code_ingest.IngestCache(root)
+        files, texts, stats = code_ingest.ingest(root, cache=cache)
+        name = os.path.basename(os.path.abspath(root)) or "root"
+        dump_path = os.path.join(code_ingest.CACHE_DIR, f"{name}_{os.path.basename(cache.path)[:8]}_code_dump.txt")
+        os.makedirs(code_ingest.CACHE_DIR, exist_ok=True)
+        code_ingest.dump(root, files, texts, dump_path, cache)
+        attachment = Attachment(dump_path)
+        attachment.preview()
+        return attachment, stats
+
+    async def run_ingest(root):
+        """Dumps a source tree and attaches the dump as a CONTEXT block"""
+        set_status(f"INGESTING {root} ... // ESC TO ABORT")
+        try:
+            attachment, stats = await run_cpu(ingest_tree, root)
+        except Exception as e:
+            print(f"Error ingesting {root}: {e}")
+            with ui.action("ingest"):
+                set_status()
+                show_message("ERROR: INGEST_FAILED")
+            return
+        with ui.action("ingest"):
+            set_status()
+            add_block("context", 1, attachment=attachment)
+            show_message(f"INGESTED {stats['files']} FILES // {stats['tokens']} TOKENS // "
+                         f"{stats['skipped']} SKIPPED // {stats['walk_s'] + stats['read_s']:.1f} S")
+
+    def import_snippets(path):
+        import snippet_io
+        return snippet_io.import_path(snippet_mgr, path)
+
+    async def run_import(path):
+        """Bulk-imports snippets; sessions pick them up through the reload event.
+        The import is all or nothing, so one already running finishes even if cancelled."""
+        set_status(f"IMPORTING {path} ...")
+        try:
+            stats = await run_cpu(import_snippets, path)
+        except Exception as e:
+            print(f"Error importing snippets from {path}: {e}")
+            stats = None
+        with ui.action("import_snippets"):
+            set_status()
+            if stats is None:
+                show_message("ERROR: IMPORT_FAILED")
+            else:
+                show_message(f"IMPORTED {stats['imported']} SNIPPETS // {stats['duplicates']} DUPLICATES // "
+                             f"{stats['invalid']} INVALID")
+
+    async def run_eval(options):
+        """Sends the compiled prompt across the /run grid; rows land in the table as calls finish"""
+        import prompt_eval
+        llm = await load_llm()
+        prefix, prompt = await run_cpu(split_nested_xml)
+        grid = prompt_eval.build_grid(options.get("models") or [llm.MODEL],
+                                      options.get("temperatures", prompt_eval.DEFAULT_TEMPERATURES),
+                                      options.get("top_ps", prompt_eval.DEFAULT_TOP_PS))
+        done = {"rows": 0}
+        with ui.action("eval_open"):
+            eval_rows.controls.clear()
+            eval_header.value = prompt_eval.COLUMNS
+            eval_cache.value = ""
+            eval_status.value = f"RUNNING 0/{len(grid)} // ESC TO ABORT"
+            set_status(eval_status.value)
+            page.dialog = eval_dialog
+            eval_dialog.open = True
+            ui.mark_page()
+
+        def on_row(row):
+            with ui.action("eval_row"):
+                done["rows"] += 1
+                color = ft.colors.RED_400 if row["error"] is not None else ft.colors.GREEN_400
+                eval_rows.controls.append(ft.Text(prompt_eval.format_row(row), font_family="Courier New",
+                                                  size=12, color=color, selectable=True))
+                eval_status.value = f"RUNNING {done['rows']}/{len(grid)} // ESC TO ABORT"
+                set_status(eval_status.value)
+                ui.mark(eval_rows, eval_status)
+
+        started = time.perf_counter()
+        try:
+            rows = await prompt_eval.evaluate(prompt, grid, options.get("concurrency", prompt_eval.DEFAULT_CONCURRENCY),
+                                              on_row=on_row, prefix=prefix)
+        except asyncio.CancelledError:
+            eval_status.value = f"ABORTED // {done['rows']}/{len(grid)} DONE"
+            ui.mark(eval_status)
+            raise
+        with ui.action("eval_done"):
+            eval_status.value = prompt_eval.summary(rows, time.perf_counter() - started).upper()
+            eval_cache.value = f"CONTEXT CACHE // {llm.context_cache.stats.report()}"
+            ui.mark(eval_status, eval_cache)
+            set_status()
+
+    async def copy_to_clipboard(e):
+        # Compiled off the loop: a big prompt shouldn't hold up every other event
+        final_string = await run_cpu(generate_nested_xml)
+        with ui.action("copy_prompt"):
+            page.set_clipboard(final_string)
+            page.snack_bar = ft.SnackBar(ft.Text("DATA_COPIED_TO_CLIPBOARD", font_family="Courier New"))
+            page.snack_bar.open = True
+            ui.mark_page()
 
     def delete_block(block_instance):
-        blocks_column.controls.remove(block_instance)
-        if app_state["focused_block"] == block_instance:
-            app_state["focused_block"] = None
-        calculate_tokens()
-        toggle_ui_state()
+        with ui.action("delete_block"):
+            forge = app_state["forge"]
+            if forge and forge["data"] is block_instance.data and tasks.cancel("forge"):
+                set_status()
+            document.delete(block_instance.data)
+            if app_state["focused_block"] == block_instance:
+                app_state["focused_block"] = None
+            toggle_ui_state()
 
     # --- Snippet Logic ---
 
     def track_focus(block_instance):
         app_state["focused_block"] = block_instance
 
-    def handle_keyboard_events(e: ft.KeyboardEvent):
+    async def handle_keyboard_events(e: ft.KeyboardEvent):
+        # Async so it runs on the session's loop: ESC reaches a running task without a thread hop
         # Handle Dialog Shortcut
         if clear_dialog.open:
             if e.key == "Enter":
@@ -255,6 +495,19 @@ def main(page: ft.Page):
                 close_clear_dialog()
             return
 
+        if eval_dialog.open:
+            if e.key == "Escape":
+                close_eval_dialog()
+            return
+
+        if e.key == "Escape" and tasks.running():
+            cancel_work()
+            return
+
+        if e.key == "Escape" and snippet_filter_field.visible:
+            close_snippet_picker()
+            return
+
         # Existing Shortcuts
         if e.ctrl and e.key == " ":
             block = app_state["focused_block"]
@@ -266,91 +519,143 @@ def main(page: ft.Page):
         if not content:
             page.snack_bar = ft.SnackBar(ft.Text("ERROR: BLOCK_EMPTY", font_family="Courier New"))
             page.snack_bar.open = True
-            page.update()
+            ui.mark_page()
             return
             
         app_state["temp_save_block"] = block_instance
         snippet_name_field.value = "" 
         page.dialog = save_dialog
         save_dialog.open = True
-        page.update()
+        ui.mark_page()
 
     def finalize_save_snippet():
         name = snippet_name_field.value.strip()
         block = app_state["temp_save_block"]
         
         if name and block:
-            success = snippet_mgr.save_snippet(
+            saved = snippet_mgr.save_snippet(
                 section_tag=block.tag_name, 
                 name=name, 
                 content=block.content_field.value
             )
-            if success:
+            if saved:
+                # The @name completion arrives through on_library_change, like everyone else's saves
                 page.snack_bar = ft.SnackBar(ft.Text(f"SNIPPET '{name}' SAVED!", font_family="Courier New"))
             else:
                 page.snack_bar = ft.SnackBar(ft.Text("ERROR_SAVING_SNIPPET", font_family="Courier New"))
         
         close_dialog()
         page.snack_bar.open = True
-        page.update()
+        ui.mark_page()
 
     def close_dialog():
         save_dialog.open = False
-        page.update()
+        ui.mark_page()
 
-    def insert_snippet(content):
+    def insert_snippet(content_hash):
+        block = app_state["active_snippet_block"]
+        if block:
+            # Bodies are only read from the blob store once one is picked
+            content = snippet_mgr.load_content(content_hash)
+            if content is None:
+                page.snack_bar = ft.SnackBar(ft.Text("ERROR_LOADING_SNIPPET", font_family="Courier New"))
+                page.snack_bar.open = True
+                ui.mark_page()
+                return
+
+            with ui.action("insert_snippet"):
+                document.insert_snippet(block.data, content)
+                block.content_field.value = block.data.text
+                ui.mark(block.content_field)
+                block.focus()
+                suggestion_container.visible = False
+                snippet_filter_field.visible = False
+                ui.mark(suggestion_container)
+
+    def insert_top_snippet():
+        results = app_state["snippet_results"]
+        if results:
+            insert_snippet(results[0]["hash"])
+
+    def close_snippet_picker():
+        suggestion_container.visible = False
+        snippet_filter_field.visible = False
         block = app_state["active_snippet_block"]
         if block:
-            current_text = block.content_field.value
-            if current_text:
-                block.content_field.value = current_text + "\n" + content
-            else:
-                block.content_field.value = content
-            
             block.focus()
-            suggestion_container.visible = False
-            calculate_tokens()
-            page.update()
+        ui.mark(suggestion_container)
 
     def initiate_load_snippet(block_instance):
+        if block_instance.read_only:
+            show_message("ATTACHMENTS_ARE_READ_ONLY")
+            return
         app_state["active_snippet_block"] = block_instance
         tag = block_instance.tag_name
         
-        snippets = snippet_mgr.load_snippets(tag)
-        
-        if snippets:
-            suggestion_container.visible = True
-            suggestion_list.controls.clear()
-            suggestion_list.height = min(len(snippets) * 45, 200)
-            
-            color = block_instance.border_color
-            
-            for snip in snippets:
-                suggestion_list.controls.append(
-                    ft.Container(
-                        content=ft.Row([
-                            ft.Icon(ft.icons.FLASH_ON, color=color, size=16),
-                            ft.Text(snip['name'], size=16, color=ft.colors.GREEN_50, font_family="Courier New"),
-                            ft.Text(f"[{len(snip['content'])} chars]", size=12, color=ft.colors.GREY_500, font_family="Courier New")
-                        ]),
-                        padding=10,
-                        on_click=lambda _, c=snip['content']: insert_snippet(c),
-                        ink=True,
-                        bgcolor=ft.colors.BLACK
-                    )
-                )
+        with ui.action("open_snippet_picker"):
+            if snippet_mgr.search_snippets(tag, "", limit=1):
+                suggestion_container.visible = True
+                snippet_filter_field.visible = True
+                snippet_filter_field.value = ""
+                refresh_snippet_results()
+                ui.mark(suggestion_container)
+                snippet_filter_field.focus()
+            else:
+                 page.snack_bar = ft.SnackBar(ft.Text("NO_SNIPPETS_FOUND_FOR_SECTION", font_family="Courier New"))
+                 page.snack_bar.open = True
+                 ui.mark_page()
+
+    def on_library_change(event, tag, entry):
+        """Snippets saved by this or any other session (or process)"""
+        if event == "add":
+            command_engine.add_snippet(tag, entry)
         else:
-             page.snack_bar = ft.SnackBar(ft.Text("NO_SNIPPETS_FOUND_FOR_SECTION", font_family="Courier New"))
-             page.snack_bar.open = True
-        
-        page.update()
+            command_engine.reset_snippets(snippet_mgr.all_snippets)
+        block = app_state["active_snippet_block"]
+        if suggestion_container.visible and snippet_filter_field.visible and block \
+                and (tag is None or tag == block.tag_name.upper()):
+            refresh_snippet_results()
+
+    def refresh_snippet_results():
+        """Re-runs the picker query; only the top matches are ever rendered"""
+        block = app_state["active_snippet_block"]
+        if not block:
+            return
+        snippets = snippet_mgr.search_snippets(block.tag_name, snippet_filter_field.value or "")
+        app_state["snippet_results"] = snippets
+
+        color = block.border_color
+        suggestion_rows.show(
+            [(snip['name'], f"[{snip['size']} chars]", color, snip['hash']) for snip in snippets],
+            on_pick=insert_snippet,
+            with_icon=True,
+            detail_color=ft.colors.GREY_500
+        )
+        ui.mark(suggestion_list)
 
     def focus_command_bar():
         command_input.focus()
         app_state["focused_block"] = None 
-        page.update()
 
-    def add_block(tag_input, level):
+    def build_block_control(data, lightweight):
+        block = PromptBlock(
+            tag_name=data.tag_name,
+            border_color=data.border_color, 
+            delete_callback=delete_block,
+            parent_focus_callback=focus_command_bar,
+            text_change_callback=on_block_text_change,
+            save_request_callback=initiate_save_snippet,
+            snippet_request_callback=initiate_load_snippet,
+            on_focus_callback=track_focus,
+            indent_level=data.indent_level,
+            value=data.text if data.attachment is None else data.attachment.preview(),
+            lightweight=lightweight,
+            read_only=data.attachment is not None
+        )
+        block.data = data
+        return block
+
+    def add_block(tag_input, level, attachment=None):
         if level == 1:
             key_found = None
             for k in COMMANDS.keys():
@@ -366,147 +671,267 @@ def main(page: ft.Page):
             family_key = app_state["last_main_key"]
             color = NEON_COLORS.get(family_key, NEON_COLORS["default"])
 
-        new_block = PromptBlock(
-            tag_name=display_tag,
-            border_color=color, 
-            delete_callback=delete_block,
-            parent_focus_callback=focus_command_bar,
-            text_change_callback=calculate_tokens,
-            save_request_callback=initiate_save_snippet,
-            snippet_request_callback=initiate_load_snippet,
-            on_focus_callback=track_focus,
-            indent_level=level
-        )
-        
-        blocks_column.controls.append(new_block)
-        command_input.value = ""
-        suggestion_container.visible = False
-        
-        toggle_ui_state()
-        new_block.focus()
-        app_state["focused_block"] = new_block 
-        calculate_tokens()
+        command_engine.remember_tag(tag_input, level)
+
+        with ui.action("add_block"), perf.timer("add_block"):
+            data = document.add(display_tag, level, border_color=color, attachment=attachment)
+            command_input.value = ""
+            suggestion_container.visible = False
+            snippet_filter_field.visible = False
+            ui.mark(command_input, suggestion_container)
+            
+            toggle_ui_state()
+            # Scrolls to the new row and flushes, so the control is live before it takes focus
+            new_block = block_view.ensure_visible(data)
+            new_block.focus()
+            app_state["focused_block"] = new_block 
         
         # --- RETURN THE BLOCK (Crucial for AI Injection) ---
         return new_block
 
     def on_input_change(e):
-        val = command_input.value.strip().lower()
-        if val.startswith("/") and not val.startswith("//") and not val.startswith("/forge"):
-            search_term = val[1:] 
-            matches = [k for k in COMMANDS.keys() if k.startswith(search_term)]
-            
-            if matches:
-                suggestion_container.visible = True
-                suggestion_list.controls.clear()
-                suggestion_list.height = min(len(matches) * 45, 200)
-                for m in matches:
-                    color = NEON_COLORS[m]
-                    suggestion_list.controls.append(
-                        ft.Container(
-                            content=ft.Row([
-                                ft.Container(width=10, height=10, bgcolor=color), 
-                                ft.Text(f"/{m}", size=16, color=ft.colors.GREEN_50, font_family="Courier New"),
-                                ft.Text(f"<{COMMANDS[m]}>", size=12, color=ft.colors.GREEN_700, font_family="Courier New")
-                            ]),
-                            padding=10,
-                            on_click=lambda _, cmd=m: add_block(cmd, 1),
-                            ink=True,
-                            bgcolor=ft.colors.BLACK
-                        )
-                    )
-            else:
-                suggestion_container.visible = False
+        matches = command_engine.suggest(command_input.value)
+        if matches:
+            suggestion_container.visible = True
+            snippet_filter_field.visible = False
+            suggestion_rows.show(matches, on_pick=run_suggestion)
         else:
             suggestion_container.visible = False
-        page.update()
+        ui.mark(suggestion_container)
+
+    def run_suggestion(suggestion):
+        with ui.action("execute_command"):
+            if suggestion.kind == "snippet":
+                section_tag, entry = suggestion.payload
+                content = snippet_mgr.load_content(entry["hash"])
+                new_block = add_block(section_tag, 1)
+                if content:
+                    set_block_text(new_block.data, content)
+            else:
+                val = command_input.value.strip()
+                level = 3 if val.startswith("///") else 2 if val.startswith("//") else 1
+                add_block(suggestion.name, level)
 
     # --- AI FUNCTIONS ---
-    def run_forge(archetype_text):
-        """Runs in a separate thread to prevent UI freezing"""
+    async def load_llm():
+        # The SDK takes a while to import the first time; do that off the loop
+        return await run_cpu(importlib.import_module, "llm_response")
+
+    async def run_forge(archetype_text, forge):
+        """Streams the persona into the ROLE block. ESC, CLEAR, a new command or
+        deleting the block cancels it, which also drops the request."""
+        from llm_hedge import CircuitOpenError
+        data = forge["data"]
+        started = time.perf_counter()
+        first_token_ms = None
+        text = ""
         try:
+            llm = await load_llm()
+
             # 1. Construct the Meta-Prompt
-            system_prompt = f"""
-            Act as an expert Prompt Engineer.
-            Generate a detailed, high-quality System Role (Persona) based on this brief description: "{archetype_text}".
-            
-            Requirements:
-            1. Start directly with "You are..."
-            2. Define the Tone, Style, and Philosophy of the persona.
-            3. Keep it under 150 words.
-            4. Be specific and distinct.
-            """
-            
-            # 2. Call the API
-            generated_role = get_response(system_prompt)
-            
-            # 3. Create Block & Inject (Must be done on Main Thread via page.run_task ideally, 
-            # but Flet handles UI updates from threads reasonably well if we don't create controls in thread)
-            # We will use a helper to update UI safely
-            page.run_thread(lambda: inject_forge_result(generated_role))
-            
+            system_prompt = llm.forge_prompt(archetype_text)
+
+            # 2. Stream the API response straight into the block.
+            # The UI scheduler coalesces the marks, so fast chunks cost one update per frame.
+            async for chunk in llm.stream_response_async(system_prompt):
+                if first_token_ms is None:
+                    first_token_ms = (time.perf_counter() - started) * 1000
+                    set_status(f"STREAMING... TTFT {first_token_ms:.0f} MS // ESC TO ABORT")
+                text += chunk
+                with ui.action("forge_stream"):
+                    set_block_text(data, text.lstrip())
+
+            total_s = time.perf_counter() - started
+            set_block_text(data, text.strip())
+            finish_forge(forge, f"FORGE COMPLETE // TTFT {first_token_ms or 0:.0f} MS // TOTAL {total_s:.1f} S")
+
+        except asyncio.CancelledError:
+            finish_forge(forge, "FORGE_ABORTED", aborted=True)
+            raise
+        except CircuitOpenError as e:
+            print(f"Forge Error: {e}")
+            finish_forge(forge, "ERROR: NEURAL LINK DOWN // RETRY SHORTLY", failed=not text)
         except Exception as e:
             print(f"Forge Error: {e}")
-            command_input.value = "ERROR: FORGE_FAILED"
-            command_input.disabled = False
-            page.update()
+            finish_forge(forge, "ERROR: FORGE_FAILED", failed=not text)
+
+    async def run_forge_batch(archetypes, forge):
+        """Forges several personas concurrently; ROLE blocks land in the order they were typed"""
+        started = time.perf_counter()
+        counts = {"done": 0, "failed": 0}
+
+        def on_result(index, archetype, text, error):
+            with ui.action("forge_batch"):
+                counts["done"] += 1
+                if error is not None or not text:
+                    print(f"Forge Error ({archetype}): {error}")
+                    counts["failed"] += 1
+                else:
+                    new_block = add_block("role", 1)
+                    set_block_text(new_block.data, text.strip())
+                set_status(f"FORGING {counts['done']}/{len(archetypes)} // ESC TO ABORT")
 
-    def inject_forge_result(text):
-        """Called after API returns"""
-        # Create the ROLE block
-        new_block = add_block("role", 1)
-        
-        # Inject text
-        new_block.content_field.value = text.strip()
-        
-        # Reset UI
-        command_input.disabled = False
+        try:
+            llm = await load_llm()
+            from llm_batch import run_batch_async
+
+            async def forge_one(archetype):
+                return await llm.get_response_async(llm.forge_prompt(archetype))
+
+            await run_batch_async(archetypes, forge_one, on_result=on_result)
+        except asyncio.CancelledError:
+            finish_forge(forge, f"FORGE_ABORTED // {counts['done'] - counts['failed']} FORGED", aborted=True)
+            raise
+        except Exception as e:
+            print(f"Forge Error: {e}")
+
+        forged = counts["done"] - counts["failed"]
+        total_s = time.perf_counter() - started
+        message = f"BATCH COMPLETE // {forged}/{len(archetypes)} FORGED // TOTAL {total_s:.1f} S"
+        finish_forge(forge, message, failed=forged == 0)
+
+    def finish_forge(forge, message, failed=False, aborted=False):
+        with ui.action("forge_result"):
+            if app_state["forge"] is forge:
+                app_state["forge"] = None
+            # Nothing arrived: drop the empty ROLE block again
+            if failed and forge["data"] is not None and forge["data"] in document:
+                document.delete(forge["data"])
+                toggle_ui_state()
+
+            # Whoever cancelled us has reset the command bar, and may be using it already
+            if not aborted:
+                if failed:
+                    command_input.value = "ERROR: FORGE_FAILED"
+                set_status()
+            page.snack_bar = ft.SnackBar(ft.Text(message, font_family="Courier New"))
+            page.snack_bar.open = True
+            ui.mark_page()
+
+    def start_forge(archetypes):
+        # Several quoted archetypes (/forge "a" "b" "c") forge as one batch
         command_input.value = ""
-        command_input.hint_text = "TYPE / TO INITIATE..."
-        command_input.update()
-        
-        # Update Tokens
-        calculate_tokens()
-        page.update()
+        if len(archetypes) > 1:
+            forge = {"data": None}
+            app_state["forge"] = forge
+            set_status(f"FORGING 0/{len(archetypes)} // ESC TO ABORT")
+            tasks.start("forge", run_forge_batch(archetypes, forge))
+            return
 
+        # The ROLE block appears right away and fills in as tokens arrive
+        new_block = add_block("role", 1)
+        forge = {"data": new_block.data}
+        app_state["forge"] = forge
+        set_status("INITIALIZING NEURAL LINK...")
+        tasks.start("forge", run_forge(archetypes[0], forge))
 
     def execute_command():
         val = command_input.value.strip()
         if not val: return
 
+        # A new command supersedes whatever the last one is still doing
+        cancel_work()
+
+        if val.startswith("/attach "):
+            path = val[8:].strip().strip('"')
+            if path:
+                attach_file(path)
+            return
+        if val.startswith("/ingest "):
+            root = val[8:].strip().strip('"')
+            if root and os.path.isdir(root):
+                command_input.value = ""
+                tasks.start("ingest", run_ingest(root))
+            else:
+                show_message("ERROR: NOT_A_DIRECTORY")
+            return
+        if val.startswith("/import "):
+            path = val[8:].strip().strip('"')
+            if path and os.path.exists(path):
+                command_input.value = ""
+                tasks.start("import", run_import(path))
+            else:
+                show_message("ERROR: NOTHING_TO_IMPORT")
+            return
+        if val.startswith("/export "):
+            path = val[8:].strip().strip('"')
+            if path:
+                command_input.value = ""
+                ui.mark(command_input)
+                tasks.start("export", export_prompt(path))
+            return
+
+        if val == "/run" or val.startswith("/run "):
+            import prompt_eval
+            if len(document) == 0:
+                show_message("ERROR: NOTHING_TO_RUN")
+                return
+            try:
+                options = prompt_eval.parse_spec(val[4:])
+            except ValueError as e:
+                print(f"Error parsing /run: {e}")
+                show_message("ERROR: BAD_RUN_SPEC // /run t=0,0.5 p=0.9,1 m=MODEL,... c=N")
+                return
+            command_input.value = ""
+            ui.mark(command_input)
+            tasks.start("run", run_eval(options))
+            return
+
         # --- NEW: FORGE COMMAND ---
         if val.startswith("/forge "):
-            # Extract the archetype text (remove '/forge ' which is 7 chars)
-            archetype = val[7:].strip().replace('"', '') # Strip quotes if user used them
-            if archetype:
-                # UI Feedback
-                command_input.value = "INITIALIZING NEURAL LINK..."
-                command_input.disabled = True
-                page.update()
-                
-                # Run API call in background thread so app doesn't freeze
-                threading.Thread(target=run_forge, args=(archetype,), daemon=True).start()
+            try:
+                archetypes = [a.strip() for a in shlex.split(val[7:]) if a.strip()]
+            except ValueError:
+                # Unbalanced quotes: forge the whole text as one archetype, like before
+                archetypes = [val[7:].strip().replace('"', '')]
+            if archetypes and archetypes[0]:
+                start_forge(archetypes)
             return
         # ---------------------------
 
-        if val.startswith("///"):
+        # Same completions the dropdown is showing (cached by the engine, not recomputed)
+        matches = command_engine.suggest(command_input.value)
+        if val.startswith("@"):
+            if matches: run_suggestion(matches[0])
+        elif val.startswith("///"):
             custom_tag = val[3:].strip()
             if custom_tag: add_block(custom_tag, 3)
         elif val.startswith("//"):
             custom_tag = val[2:].strip()
             if custom_tag: add_block(custom_tag, 2)
         elif val.startswith("/"):
-            if suggestion_container.visible and suggestion_list.controls:
-                search_term = val[1:].lower()
-                matches = [k for k in COMMANDS.keys() if k.startswith(search_term)]
-                if matches: add_block(matches[0], 1)
+            if suggestion_container.visible and matches:
+                run_suggestion(matches[0])
             else:
                 custom_tag = val[1:].strip()
                 if custom_tag: add_block(custom_tag, 1)
 
-    command_input.on_change = on_input_change
+    async def on_command_change(e):
+        with ui.action("command_input"):
+            on_input_change(e)
+
+    async def on_command_submit(e):
+        with ui.action("execute_command"):
+            execute_command()
+
+    command_input.on_change = on_command_change
+    command_input.on_submit = on_command_submit
     page.on_keyboard_event = handle_keyboard_events
 
+    # Saves from other sessions land in the picker and the @name completions too
+    unsubscribe_snippets = snippet_mgr.subscribe(on_library_change)
+    copy_button.on_click = copy_to_clipboard
+
+    workspace = None
+
+    def on_page_close(e):
+        unsubscribe_snippets()
+        tasks.cancel()
+        if workspace is not None:
+            workspace.close()
+
+    page.on_close = on_page_close
+
     main_layout = ft.Container(
         gradient=ft.LinearGradient(
             begin=ft.alignment.top_center,
@@ -533,5 +958,48 @@ def main(page: ft.Page):
 
     page.add(main_layout)
 
+    if STARTUP_PROBE:
+        print("[startup] first frame", flush=True)
+        if STARTUP_PROBE == "exit":
+            os._exit(0)
+
+    async def workspace_key():
+        """Desktop: the one workspace. Web: one per browser, remembered in its local storage,
+        so users never see each other's blocks"""
+        if not page.web:
+            return None
+        key = await page.client_storage.get_async(WORKSPACE_KEY)
+        try:
+            workspace_path(key)
+        except ValueError:
+            key = new_workspace_key()
+            await page.client_storage.set_async(WORKSPACE_KEY, key)
+        return key
+
+    # Bring back the last session; bodies stay on disk until a block is shown (the snapshot has their counts)
+    try:
+        workspace = WorkspaceStore(workspace_path(await workspace_key()), count_tokens=token_counter.count_text)
+        restored = workspace.attach(document)
+    except WorkspaceLocked as e:
+        # Another window has it; two writers would corrupt it, so this one isn't saved
+        print(f"Error opening workspace: {e}")
+        workspace = None
+        restored = 0
+        show_message("WORKSPACE OPEN IN ANOTHER WINDOW // CHANGES HERE WON'T BE SAVED")
+    if restored:
+        with ui.action("restore"):
+            block_view.render(force=True)
+            toggle_ui_state()
+
+    def warm_up():
+        """Loads what the first frame didn't need, before the user asks for it"""
+        snippet_mgr.all_snippets()
+        try:
+            import llm_response  # noqa: F401
+        except Exception as e:
+            print(f"Error preloading Gemini SDK: {e}")
+
+    page.run_thread(warm_up)
+
 if __name__ == "__main__":
     ft.app(target=main)
\ No newline at end of file
@@ -3,7 +3,8 @@ import flet as ft
 class PromptBlock(ft.Column):
     def __init__(self, tag_name: str, delete_callback, parent_focus_callback, text_change_callback, 
                  save_request_callback, snippet_request_callback, on_focus_callback, # NEW CALLBACK
-                 border_color: str, indent_level: int = 1):
+                 border_color: str, indent_level: int = 1, value: str = "", lightweight: bool = False,
+                 read_only: bool = False):
         super().__init__()
         self.tag_name = tag_name
         self.delete_callback = delete_callback
@@ -16,9 +17,13 @@ class PromptBlock(ft.Column):
         self.border_color = border_color
         self.indent_level = indent_level
         self.left_margin = (self.indent_level - 1) * 40
+        self.lightweight = lightweight # Big workspaces skip the glow and animation
+        self.read_only = read_only # Attached files show a preview that can't be edited
 
         self.content_field = ft.TextField(
+            value=value,
             multiline=True,
+            read_only=read_only,
             min_lines=1 if indent_level > 1 else 3,
             border=ft.InputBorder.NONE,
             text_size=16,
@@ -28,7 +33,7 @@ class PromptBlock(ft.Column):
             hint_text=f"// Enter {tag_name} data...",
             hint_style=ft.TextStyle(color=ft.colors.GREEN_900, font_family="Courier New"),
             on_submit=self.handle_shift_enter,
-            on_change=lambda e: self.text_change_callback(),
+            on_change=lambda e: self.text_change_callback(self), # Report which block changed
             on_focus=lambda e: self.on_focus_callback(self), # Report I am active
             shift_enter=True,
         )
@@ -58,6 +63,7 @@ class PromptBlock(ft.Column):
                         ft.Row(
                             controls=[
                                 ft.IconButton(
+                                    visible=not self.read_only,
                                     icon=ft.icons.SAVE, 
                                     icon_size=18, 
                                     icon_color=self.border_color,
@@ -88,8 +94,8 @@ class PromptBlock(ft.Column):
             border_radius=0, 
             padding=10 if is_child else 15,
             margin=ft.margin.only(bottom=15, left=self.left_margin),
-            animate=ft.animation.Animation(300, "easeOut"),
-            shadow=ft.BoxShadow(
+            animate=None if self.lightweight else ft.animation.Animation(300, "easeOut"),
+            shadow=None if self.lightweight else ft.BoxShadow(
                 spread_radius=0,
                 blur_radius=10,
                 color=self.border_color,
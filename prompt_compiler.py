@@ -0,0 +1,105 @@
+INDENT = "  "
+
+
+def xml_escape(text):
+    # Same as xml.sax.saxutils.escape, which drags in urllib and http.client on import
+    return text.replace("&", "&amp;").replace(">", "&gt;").replace("<", "&lt;")
+
+
+def tag_for(tag_name):
+    return tag_name.lower().replace(" ", "_")
+
+
+def render_fragment(tag, content, depth, escape=False):
+    """Opening tag plus the block's content, indented one level deeper"""
+    indent_str = INDENT * depth
+    content = content.strip()
+    if not content:
+        return f"{indent_str}<{tag}>"
+    if escape:
+        content = xml_escape(content)
+    content_indent = indent_str + INDENT
+    lines = [f"{indent_str}<{tag}>"]
+    lines.extend([f"{content_indent}{line}" for line in content.splitlines()])
+    return "\n".join(lines)
+
+
+def iter_attachment_fragment(tag, attachment, depth, escape=False):
+    """render_fragment for a file attached by reference: same output, but the
+    content is streamed from disk a chunk of lines at a time"""
+    indent_str = INDENT * depth
+    content_indent = indent_str + INDENT
+    yield f"{indent_str}<{tag}>"
+    for chunk in attachment.iter_text(strip=True):
+        if escape:
+            chunk = xml_escape(chunk)
+        yield "".join([f"\n{content_indent}{line}" for line in chunk.splitlines()])
+
+
+class PromptCompiler:
+    """Builds the nested XML prompt, caching each block's rendered fragment.
+
+    A fragment is only re-rendered when its text, tag or depth changes, so
+    recompiling after a small edit costs one fragment plus the closing tags.
+    Output can be taken as one string, iterated in chunks, or written to a file.
+    Attached files are never cached; their content is read at export time.
+    """
+
+    def __init__(self, escape=False, text_of=lambda block: block.content_field.value):
+        self.escape = escape
+        self.text_of = text_of
+        self._cache = {}  # block -> (text, tag, depth, fragment)
+
+    def invalidate(self, block=None):
+        if block is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(block, None)
+
+    def iter_chunks(self, blocks):
+        cache = self._cache
+        fresh = {}
+        stack = []
+        first = True
+        for block in blocks:
+            current_level = block.indent_level
+            tag = tag_for(block.tag_name)
+
+            while stack and stack[-1][1] >= current_level:
+                closing_tag, _ = stack.pop()
+                yield f"\n{INDENT * len(stack)}</{closing_tag}>"
+
+            depth = len(stack)
+            # Separator goes out on its own so big fragments are never copied
+            if not first:
+                yield "\n"
+            first = False
+            stack.append((tag, current_level))
+
+            attachment = getattr(block, "attachment", None)
+            if attachment is not None:
+                yield from iter_attachment_fragment(tag, attachment, depth, self.escape)
+                continue
+
+            text = self.text_of(block)
+            entry = cache.get(block)
+            # Identity check: an edit always hands us a new string object
+            if entry is None or entry[0] is not text or entry[1] != tag or entry[2] != depth:
+                entry = (text, tag, depth, render_fragment(tag, text, depth, self.escape))
+            fresh[block] = entry
+            yield entry[3]
+
+        while stack:
+            closing_tag, _ = stack.pop()
+            yield f"\n{INDENT * len(stack)}</{closing_tag}>"
+
+        # Blocks that were deleted drop out of the cache here
+        self._cache = fresh
+
+    def compile(self, blocks):
+        return "".join(self.iter_chunks(blocks))
+
+    def write_to(self, blocks, fp):
+        """Streams the prompt into an open text file without building it in memory"""
+        for chunk in self.iter_chunks(blocks):
+            fp.write(chunk)
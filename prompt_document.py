@@ -0,0 +1,179 @@
+"""The prompt being edited, as plain data: no Flet, no page, no controls.
+
+The UI subscribes to a PromptDocument and mirrors it; benchmarks and scripts
+can build and compile one directly.
+"""
+import threading
+
+from prompt_compiler import PromptCompiler
+
+MAX_LEVEL = 3
+
+# Serializes lazy body loads against edits, so an edit is never overwritten by a late load
+_load_lock = threading.Lock()
+
+
+class BlockData:
+    """Plain per-block state. Controls come and go; this stays.
+
+    A restored block can start with its body still on disk: `source` is
+    (load, line_count) or (load, line_count, (tokenizer, tokens)), and the
+    first read of `text` calls load().
+    An /attach block has an `attachment` instead of text; its file is only
+    read when the prompt is compiled.
+    """
+    __slots__ = ("tag_name", "indent_level", "border_color", "_text", "_source", "attachment")
+
+    def __init__(self, tag_name, indent_level, border_color=None, text="", source=None, attachment=None):
+        self.tag_name = tag_name
+        self.indent_level = indent_level
+        self.border_color = border_color
+        self._text = text
+        self._source = source
+        self.attachment = attachment
+
+    @property
+    def text(self):
+        if self._source is not None:
+            with _load_lock:
+                source = self._source
+                if source is not None:
+                    self._text = source[0]()
+                    self._source = None  # cleared last: a setter seeing None knows we're done
+        return self._text
+
+    @text.setter
+    def text(self, value):
+        if self._source is not None:
+            with _load_lock:
+                self._text = value
+                self._source = None
+        else:
+            self._text = value
+
+    @property
+    def loaded(self):
+        return self._source is None
+
+    @property
+    def saved_tokens(self):
+        """(tokenizer, tokens) saved with a body that is still on disk, else None"""
+        source = self._source
+        if source is not None and len(source) > 2:
+            return source[2]
+        return None
+
+    @property
+    def line_count(self):
+        """Lines in the body, without loading it"""
+        if self.attachment is not None:
+            return self.attachment.preview_lines
+        if self._source is not None:
+            return self._source[1]
+        return self._text.count("\n") + 1
+
+
+class PromptDocument:
+    """Ordered list of blocks.
+
+    Blocks are kept as keys of an insertion-ordered dict, so append and delete
+    are O(1). `blocks` is a list snapshot for positional access, rebuilt lazily
+    after a structural edit. Subscribers are called with (event, block) for
+    "append", "delete", "move", "indent", "text" and "clear" (block is None).
+    """
+
+    def __init__(self, escape=False):
+        self._blocks = {}         # BlockData -> None, in document order
+        self._snapshot = []       # list(self._blocks), or None when stale
+        self._positions = None    # BlockData -> index, built on demand
+        self._listeners = []
+        self.compiler = PromptCompiler(escape=escape, text_of=lambda block: block.text)
+
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def _emit(self, event, block):
+        for listener in self._listeners:
+            listener(event, block)
+
+    def _structure_changed(self):
+        self._snapshot = None
+        self._positions = None
+
+    # --- Reading ---
+
+    def __len__(self):
+        return len(self._blocks)
+
+    def __iter__(self):
+        return iter(self.blocks)
+
+    def __contains__(self, block):
+        return block in self._blocks
+
+    @property
+    def blocks(self):
+        if self._snapshot is None:
+            self._snapshot = list(self._blocks)
+        return self._snapshot
+
+    def index(self, block):
+        if self._positions is None:
+            self._positions = {b: i for i, b in enumerate(self.blocks)}
+        return self._positions[block]
+
+    # --- Edits ---
+
+    def append(self, block):
+        self._blocks[block] = None
+        if self._snapshot is not None:
+            self._snapshot.append(block)
+        if self._positions is not None:
+            self._positions[block] = len(self._blocks) - 1
+        self._emit("append", block)
+        return block
+
+    def add(self, tag_name, indent_level=1, text="", border_color=None, attachment=None):
+        return self.append(BlockData(tag_name, indent_level, border_color, text, attachment=attachment))
+
+
+    def delete(self, block):
+        del self._blocks[block]
+        self._structure_changed()
+        self._emit("delete", block)
+
+    def move(self, block, index):
+        """Moves a block to position `index` (clamped to the document)"""
+        order = [b for b in self.blocks if b is not block]
+        order.insert(max(0, min(index, len(order))), block)
+        self._blocks = dict.fromkeys(order)
+        self._structure_changed()
+        self._emit("move", block)
+
+    def indent(self, block, level):
+        level = max(1, min(level, MAX_LEVEL))
+        if block.indent_level != level:
+            block.indent_level = level
+            self._emit("indent", block)
+
+    def set_text(self, block, text):
+        block.text = text
+        self._emit("text", block)
+
+    def insert_snippet(self, block, content):
+        """Appends a picked snippet to the block's text, on a new line if it has any"""
+        self.set_text(block, f"{block.text}\n{content}" if block.text else content)
+
+    def clear(self):
+        self._blocks.clear()
+        self._structure_changed()
+        self.compiler.invalidate()
+        self._emit("clear", None)
+
+    # --- Output ---
+
+    def compile(self):
+        return self.compiler.compile(self.blocks)
+
+    def write_to(self, fp):
+        self.compiler.write_to(self.blocks, fp)
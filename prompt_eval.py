@@ -0,0 +1,181 @@
+"""Runs one compiled prompt across a grid of models, temperatures and top_p values.
+
+Every combination is one call, with at most --concurrency in flight (and the
+same rate limit and 429 backoff as batch forges). Rows print as each call
+finishes: settings, latency, token usage and the start of the answer. --out
+also writes full rows as JSONL. Calls go through the app's response cache, so
+re-running a grid only pays for cells that changed; --no-cache sends them all.
+--stub never reads or writes the cache.
+
+    python prompt_eval.py prompt.txt --temperature 0 0.5 1 --top-p 0.9 1
+    python prompt_eval.py prompt.txt --model gemini-2.5-flash gemini-2.5-pro -o results.jsonl
+    python prompt_eval.py prompt.txt --stub --concurrency 32      # offline, against llm_stub (uncached)
+    python prompt_eval.py task.txt --prefix role_and_context.txt  # prefix via context caching
+
+In the app, /run evaluates the compiled prompt, e.g. /run t=0,0.5,1 p=0.9,1 m=gemini-2.5-pro c=8
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import statistics
+import sys
+import time
+
+from llm_batch import DEFAULT_CONCURRENCY, DEFAULT_RATE, run_batch_async
+
+DEFAULT_TEMPERATURES = (0.0, 0.5, 1.0)
+DEFAULT_TOP_PS = (0.9,)
+PREVIEW_CHARS = 60
+COLUMNS = f"{'MODEL':<22} {'TEMP':>5} {'TOP_P':>5} {'MS':>7} {'IN':>6} {'OUT':>6}  OUTPUT"
+
+# /run t=0,0.5 p=0.9 m=gemini-2.5-flash c=8
+_SPEC_KEYS = {"t": "temperatures", "p": "top_ps", "m": "models", "c": "concurrency"}
+
+
+def build_grid(models, temperatures=DEFAULT_TEMPERATURES, top_ps=DEFAULT_TOP_PS):
+    return [{"model": model, "temperature": temperature, "top_p": top_p}
+            for model, temperature, top_p in itertools.product(models, temperatures, top_ps)]
+
+
+def parse_spec(text):
+    """Parses the arguments of /run into build_grid/evaluate keywords; raises ValueError"""
+    options = {}
+    for part in text.split():
+        key, _, value = part.partition("=")
+        if key not in _SPEC_KEYS or not value:
+            raise ValueError(f"unknown /run option: {part}")
+        values = [v for v in value.split(",") if v]
+        if key == "m":
+            options["models"] = values
+        elif key == "c":
+            options["concurrency"] = max(int(value), 1)
+        else:
+            options[_SPEC_KEYS[key]] = [float(v) for v in values]
+    return options
+
+
+def make_row(cell, result, error):
+    row = dict(cell, latency_ms=None, prompt_tokens=None, output_tokens=None, total_tokens=None,
+               cached=False, output=None, error=None)
+    if error is not None:
+        row["error"] = str(error) or type(error).__name__
+        return row
+    usage = result.usage or {}
+    row.update(latency_ms=round(result.latency_ms, 1), prompt_tokens=usage.get("prompt"),
+               output_tokens=usage.get("output"), total_tokens=usage.get("total"), cached=result.cached,
+               output=result.text or "")
+    return row
+
+
+def format_row(row):
+    preview = f"ERROR: {row['error']}" if row["error"] is not None else row["output"]
+    preview = " ".join(preview.split())[:PREVIEW_CHARS]
+    if row["cached"]:
+        preview = f"(cached) {preview}"
+    latency = f"{row['latency_ms']:.0f}" if row["latency_ms"] is not None else "-"
+    return (f"{row['model']:<22} {row['temperature']:>5g} {row['top_p']:>5g} {latency:>7} "
+            f"{row['prompt_tokens'] or '-':>6} {row['output_tokens'] or '-':>6}  {preview}")
+
+
+def summary(rows, elapsed):
+    ok = [row for row in rows if row["error"] is None]
+    text = f"{len(ok)}/{len(rows)} OK in {elapsed:.1f} s ({len(rows) / max(elapsed, 1e-9):.1f} calls/s)"
+    cached = sum(1 for row in ok if row["cached"])
+    if cached:
+        text += f", {cached} cached"
+    if ok:
+        text += (f", p50 {statistics.median(row['latency_ms'] for row in ok):.0f} ms, "
+                 f"{sum(row['total_tokens'] or 0 for row in ok):,} tokens")
+    return text
+
+
+async def evaluate(prompt, grid, concurrency=DEFAULT_CONCURRENCY, rate=DEFAULT_RATE, timeout=None,
+                   on_row=None, use_cache=True, hedge=None, prefix=None):
+    """Sends prompt once per grid cell; on_row(row) fires as each call finishes.
+    Returns the rows in grid order. Cancelling the task cancels the calls in flight.
+    A repeated cell is answered from the response cache unless use_cache is False.
+    With `prefix` (see llm_context_cache.split_prompt) the model sees prefix + "\n" +
+    prompt, and the prefix is sent once through a context cache for the whole grid."""
+    import llm_response
+    if hedge is None:
+        hedge = llm_response.HEDGE_ENABLED
+
+    async def call(cell):
+        return await llm_response.evaluate_async(prompt, cell["model"], timeout, use_cache, hedge, prefix,
+                                                 temperature=cell["temperature"], top_p=cell["top_p"])
+
+    rows = [None] * len(grid)
+
+    def on_result(index, cell, result, error):
+        rows[index] = make_row(cell, result, error)
+        if on_row is not None:
+            on_row(rows[index])
+
+    await run_batch_async(grid, call, concurrency=concurrency, rate=rate, on_result=on_result, ordered=False)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a prompt across a grid of generation settings.")
+    parser.add_argument("prompt", help="compiled prompt file, or - for stdin")
+    parser.add_argument("--model", nargs="+", help="models to try (default: the app's model)")
+    parser.add_argument("--temperature", nargs="+", type=float, default=list(DEFAULT_TEMPERATURES))
+    parser.add_argument("--top-p", nargs="+", type=float, default=list(DEFAULT_TOP_PS))
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="calls in flight")
+    parser.add_argument("--rate", type=float, help=f"requests per second, 0 for no limit "
+                                                   f"(default {DEFAULT_RATE:g}, or 0 with --stub)")
+    parser.add_argument("--timeout", type=float, help="seconds per call")
+    parser.add_argument("--prefix", help="file with the stable start of the prompt (role, context), "
+                                         "sent through a Gemini context cache; the model sees it, a newline, "
+                                         "then the prompt")
+    parser.add_argument("--no-cache", action="store_true", help="skip the response cache (always, with --stub)")
+    parser.add_argument("-o", "--out", help="write full rows as JSONL")
+    parser.add_argument("--stub", action="store_true", help="answer from a local llm_stub server instead")
+    parser.add_argument("--stub-delay", type=float, default=0.5, help="stub seconds per call (default 0.5)")
+    args = parser.parse_args(argv)
+
+    if args.prompt == "-":
+        prompt = sys.stdin.read()
+    else:
+        with open(args.prompt, "r", encoding="utf-8") as f:
+            prompt = f.read()
+    prefix = None
+    if args.prefix:
+        with open(args.prefix, "r", encoding="utf-8") as f:
+            prefix = f.read()
+
+    import llm_response
+    stub = None
+    if args.stub:
+        from llm_stub import StubBackend
+        stub = StubBackend(delay=args.stub_delay).start()
+        llm_response.configure(api_key="stub", base_url=stub.url)
+    rate = args.rate if args.rate is not None else (0 if args.stub else DEFAULT_RATE)
+
+    grid = build_grid(args.model or [llm_response.MODEL], args.temperature, args.top_p)
+    out = open(args.out, "w", encoding="utf-8") if args.out else None
+
+    def on_row(row):
+        print(format_row(row), flush=True)
+        if out is not None:
+            out.write(json.dumps(row) + "\n")
+
+    print(COLUMNS)
+    started = time.perf_counter()
+    try:
+        rows = asyncio.run(evaluate(prompt, grid, args.concurrency, rate, args.timeout, on_row,
+                                     use_cache=not (args.no_cache or args.stub), prefix=prefix))
+    finally:
+        if out is not None:
+            out.close()
+        if stub is not None:
+            stub.stop()
+    print(summary(rows, time.perf_counter() - started), file=sys.stderr)
+    if prefix:
+        print(f"context cache: {llm_response.context_cache.stats.report()}", file=sys.stderr)
+    return 0 if all(row["error"] is None for row in rows) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
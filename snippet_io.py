@@ -0,0 +1,144 @@
+"""Bulk snippet import and export.
+
+Two formats:
+- JSONL: one {"tag": ..., "name": ..., "content": ...} object per line
+- a directory with one folder per tag and one text file per snippet:
+  <dir>/ROLE/Code reviewer.txt (names are made file-safe on export)
+
+Both sides stream: import reads a record at a time and the manager files the
+whole batch in a single journal write, export loads one body at a time.
+
+    python snippet_io.py import snippets.jsonl
+    python snippet_io.py import exported_dir/
+    python snippet_io.py export backup.jsonl
+    python snippet_io.py export backup_dir/ --dir
+
+In the app, /import <path> does the same as the first two.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+from snippet_manager import FILE_NAME, SnippetManager
+
+TEXT_SUFFIX = ".txt"
+_UNSAFE_RE = re.compile(r"[^\w\- .()]+")
+
+
+def read_jsonl(path):
+    """Yields a dict per non-empty line, None for lines that aren't a JSON object"""
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield None
+
+
+def read_dir(root):
+    """Yields a record per <root>/<TAG>/<name>.txt, in a stable order"""
+    for tag in sorted(os.listdir(root)):
+        tag_dir = os.path.join(root, tag)
+        if not os.path.isdir(tag_dir):
+            continue
+        for file_name in sorted(os.listdir(tag_dir)):
+            if not file_name.endswith(TEXT_SUFFIX):
+                continue
+            try:
+                with open(os.path.join(tag_dir, file_name), "r", encoding="utf-8") as f:
+                    content = f.read()
+            except (OSError, UnicodeDecodeError):
+                yield None
+                continue
+            yield {"tag": tag, "name": file_name[:-len(TEXT_SUFFIX)], "content": content}
+
+
+def read_snippets(path):
+    return read_dir(path) if os.path.isdir(path) else read_jsonl(path)
+
+
+def write_jsonl(snippets, path):
+    """Writes (tag, metadata, body) triples as JSONL; returns how many"""
+    count = 0
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for tag, entry, content in snippets:
+            f.write(json.dumps({"tag": tag, "name": entry["name"], "content": content}) + "\n")
+            count += 1
+    os.replace(tmp_path, path)
+    return count
+
+
+def safe_file_name(name):
+    return _UNSAFE_RE.sub("_", name).strip(" .") or "snippet"
+
+
+def write_dir(snippets, root):
+    """Writes (tag, metadata, body) triples as <root>/<TAG>/<name>.txt; returns how many.
+    Names that clash once made file-safe get " (2)", " (3)"... appended."""
+    count = 0
+    used = set()
+    for tag, entry, content in snippets:
+        tag_dir = os.path.join(root, safe_file_name(tag))
+        if tag_dir not in used:
+            os.makedirs(tag_dir, exist_ok=True)
+            used.add(tag_dir)
+        base = safe_file_name(entry["name"])
+        path, n = os.path.join(tag_dir, base + TEXT_SUFFIX), 1
+        while path in used or os.path.exists(path):
+            n += 1
+            path = os.path.join(tag_dir, f"{base} ({n}){TEXT_SUFFIX}")
+        used.add(path)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        count += 1
+    return count
+
+
+def import_path(manager, path, on_progress=None):
+    """Imports a JSONL file or a snippet directory; returns the manager's counts"""
+    return manager.import_snippets(read_snippets(path), on_progress)
+
+
+def export_path(manager, path, as_dir=False):
+    """Exports the whole library; returns the number of snippets written"""
+    if as_dir:
+        return write_dir(manager.export_snippets(), path)
+    return write_jsonl(manager.export_snippets(), path)
+
+
+def summary(stats):
+    return (f"{stats['imported']} imported, {stats['duplicates']} duplicates, "
+            f"{stats['invalid']} invalid (of {stats['read']})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import or export of the snippet library.")
+    parser.add_argument("action", choices=["import", "export"])
+    parser.add_argument("path", help="JSONL file, or a directory with a folder per tag")
+    parser.add_argument("--library", default=FILE_NAME, help=f"snippet library (default {FILE_NAME})")
+    parser.add_argument("--dir", action="store_true", help="export as a directory of text files")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    manager = SnippetManager(args.library)
+    if args.action == "import":
+        if not os.path.exists(args.path):
+            print(f"Error importing snippets: {args.path} not found", file=sys.stderr)
+            return 1
+        stats = import_path(manager, args.path,
+                            on_progress=lambda n: print(f"  {n:,} read...", file=sys.stderr))
+        print(f"{summary(stats)} in {time.perf_counter() - started:.2f} s", file=sys.stderr)
+    else:
+        count = export_path(manager, args.path, args.dir)
+        print(f"{count} snippets exported in {time.perf_counter() - started:.2f} s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
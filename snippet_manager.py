@@ -1,43 +1,685 @@
+import hashlib
 import json
 import os
+import threading
+import uuid
+import zlib
+from contextlib import contextmanager
+
+import perf
+
+from file_util import FileLock, atomic_write
+from snippet_search import SEARCH_LIMIT, SnippetSearchIndex, extract_terms
 
 FILE_NAME = "snippets.json"
 
-class SnippetManager:
+# Saves are appended here and folded back into FILE_NAME once enough pile up
+JOURNAL_SUFFIX = ".journal"
+COMPACT_EVERY = 200
+
+# Snippet bodies live outside the index, one file per content hash
+BLOB_DIR_SUFFIX = ".blobs"
+COMPRESS_MIN_BYTES = 4096
+# ...except bulk imports, which append them to pack files in here
+PACK_DIR = "packs"
+PACK_SUFFIX = ".pack"
+PACK_INDEX = ".idx"
+
+# Every process using the library takes this lock around reads and writes of the files
+LOCK_SUFFIX = ".lock"
+WATCH_SECONDS = 1.0  # how often a shared manager looks for other processes' writes
+
+
+def _dump_library(index):
+    """The base file: JSON with one snippet per line. indent=2 would push json onto
+    its pure-Python encoder, which is most of a compaction on big libraries."""
+    parts = []
+    for key, items in index.items():
+        lines = ",\n".join("    " + json.dumps(item) for item in items)
+        parts.append(f"  {json.dumps(key)}: [\n{lines}\n  ]" if items else f"  {json.dumps(key)}: []")
+    return ("{\n" + ",\n".join(parts) + "\n}").encode("utf-8")
+
+
+def _stat_key(path):
+    try:
+        st = os.stat(path)
+        return (st.st_ino, st.st_mtime_ns, st.st_size)  # the inode changes when a file is swapped in
+    except FileNotFoundError:
+        return None
+
+
+class RWLock:
+    """Many readers or one writer. A waiting writer holds back new readers, so saves
+    aren't starved by a stream of searches. The writing thread may re-enter."""
+
     def __init__(self):
-        self._ensure_file_exists()
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = None
+        self._depth = 0
+        self._waiting = 0
+
+    @contextmanager
+    def read(self):
+        me = threading.get_ident()
+        with self._cond:
+            nested = self._writer == me  # a read inside our own write
+            if not nested:
+                while self._writer is not None or self._waiting:
+                    self._cond.wait()
+                self._readers += 1
+        try:
+            yield
+        finally:
+            if not nested:
+                with self._cond:
+                    self._readers -= 1
+                    if not self._readers:
+                        self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._depth += 1
+            else:
+                self._waiting += 1
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+                self._waiting -= 1
+                self._writer = me
+                self._depth = 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._depth -= 1
+                if not self._depth:
+                    self._writer = None
+                    self._cond.notify_all()
+
+
+class BlobStore:
+    """Content-addressed storage for snippet bodies. Identical bodies are stored once.
+
+    save_snippet() writes one loose file per body. Bulk imports go through pack()
+    instead: the bodies are appended to a single .pack file with an .idx next to
+    it (digest, offset, length per line), since creating 100k small files costs far
+    more than the bytes in them."""
+
+    def __init__(self, root, compress=True):
+        self.root = root
+        self.compress = compress
+        self.pack_dir = os.path.join(root, PACK_DIR)
+        self._packed = None  # digest -> (pack path, offset, length), read on first need
+        self._packed_lock = threading.Lock()
+
+    def _path(self, digest):
+        return os.path.join(self.root, digest[:2], digest)
+
+    def _encode(self, data):
+        if self.compress and len(data) >= COMPRESS_MIN_BYTES:
+            return b"Z" + zlib.compress(data)
+        return b"R" + data
+
+    def _load_packs(self):
+        """(Re)reads every pack index; another process may have written a pack since"""
+        packed = {}
+        try:
+            names = sorted(os.listdir(self.pack_dir))
+        except FileNotFoundError:
+            names = []
+        for name in names:
+            if not name.endswith(PACK_INDEX):
+                continue
+            pack_path = os.path.join(self.pack_dir, name[:-len(PACK_INDEX)] + PACK_SUFFIX)
+            with open(os.path.join(self.pack_dir, name), "r") as f:
+                for line in f:
+                    digest, offset, length = line.split()
+                    packed[digest] = (pack_path, int(offset), int(length))
+        with self._packed_lock:
+            self._packed = packed
+        return packed
+
+    def _packed_entry(self, digest):
+        packed = self._packed if self._packed is not None else self._load_packs()
+        return packed.get(digest)
+
+    def _loose_digests(self):
+        """Every loose body's hash: a listing per fan-out folder beats a stat per body"""
+        digests = set()
+        try:
+            folders = os.listdir(self.root)
+        except FileNotFoundError:
+            return digests
+        for folder in folders:
+            if len(folder) == 2:
+                digests.update(os.listdir(os.path.join(self.root, folder)))
+        return digests
+
+    def put(self, content):
+        """Stores the body and returns (hash, size in chars)"""
+        data = content.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            atomic_write(path, self._encode(data))
+        return digest, len(content)
+
+    @contextmanager
+    def pack(self):
+        """Yields a put(content) -> (hash, size) that appends to a new pack. The pack only
+        counts once the block exits: it is fsynced, then its index is swapped in."""
+        os.makedirs(self.pack_dir, exist_ok=True)
+        name = os.path.join(self.pack_dir, uuid.uuid4().hex)
+        pack_path, index_tmp = name + PACK_SUFFIX, name + PACK_INDEX + ".tmp"
+        written = {}
+        stored = self._loose_digests()
+        packed = self._load_packs()
+        try:
+            with open(pack_path, "wb") as pack_file, open(index_tmp, "w") as index_file:
+                def put(content):
+                    data = content.encode("utf-8")
+                    digest = hashlib.sha256(data).hexdigest()
+                    if digest not in written and digest not in packed and digest not in stored:
+                        blob = self._encode(data)
+                        offset = pack_file.tell()
+                        pack_file.write(blob)
+                        index_file.write(f"{digest} {offset} {len(blob)}\n")
+                        written[digest] = (pack_path, offset, len(blob))
+                    return digest, len(content)
+
+                yield put
+                for f in (pack_file, index_file):
+                    f.flush()
+                    os.fsync(f.fileno())
+        except BaseException:
+            # Nothing can point into a pack before its index is swapped in, so a failed one just goes
+            for path in (pack_path, index_tmp):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            raise
+        if not written:
+            os.remove(pack_path)
+            os.remove(index_tmp)
+            return
+        os.replace(index_tmp, name + PACK_INDEX)
+        with self._packed_lock:
+            if self._packed is not None:
+                self._packed.update(written)
+
+    def get(self, digest):
+        try:
+            with open(self._path(digest), "rb") as f:
+                blob = f.read()
+        except FileNotFoundError:
+            entry = self._packed_entry(digest) or self._load_packs().get(digest)
+            if entry is None:
+                raise
+            pack_path, offset, length = entry
+            with open(pack_path, "rb") as f:
+                f.seek(offset)
+                blob = f.read(length)
+        data = zlib.decompress(blob[1:]) if blob[:1] == b"Z" else blob[1:]
+        return data.decode("utf-8")
+
+
+class SnippetManager:
+    """The snippet library: a per-tag index in memory, bodies in the blob store.
+
+    Reads share an RWLock and never touch the disk once the index is loaded;
+    saves take it exclusively plus the cross-process FileLock, and first pick
+    up whatever other processes appended to the journal. Subscribers are called
+    with ("add", tag, entry) for each new snippet, from this process or another,
+    and ("reload", None, None) when the library had to be re-read.
+
+    auto_refresh=True checks the files' mtime on every read (fine for a single
+    user); shared_manager() turns it off and polls from a watcher thread instead.
+    """
+
+    def __init__(self, path=FILE_NAME, compress=True, auto_refresh=True):
+        self.path = path
+        self.journal_path = path + JOURNAL_SUFFIX
+        self.auto_refresh = auto_refresh
+        # Nothing here touches the disk; the library is read on first use
+        self.blobs = BlobStore(path + BLOB_DIR_SUFFIX, compress=compress)
+        self._file_lock = FileLock(path + LOCK_SUFFIX)
+        self._compact_lock = FileLock(path + LOCK_SUFFIX + ".compact")
+
+        self._lock = RWLock()
+        self._index = {}          # TAG -> [{'name':..., 'size':..., 'hash':..., 'terms': [...]}]
+        self._search = {}         # TAG -> SnippetSearchIndex, built on first search
+        self._base_crc = 0        # Checksum of the base file the journal applies to
+        self._journal_count = 0
+        self._journal_offset = 0  # bytes of the journal already in the index
+        self._compacting = False
+        self._stamp = None        # (base stat, journal stat) as of our last load/write
+        self._listeners = []
+        self._watch_stop = None
+        self.reloads = 0          # full re-reads of the library, for the load test
 
     def _ensure_file_exists(self):
-        if not os.path.exists(FILE_NAME):
-            with open(FILE_NAME, "w") as f:
-                json.dump({}, f)
+        if not os.path.exists(self.path):
+            atomic_write(self.path, b"{}")
+
+    # --- Change notifications ---
+
+    def subscribe(self, listener):
+        """listener(event, tag, entry); returns a function that unsubscribes it"""
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener) if listener in self._listeners else None
+
+    def _emit(self, events):
+        for event in events:
+            for listener in list(self._listeners):
+                try:
+                    listener(*event)
+                except Exception as e:
+                    print(f"Error in snippet listener: {e}")
+
+    # --- Loading ---
+
+    def _current_stamp(self):
+        return (_stat_key(self.path), _stat_key(self.journal_path))
+
+    @staticmethod
+    def _parse_records(data):
+        """Journal records from complete lines of `data`; returns (records, bytes used)"""
+        end = data.rfind(b"\n") + 1  # a trailing partial line is a torn write, or one still in progress
+        records = []
+        for line in data[:end].splitlines():
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue  # Torn write from a crash, drop it
+            if "tag" in rec:
+                records.append(rec)
+        return records, end
+
+    def _add_record(self, rec):
+        entry = {"name": rec["name"], "size": rec["size"], "hash": rec["hash"], "terms": rec.get("terms", [])}
+        self._index.setdefault(rec["tag"], []).append(entry)
+        if rec["tag"] in self._search:
+            self._search[rec["tag"]].add(entry)
+        return entry
 
+    def _reload(self):
+        """Rebuilds the per-tag index from the base file plus the journal.
+        Call with the write lock and the file lock held."""
+        self._ensure_file_exists()
+        with open(self.path, "rb") as f:
+            raw = f.read()
+        data = json.loads(raw or b"{}")
+        base_crc = zlib.crc32(raw)
+
+        # Older libraries kept bodies inline; move them into the blob store on sight
+        has_inline = False
+        index = {}
+        for key, items in data.items():
+            entries = index.setdefault(key.upper(), [])
+            for item in items:
+                if "content" in item:
+                    has_inline = True
+                    digest, size = self.blobs.put(item["content"])
+                    item = {"name": item["name"], "size": size, "hash": digest,
+                            "terms": extract_terms(item["content"])}
+                entries.append(item)
+
+        try:
+            with open(self.journal_path, "rb") as f:
+                journal = f.read()
+        except FileNotFoundError:
+            journal = b""
+
+        self._index = index
+        self._search = {}
+        self._base_crc = base_crc
+        self._journal_count = 0
+        self._journal_offset = 0
+
+        # The header names the base the journal was written against
+        header_end = journal.find(b"\n") + 1
+        if header_end:
+            try:
+                header = json.loads(journal[:header_end])
+            except ValueError:
+                header = {}
+            records, used = self._parse_records(journal[header_end:])
+            if header.get("base") == base_crc:
+                for rec in records:
+                    self._add_record(rec)
+                self._journal_count = len(records)
+                self._journal_offset = header_end + used
+            else:
+                # Crash mid-compaction or a hand-edited base: keep the records the base
+                # doesn't already have and start a fresh journal for them
+                known = {(tag, e["name"], e["hash"]) for tag, entries in index.items() for e in entries}
+                kept = [rec for rec in records if (rec["tag"], rec["name"], rec["hash"]) not in known]
+                lines = [json.dumps({"base": base_crc})] + [json.dumps(rec) for rec in kept]
+                data = ("\n".join(lines) + "\n").encode("utf-8")
+                atomic_write(self.journal_path, data)
+                for rec in kept:
+                    self._add_record(rec)
+                self._journal_count = len(kept)
+                self._journal_offset = len(data)
+
+        self._stamp = self._current_stamp()
+        self.reloads += 1
+
+        if has_inline and not self._compacting:
+            self._compacting = True
+            threading.Thread(target=self.compact, daemon=True).start()
+
+    def _catch_up(self):
+        """Brings the index up to date with the files. Only the new end of the journal is
+        read when that is all that changed. Call with the write lock and the file lock held.
+        Returns the events to emit."""
+        stamp = self._current_stamp()
+        if stamp == self._stamp:
+            return []
+        offset = self._journal_offset
+        # Same base and the same journal file, grown past our offset: someone appended to it.
+        # A journal rewritten against the same base has a new inode, or at least no line break
+        # right before our offset, and needs the full reload.
+        if (self._stamp is not None and stamp[0] == self._stamp[0] and stamp[1] is not None
+                and self._stamp[1] is not None and stamp[1][0] == self._stamp[1][0] and stamp[1][2] >= offset):
+            with open(self.journal_path, "rb") as f:
+                f.seek(max(offset - 1, 0))
+                tail = f.read()
+            if offset == 0 or tail[:1] == b"\n":
+                records, used = self._parse_records(tail[1:] if offset else tail)
+                self._journal_offset += used
+                self._journal_count += len(records)
+                self._stamp = stamp
+                return [("add", rec["tag"], self._add_record(rec)) for rec in records]
+        first_load = self._stamp is None
+        self._reload()
+        return [] if first_load else [("reload", None, None)]
+
+    def _sync(self):
+        """Loads the library on first use, and with auto_refresh whenever the files changed"""
+        if self._stamp is not None and not (self.auto_refresh and self._current_stamp() != self._stamp):
+            return
+        with self._file_lock.hold():
+            with self._lock.write():
+                events = self._catch_up()
+        self._emit(events)
+
+    @perf.timed("load_snippets")
     def load_snippets(self, section_tag):
-        """Returns a list of dicts {'name':..., 'content':...} for the given tag"""
+        """Returns a list of dicts {'name':..., 'size':..., 'hash':..., 'terms':...} for the given tag.
+        Bodies are not read; use load_content(hash) for the one you need."""
         try:
-            with open(FILE_NAME, "r") as f:
-                data = json.load(f)
-            # Return empty list if key doesn't exist
-            return data.get(section_tag.upper(), [])
+            self._sync()
+            with self._lock.read():
+                return list(self._index.get(section_tag.upper(), []))
         except Exception:
             return []
 
+    def all_snippets(self):
+        """Returns (tag, metadata) pairs for the whole library"""
+        try:
+            self._sync()
+            with self._lock.read():
+                return [(key, entry) for key, entries in self._index.items() for entry in entries]
+        except Exception:
+            return []
+
+    def search_snippets(self, section_tag, query, limit=SEARCH_LIMIT):
+        """Like load_snippets, but only the top `limit` matches for the query"""
+        try:
+            self._sync()
+            with self._lock.read():
+                key = section_tag.upper()
+                searcher = self._search.get(key)
+                if searcher is None:
+                    # Two readers may both build it; either copy is correct
+                    searcher = SnippetSearchIndex.build(self._index.get(key, []))
+                    self._search[key] = searcher
+                return searcher.search(query, limit)
+        except Exception:
+            return []
+
+    def load_content(self, content_hash):
+        """Returns the body stored under the hash, or None if it can't be read"""
+        try:
+            return self.blobs.get(content_hash)
+        except Exception as e:
+            print(f"Error loading snippet: {e}")
+            return None
+
+    # --- Saving ---
+
+    def _ensure_journal(self):
+        if _stat_key(self.journal_path) is None:
+            header = (json.dumps({"base": self._base_crc}) + "\n").encode("utf-8")
+            atomic_write(self.journal_path, header)
+            self._journal_offset = len(header)
+
+    def _open_journal(self):
+        """The journal, positioned for appending. A torn line a crash left past the last
+        complete record is cut off first, or the next record would be glued onto it.
+        Call with the file lock held, after _catch_up."""
+        self._ensure_journal()
+        f = open(self.journal_path, "r+b")
+        f.truncate(self._journal_offset)
+        f.seek(self._journal_offset)
+        return f
+
+    def _append_journal(self, rec):
+        data = (json.dumps(rec) + "\n").encode("utf-8")
+        with self._open_journal() as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        self._journal_offset += len(data)
+        self._journal_count += 1
+
+    @perf.timed("save_snippet")
     def save_snippet(self, section_tag, name, content):
-        """Saves a new snippet under the section key"""
+        """Saves a new snippet under the section key. Returns its metadata dict, or False on error"""
         try:
-            with open(FILE_NAME, "r") as f:
-                data = json.load(f)
-            
             key = section_tag.upper()
-            if key not in data:
-                data[key] = []
-            
-            # Add new snippet
-            data[key].append({"name": name, "content": content})
-            
-            with open(FILE_NAME, "w") as f:
-                json.dump(data, f, indent=2)
-            return True
+            # Body goes to disk before the journal entry that points at it
+            digest, size = self.blobs.put(content)
+            entry = {"name": name, "size": size, "hash": digest, "terms": extract_terms(content)}
+            rec = dict(entry, tag=key)
+
+            # Lock order everywhere: file lock, then the in-memory lock. The journal write
+            # happens between the two, so searches aren't held up by the fsync.
+            with self._file_lock.hold():
+                with self._lock.write():
+                    events = self._catch_up()  # other processes' saves go first in the journal
+                self._append_journal(rec)
+                with self._lock.write():
+                    self._stamp = self._current_stamp()
+                    entry = self._add_record(rec)
+                    events.append(("add", key, entry))
+                    start_compaction = self._journal_count >= COMPACT_EVERY and not self._compacting
+                    if start_compaction:
+                        self._compacting = True
+            if start_compaction:
+                threading.Thread(target=self.compact, daemon=True).start()
+            self._emit(events)
+            return entry
         except Exception as e:
             print(f"Error saving snippet: {e}")
-            return False
\ No newline at end of file
+            return False
+
+    @perf.timed("import_snippets")
+    def import_snippets(self, records, on_progress=None):
+        """Adds many snippets at once. `records` is any iterable of {'tag', 'name', 'content'}
+        dicts (None for an unreadable one) and is consumed as it streams in; only the metadata
+        is kept. Invalid records and bodies already filed under the same tag are skipped.
+        Everything lands in one journal append, so other sessions see the import whole,
+        and a big import is compacted before returning.
+        Returns counts: {'read', 'imported', 'duplicates', 'invalid'}."""
+        stats = {"read": 0, "imported": 0, "duplicates": 0, "invalid": 0}
+        self._sync()
+        with self._lock.read():
+            seen = {(tag, entry["hash"]) for tag, entries in self._index.items() for entry in entries}
+
+        recs = []
+        # Bodies go into one pack, which is on disk before the journal points at any of them
+        with self.blobs.pack() as put_body:
+            for record in records:
+                stats["read"] += 1
+                if on_progress is not None and not stats["read"] % 10000:
+                    on_progress(stats["read"])
+                if not isinstance(record, dict):
+                    stats["invalid"] += 1
+                    continue
+                tag, name, content = record.get("tag"), record.get("name"), record.get("content")
+                if not (isinstance(tag, str) and tag.strip() and isinstance(name, str) and name.strip()
+                        and isinstance(content, str)):
+                    stats["invalid"] += 1
+                    continue
+                key = tag.strip().upper()
+                digest, size = put_body(content)
+                if (key, digest) in seen:
+                    stats["duplicates"] += 1
+                    continue
+                seen.add((key, digest))
+                recs.append((key, {"name": name.strip(), "size": size, "hash": digest,
+                                   "terms": extract_terms(content)}))
+        if not recs:
+            return stats
+
+        with self._file_lock.hold():
+            with self._lock.write():
+                events = self._catch_up()
+                if events:
+                    # Someone saved meanwhile; don't file their bodies twice
+                    known = {(tag, entry["hash"]) for tag, entries in self._index.items() for entry in entries}
+                    kept = [(key, entry) for key, entry in recs if (key, entry["hash"]) not in known]
+                    stats["duplicates"] += len(recs) - len(kept)
+                    recs = kept
+            written = 0
+            with self._open_journal() as f:
+                for start in range(0, len(recs), 1000):
+                    data = "".join(json.dumps(dict(entry, tag=key)) + "\n"
+                                   for key, entry in recs[start:start + 1000]).encode("utf-8")
+                    f.write(data)
+                    written += len(data)
+                f.flush()
+                os.fsync(f.fileno())
+            with self._lock.write():
+                self._journal_offset += written
+                self._journal_count += len(recs)
+                self._stamp = self._current_stamp()
+                for key, entry in recs:
+                    self._index.setdefault(key, []).append(entry)
+                for key in {key for key, _ in recs}:
+                    self._search.pop(key, None)  # rebuilt in one go on the next search
+                start_compaction = self._journal_count >= COMPACT_EVERY and not self._compacting
+                if start_compaction:
+                    self._compacting = True
+        stats["imported"] = len(recs)
+        # One reload instead of an "add" per snippet
+        self._emit(events + [("reload", None, None)])
+        if start_compaction:
+            self.compact()  # right here rather than in the background: imports already run off the UI thread
+        return stats
+
+    def export_snippets(self):
+        """Yields (tag, metadata, body) for the whole library, one body in memory at a time"""
+        for tag, entry in self.all_snippets():
+            content = self.load_content(entry["hash"])
+            if content is not None:
+                yield tag, entry, content
+
+    # --- Compaction ---
+
+    def compact(self):
+        """Folds the journal into the base file. Saves (from any process) can carry on while
+        the new base is written; whatever they append meanwhile moves to the new journal."""
+        try:
+            with self._compact_lock.hold(blocking=False) as acquired:
+                if not acquired:
+                    return  # Another thread or process is already compacting
+                with self._file_lock.hold():
+                    with self._lock.write():
+                        events = self._catch_up()
+                        self._ensure_journal()
+                        self._stamp = self._current_stamp()
+                        snapshot = {key: list(items) for key, items in self._index.items()}
+                        offset = self._journal_offset
+                        base_stamp = self._stamp[0]
+                self._emit(events)
+
+                # The slow part runs without the locks so saves are never blocked on it
+                raw = _dump_library(snapshot)
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(raw)
+                    f.flush()
+                    os.fsync(f.fileno())
+
+                with self._file_lock.hold():
+                    with self._lock.write():
+                        events = self._catch_up()
+                        if self._stamp[0] != base_stamp:
+                            os.remove(tmp_path)  # the base was replaced under us; leave it be
+                            return
+                        with open(self.journal_path, "rb") as f:
+                            f.seek(offset)
+                            tail = f.read(self._journal_offset - offset)  # saved since the snapshot
+                        header = (json.dumps({"base": zlib.crc32(raw)}) + "\n").encode("utf-8")
+                        os.replace(tmp_path, self.path)
+                        atomic_write(self.journal_path, header + tail)
+                        self._base_crc = zlib.crc32(raw)
+                        self._journal_offset = len(header) + len(tail)
+                        self._journal_count = tail.count(b"\n")
+                        self._stamp = self._current_stamp()
+                self._emit(events)
+        except Exception as e:
+            print(f"Error compacting snippets: {e}")
+        finally:
+            self._compacting = False
+
+    # --- Sharing ---
+
+    def watch(self, interval=WATCH_SECONDS):
+        """Polls the files in the background and applies other processes' changes,
+        notifying subscribers, so reads never have to check the disk"""
+        if self._watch_stop is not None:
+            return
+        self._watch_stop = threading.Event()
+
+        def run(stop):
+            while not stop.wait(interval):
+                if self._stamp is not None and self._current_stamp() != self._stamp:
+                    try:
+                        with self._file_lock.hold():
+                            with self._lock.write():
+                                events = self._catch_up()
+                        self._emit(events)
+                    except Exception as e:
+                        print(f"Error refreshing snippets: {e}")
+
+        threading.Thread(target=run, args=(self._watch_stop,), name="snippet-watch", daemon=True).start()
+
+    def close(self):
+        if self._watch_stop is not None:
+            self._watch_stop.set()
+            self._watch_stop = None
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def shared_manager(path=FILE_NAME):
+    """One manager per library file for the whole process, so every Flet session
+    shares a single in-memory copy and hears about each other's saves"""
+    key = os.path.abspath(path)
+    with _shared_lock:
+        manager = _shared.get(key)
+        if manager is None:
+            manager = _shared[key] = SnippetManager(path, auto_refresh=False)
+            manager.watch()
+        return manager
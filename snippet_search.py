@@ -0,0 +1,218 @@
+import bisect
+import heapq
+import re
+import sys
+
+SEARCH_LIMIT = 20
+# Only the first CONTENT_TERMS distinct words (3+ letters) of a body are searchable:
+# they are kept with the metadata so searching never loads a body. A word that first
+# appears later in a long snippet is not found by content search.
+CONTENT_TERMS = 16
+TERMS_WINDOW = 1024      # Chars of a body scanned at a time for those words
+FUZZY_CANDIDATES = 1000  # Cap on docs scored for trigram overlap when exact matches come up short
+SHORT_SCAN = 5000        # Names checked for a mid-word match of a 1-2 char query (no trigrams to use)
+
+_WORD_RE = re.compile(r"\w{3,}")
+_NON_WORD_RE = re.compile(r"\W")
+_WORD_START_RE = re.compile(r"(?<!\w)\w")
+
+# Rank buckets, lower is better
+NAME_PREFIX, NAME_WORD, NAME_SUBSTRING, CONTENT_MATCH, FUZZY = range(5)
+
+
+def extract_terms(content, limit=CONTENT_TERMS):
+    """First few distinct words of a body. Stored with the metadata so content can be
+    searched without loading any blobs. Reads the body in growing windows, so a long
+    one is rarely scanned to the end."""
+    terms = {}
+    start, window = 0, TERMS_WINDOW
+    while start < len(content):
+        end = start + window
+        if end < len(content):  # run on to the end of the word, so none is split across windows
+            match = _NON_WORD_RE.search(content, end)
+            end = match.start() if match else len(content)
+        for word in dict.fromkeys(_WORD_RE.findall(content[start:end].lower())):
+            if word not in terms:
+                terms[sys.intern(word)] = None  # the same few words recur across a library
+                if len(terms) >= limit:
+                    return list(terms)
+        start, window = end, window * 2
+    return list(terms)
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _word_suffixes(name):
+    """The name from each word start after the first: "senior python tutor" ->
+    "python tutor", "tutor". A query that prefixes one of these matches at a word."""
+    return [name[m.start():] for m in _WORD_START_RE.finditer(name) if m.start()]
+
+
+def _prefix_range(sorted_keys, prefix, limit):
+    """Doc ids of the first `limit` (key, doc id) pairs whose key starts with prefix"""
+    start = bisect.bisect_left(sorted_keys, (prefix,))
+    found = []
+    for key, doc_id in sorted_keys[start:start + limit]:
+        if not key.startswith(prefix):
+            break
+        found.append(doc_id)
+    return found
+
+
+class SnippetSearchIndex:
+    """Trigram index over snippet names, plus a word index over content terms, for a single tag"""
+
+    def __init__(self):
+        self._entries = []       # doc id -> metadata dict
+        self._names = []         # doc id -> lowercase name
+        self._terms = []         # doc id -> content terms
+        self._postings = {}      # name trigram -> [doc id, ...]
+        self._term_postings = {} # content term -> [doc id, ...]
+        self._sorted_names = []  # (lowercase name, doc id), for prefix lookups
+        self._sorted_words = []  # (name from a later word on, doc id), for word-start lookups
+        self._sorted_terms = []  # distinct content terms, for prefix lookups
+
+    def __len__(self):
+        return len(self._entries)
+
+    @classmethod
+    def build(cls, entries):
+        """Indexes a whole tag at once; sorts names a single time instead of per insert"""
+        index = cls()
+        for entry in entries:
+            index._add(entry)
+        index._sorted_names = sorted(zip(index._names, range(len(index._names))))
+        index._sorted_words = sorted((suffix, doc_id) for doc_id, name in enumerate(index._names)
+                                     for suffix in _word_suffixes(name))
+        index._sorted_terms = sorted(index._term_postings)
+        return index
+
+    def _add(self, entry):
+        doc_id = len(self._entries)
+        name = entry["name"].lower()
+        terms = entry.get("terms", ())
+
+        self._entries.append(entry)
+        self._names.append(name)
+        self._terms.append(terms)
+        postings = self._postings
+        for gram in _trigrams(name):
+            if gram in postings:
+                postings[gram].append(doc_id)
+            else:
+                postings[gram] = [doc_id]
+        postings = self._term_postings
+        new_terms = []
+        for term in terms:
+            if term in postings:
+                postings[term].append(doc_id)
+            else:
+                postings[term] = [doc_id]
+                new_terms.append(term)
+        return (name, doc_id), new_terms
+
+    def add(self, entry):
+        """Incremental insert, used when a snippet is saved"""
+        name_key, new_terms = self._add(entry)
+        bisect.insort(self._sorted_names, name_key)
+        name, doc_id = name_key
+        for suffix in _word_suffixes(name):
+            bisect.insort(self._sorted_words, (suffix, doc_id))
+        for term in new_terms:
+            bisect.insort(self._sorted_terms, term)
+
+    def _substring_matches(self, query, grams):
+        """Yields docs, oldest first, whose name contains the query anywhere. Walks the
+        rarest of the query's trigram postings and checks each name, so a caller that
+        stops early reads only the start of one list. Without trigrams (1-2 chars) the
+        names themselves are walked, up to SHORT_SCAN of them."""
+        if grams:
+            docs = min((self._postings.get(g, ()) for g in grams), key=len)
+        else:
+            docs = range(min(len(self._names), SHORT_SCAN))
+        names = self._names
+        for doc_id in docs:
+            if query in names[doc_id]:
+                yield doc_id
+
+    def _term_postings_for(self, word):
+        """Posting lists of every content term starting with `word`"""
+        terms = self._sorted_terms
+        start = bisect.bisect_left(terms, word)
+        end = bisect.bisect_left(terms, word + "\uffff", start)
+        return [self._term_postings[term] for term in terms[start:end]]
+
+    def _content_matches(self, words):
+        """Yields docs, oldest first, where every query word starts one of the content terms.
+        Walks the rarest word's postings and checks the rest against each doc's own terms,
+        so a caller that stops early never touches the other postings."""
+        by_word = sorted(((self._term_postings_for(word), word) for word in set(words)),
+                         key=lambda item: sum(map(len, item[0])))
+        postings, _ = by_word[0]
+        others = [word for _, word in by_word[1:]]
+        docs = postings[0] if len(postings) == 1 else heapq.merge(*postings)
+        last = None
+        for doc_id in docs:
+            if doc_id == last:
+                continue  # several terms with the prefix in one doc
+            last = doc_id
+            terms = self._terms[doc_id]
+            if all(any(term.startswith(word) for term in terms) for word in others):
+                yield doc_id
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        """Returns up to `limit` metadata dicts, best matches first: names starting with
+        the query, then names with a word starting with it, then names containing it,
+        then content, then near misses. Every lookup stops once `limit` docs are in
+        hand, so a common query costs no more than a rare one."""
+        query = query.strip().lower()
+        if not query:
+            return self._entries[:limit]
+
+        # Name prefix matches rank highest and come straight off the sorted list
+        prefix_ids = _prefix_range(self._sorted_names, query, limit)
+        if len(prefix_ids) >= limit:
+            return [self._entries[d] for d in prefix_ids]
+
+        scored = {d: (NAME_PREFIX, len(self._names[d]), d) for d in prefix_ids}
+        for doc_id in _prefix_range(self._sorted_words, query, limit):
+            if doc_id not in scored:
+                scored[doc_id] = (NAME_WORD, len(self._names[doc_id]), doc_id)
+
+        # Mid-word matches: every doc with the query's trigrams is a candidate, so no
+        # real match is missed; the walk just stops once the result is full
+        grams = _trigrams(query)
+        words = _WORD_RE.findall(query)
+        if len(scored) < limit:
+            for doc_id in self._substring_matches(query, grams):
+                if doc_id not in scored:
+                    scored[doc_id] = (NAME_SUBSTRING, len(self._names[doc_id]), doc_id)
+                    if len(scored) >= limit:
+                        break
+
+        # Content matches always rank below name matches, so only look if there's room.
+        # Query words match as prefixes: "revi" finds a body that says "review".
+        if words and len(scored) < limit:
+            for doc_id in self._content_matches(words):
+                if doc_id not in scored:
+                    scored[doc_id] = (CONTENT_MATCH, len(self._names[doc_id]), doc_id)
+                    if len(scored) >= limit:
+                        break
+
+        # Typos: fall back to trigram overlap when exact matching comes up short
+        if len(scored) < limit and len(grams) > 1:
+            hits = {}
+            lists = [self._postings.get(g, ()) for g in grams]
+            per_list = max(FUZZY_CANDIDATES // len(lists), 100)
+            for posting in lists:
+                for doc_id in posting[:per_list]:
+                    hits[doc_id] = hits.get(doc_id, 0) + 1
+            needed = max(2, len(grams) // 2)
+            for doc_id, count in hits.items():
+                if count >= needed and doc_id not in scored:
+                    scored[doc_id] = (FUZZY, -count, doc_id)
+
+        best = heapq.nsmallest(limit, scored.values())
+        return [self._entries[doc_id] for _, _, doc_id in best]
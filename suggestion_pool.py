@@ -0,0 +1,68 @@
+import flet as ft
+
+POOL_SIZE = 20
+ROW_HEIGHT = 45
+
+
+class SuggestionRowPool:
+    """Fixed set of suggestion rows that get relabelled in place.
+
+    The rows are created once and stay in the list view; show() rewrites their
+    text and colours and hides the ones it doesn't need, so typing never builds
+    new controls.
+    """
+
+    def __init__(self, list_view, size=POOL_SIZE):
+        self.list_view = list_view
+        self.rows = [self._make_row() for _ in range(size)]
+        self.list_view.controls = list(self.rows)
+        self._on_pick = None
+
+    def _make_row(self):
+        swatch = ft.Container(width=10, height=10)
+        icon = ft.Icon(ft.icons.FLASH_ON, size=16, visible=False)
+        label = ft.Text("", size=16, color=ft.colors.GREEN_50, font_family="Courier New")
+        detail = ft.Text("", size=12, color=ft.colors.GREEN_700, font_family="Courier New")
+        row = ft.Container(
+            content=ft.Row([swatch, icon, label, detail]),
+            padding=10,
+            on_click=self._clicked,
+            ink=True,
+            bgcolor=ft.colors.BLACK,
+            visible=False,
+        )
+        row.slots = (swatch, icon, label, detail)
+        return row
+
+    def show(self, items, on_pick, with_icon=False, detail_color=ft.colors.GREEN_700):
+        """items: (label, detail, color, payload) tuples or objects with those attributes.
+        Returns how many rows are now visible."""
+        self._on_pick = on_pick
+        shown = 0
+        for row, item in zip(self.rows, items):
+            if isinstance(item, tuple):
+                label_text, detail_text, color, payload = item
+            else:
+                label_text, detail_text, color, payload = item.label, item.detail, item.color, item
+            swatch, icon, label, detail = row.slots
+            swatch.visible = not with_icon
+            swatch.bgcolor = color
+            icon.visible = with_icon
+            icon.color = color
+            label.value = label_text
+            detail.value = detail_text
+            detail.color = detail_color
+            row.data = payload
+            row.visible = True
+            shown += 1
+        for row in self.rows[shown:]:
+            if not row.visible:
+                break  # Rows are filled front to back, so the rest are already hidden
+            row.visible = False
+            row.data = None
+        self.list_view.height = min(shown * ROW_HEIGHT, 200)
+        return shown
+
+    def _clicked(self, e):
+        if self._on_pick is not None and e.control.data is not None:
+            self._on_pick(e.control.data)
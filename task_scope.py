@@ -0,0 +1,82 @@
+"""Structured async work for a session's event handlers.
+
+Handlers start long work (a /forge, an ingest, an export) as a task owned by
+the session's TaskScope instead of a daemon thread. A new command, CLEAR, ESC
+or closing the page cancels what is in flight, and whatever the task was
+awaiting (an LLM stream, an executor job) is cancelled with it. CPU work goes
+through run_cpu(), so the event loop keeps handling events meanwhile.
+"""
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+CPU_WORKERS = int(os.getenv("PROMPTMASTER_CPU_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+_cpu_pool = None
+_cpu_pool_lock = threading.Lock()
+
+
+def cpu_pool():
+    """Shared by every session; sized for CPU work rather than for waiting"""
+    global _cpu_pool
+    with _cpu_pool_lock:
+        if _cpu_pool is None:
+            _cpu_pool = ThreadPoolExecutor(CPU_WORKERS, thread_name_prefix="cpu")
+        return _cpu_pool
+
+
+async def run_cpu(fn, *args, **kwargs):
+    """Awaits fn(*args, **kwargs) on the CPU pool. If the awaiting task is cancelled,
+    a job that hasn't started is dropped; one already running finishes unobserved."""
+    return await asyncio.get_running_loop().run_in_executor(cpu_pool(), functools.partial(fn, *args, **kwargs))
+
+
+class TaskScope:
+    """The tasks in flight for one session, by name. Create it on the session's loop;
+    cancel() may be called from any thread (e.g. a sync Flet handler)."""
+
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self._tasks = {}  # task -> name
+
+    def start(self, name, coro, exclusive=True):
+        """Runs coro as a task of this scope. exclusive=True cancels everything
+        already running first: one command's work at a time."""
+        if exclusive:
+            self.cancel()
+        task = self.loop.create_task(coro, name=name)
+        self._tasks[task] = name
+        task.add_done_callback(self._finished)
+        return task
+
+    def _finished(self, task):
+        name = self._tasks.pop(task, None)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Error in {name}: {task.exception()}")
+
+    def running(self, name=None):
+        return [task for task, task_name in list(self._tasks.items()) if name is None or task_name == name]
+
+    def cancel(self, name=None):
+        """Cancels the running tasks (only those called `name`, if given); returns how many"""
+        tasks = self.running(name)
+        for task in tasks:
+            if self._on_loop():
+                task.cancel()
+            else:
+                self.loop.call_soon_threadsafe(task.cancel)
+        return len(tasks)
+
+    def _on_loop(self):
+        try:
+            return asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            return False
+
+    async def close(self):
+        """Cancels everything and waits for the tasks to unwind"""
+        tasks = self.running()
+        self.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,59 @@
+"""Batch retries against the stub: quota errors and an open circuit breaker.
+
+Run from the repo root:  python -m pytest tests
+"""
+import asyncio
+import time
+
+import pytest
+
+import llm_response
+from llm_batch import call_with_retry_async, run_batch_async
+from llm_hedge import CircuitBreaker, CircuitOpenError
+from llm_stub import StubBackend
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    """get_response against a fresh stub, with a breaker of its own"""
+    monkeypatch.setattr(llm_response, "_settings", dict(llm_response._settings))
+    monkeypatch.setattr(llm_response, "_client", None)
+    monkeypatch.setattr(llm_response, "breaker", CircuitBreaker())
+    with StubBackend() as backend:
+        llm_response.configure(api_key="stub", base_url=backend.url, timeout=10)
+        yield backend
+
+
+def forge(archetype):
+    return llm_response.get_response_async(f"forge {archetype}", use_cache=False)
+
+
+def test_429_then_recover(stub):
+    recovers_at = time.monotonic() + 0.5
+    stub.status = lambda body: 429 if time.monotonic() < recovers_at else 200
+
+    results = asyncio.run(run_batch_async(list(range(16)), forge, concurrency=16, rate=0, retries=8,
+                                          backoff=0.1))
+
+    assert [error for _, error in results] == [None] * 16
+    assert all(result.startswith("You are a stub persona") for result, _ in results)
+    assert llm_response.breaker.state == "closed"
+    # No hedge fired on a 429, so every request was either a first try or a retry
+    assert stub.requests < 16 * 9
+
+
+def test_open_circuit_is_waited_out(stub, monkeypatch):
+    monkeypatch.setattr(llm_response, "breaker", CircuitBreaker(threshold=1, reset_after=0.3))
+    stub.status = 503
+    with pytest.raises(Exception):
+        asyncio.run(forge("first"))
+    with pytest.raises(CircuitOpenError) as opened:
+        asyncio.run(forge("second"))
+    assert 0 < opened.value.retry_after <= 0.3
+
+    stub.status = 200
+    started = time.monotonic()
+    result = asyncio.run(call_with_retry_async(forge, "third", retries=1, base=0.01))
+    assert result.startswith("You are a stub persona")
+    assert time.monotonic() - started >= 0.2  # waited for the breaker's trial call
+    assert llm_response.breaker.state == "closed"
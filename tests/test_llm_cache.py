@@ -0,0 +1,28 @@
+"""Response cache keys.
+
+Run from the repo root:  python -m pytest tests
+"""
+from llm_cache import ResponseCache, cache_key
+
+CONFIG = {"temperature": 0.1, "http_options": {"timeout": 5000}}
+
+
+def test_timeouts_dont_change_the_key():
+    assert cache_key("m", "hi", CONFIG) == cache_key("m", "hi", dict(CONFIG, http_options={"timeout": 1}))
+
+
+def test_other_backends_get_their_own_keys():
+    real = cache_key("m", "hi", CONFIG)
+    stub = cache_key("m", "hi", CONFIG, backend="http://127.0.0.1:8123")
+    assert real != stub
+    assert real == cache_key("m", "hi", CONFIG, backend=None)
+
+
+def test_stub_answers_never_reach_a_real_call(tmp_path, monkeypatch):
+    import llm_response
+    monkeypatch.setattr(llm_response, "response_cache", ResponseCache(path=str(tmp_path / "cache.sqlite3")))
+    monkeypatch.setitem(llm_response._settings, "base_url", "http://127.0.0.1:8123")
+    stub_key = llm_response._cache_key("m", "hi", CONFIG)
+    llm_response.response_cache.put(stub_key, "You are a stub persona")
+    monkeypatch.setitem(llm_response._settings, "base_url", None)
+    assert llm_response.response_cache.get(llm_response._cache_key("m", "hi", CONFIG)) is None
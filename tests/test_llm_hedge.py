@@ -0,0 +1,56 @@
+"""Hedging and the circuit breaker around quota errors.
+
+Run from the repo root:  python -m pytest tests
+"""
+import asyncio
+
+import pytest
+
+from llm_hedge import CircuitBreaker, hedged
+
+
+class QuotaError(Exception):
+    code = 429
+
+
+def test_quota_errors_dont_open_the_breaker():
+    breaker = CircuitBreaker(threshold=2)
+    for _ in range(5):
+        breaker.record_failure(QuotaError("RESOURCE_EXHAUSTED"))
+    assert breaker.state == "closed"
+    breaker.record_failure(RuntimeError("boom"))
+    breaker.record_failure(RuntimeError("boom"))
+    assert breaker.state == "open"
+
+
+def test_quota_error_on_the_trial_call_lets_the_next_one_through():
+    breaker = CircuitBreaker(threshold=1, reset_after=0)
+    breaker.record_failure(RuntimeError("boom"))
+    assert breaker.allow()  # the half-open trial
+    assert not breaker.allow()
+    breaker.record_failure(QuotaError())
+    assert breaker.allow()
+
+
+def test_no_hedge_after_a_quota_error():
+    started = []
+
+    async def attempt():
+        started.append(1)
+        raise QuotaError("429 RESOURCE_EXHAUSTED")
+
+    with pytest.raises(QuotaError):
+        asyncio.run(hedged(attempt, deadline=5, hedge_delay=1, max_attempts=2))
+    assert len(started) == 1
+
+
+def test_other_failures_still_hedge():
+    started = []
+
+    async def attempt():
+        started.append(1)
+        if len(started) == 1:
+            raise RuntimeError("connection reset")
+        return "ok"
+
+    assert asyncio.run(hedged(attempt, deadline=5, hedge_delay=1, max_attempts=2)) == ("ok", 2, 2)
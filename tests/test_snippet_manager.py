@@ -0,0 +1,195 @@
+"""Crash recovery of the snippet library's base file + journal, and several
+processes sharing one library.
+
+Run from the repo root:  python -m pytest tests
+"""
+import json
+import multiprocessing
+import os
+import time
+
+import pytest
+
+import snippet_manager
+from snippet_manager import SnippetManager
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "snippets.json")
+
+
+def names(manager, tag="ROLE"):
+    return [entry["name"] for entry in manager.load_snippets(tag)]
+
+
+def test_saves_survive_a_restart(path):
+    manager = SnippetManager(path)
+    manager.save_snippet("role", "pirate", "You are a pirate.")
+    manager.save_snippet("task", "summary", "Summarise it.")
+
+    reopened = SnippetManager(path)
+    assert names(reopened) == ["pirate"]
+    assert names(reopened, "TASK") == ["summary"]
+    entry = reopened.load_snippets("ROLE")[0]
+    assert reopened.load_content(entry["hash"]) == "You are a pirate."
+
+
+def test_torn_last_journal_line_is_dropped(path):
+    manager = SnippetManager(path)
+    manager.save_snippet("role", "pirate", "You are a pirate.")
+    manager.save_snippet("role", "poet", "You are a poet.")
+    with open(path + snippet_manager.JOURNAL_SUFFIX, "ab") as f:
+        f.write(b'{"name": "half", "size": 4, "ha')  # crash mid-append
+
+    reopened = SnippetManager(path)
+    assert names(reopened) == ["pirate", "poet"]
+
+
+def test_save_after_a_torn_line_is_kept(path):
+    SnippetManager(path).save_snippet("role", "pirate", "You are a pirate.")
+    with open(path + snippet_manager.JOURNAL_SUFFIX, "ab") as f:
+        f.write(b'{"name": "half", "size": 4, "ha')
+
+    manager = SnippetManager(path)
+    manager.save_snippet("role", "poet", "You are a poet.")
+    manager.import_snippets([{"tag": "role", "name": "monk", "content": "You are a monk."}])
+
+    assert names(SnippetManager(path)) == ["pirate", "poet", "monk"]
+
+
+def test_crash_between_base_and_journal_writes(path, monkeypatch):
+    manager = SnippetManager(path)
+    manager.save_snippet("role", "pirate", "You are a pirate.")
+    manager.save_snippet("role", "poet", "You are a poet.")
+
+    # Compaction swaps in the new base, then dies before rewriting the journal,
+    # which still names the old base and holds records the new base already has
+    real_write = snippet_manager.atomic_write
+
+    def crash_on_journal(target, data):
+        if target.endswith(snippet_manager.JOURNAL_SUFFIX):
+            raise OSError("simulated crash")
+        real_write(target, data)
+
+    monkeypatch.setattr(snippet_manager, "atomic_write", crash_on_journal)
+    manager.compact()
+    monkeypatch.setattr(snippet_manager, "atomic_write", real_write)
+    with open(path, "rb") as f:
+        assert b"pirate" in f.read()  # the base was replaced
+
+    # A save that only made it to the old journal must not be lost either
+    with open(path + snippet_manager.JOURNAL_SUFFIX, "ab") as f:
+        digest, size = manager.blobs.put("You are a monk.")
+        f.write((json.dumps({"name": "monk", "size": size, "hash": digest, "terms": [], "tag": "ROLE"})
+                 + "\n").encode("utf-8"))
+
+    reopened = SnippetManager(path)
+    assert names(reopened) == ["pirate", "poet", "monk"]
+    # ...and the journal now points at the new base, so another restart agrees
+    assert names(SnippetManager(path)) == ["pirate", "poet", "monk"]
+
+
+def test_compaction_folds_the_journal(path):
+    manager = SnippetManager(path)
+    for i in range(5):
+        manager.save_snippet("role", f"r{i}", f"Role number {i}.")
+    manager.compact()
+    with open(path + snippet_manager.JOURNAL_SUFFIX, "rb") as f:
+        assert f.read().count(b"\n") == 1  # just the header
+    assert names(SnippetManager(path)) == [f"r{i}" for i in range(5)]
+
+
+@pytest.mark.parametrize("in_place", [True, False])
+def test_journal_rewritten_against_the_same_base(path, in_place):
+    manager = SnippetManager(path)
+    manager.save_snippet("role", "pirate", "You are a pirate.")
+    manager.save_snippet("role", "poet", "You are a poet.")
+    assert names(manager) == ["pirate", "poet"]
+
+    # Another process rewrites the journal (same base) with a record in front, so the
+    # offset this manager read up to now lands in the middle of a line
+    journal_path = path + snippet_manager.JOURNAL_SUFFIX
+    with open(journal_path, "rb") as f:
+        old = f.read()
+    header_end = old.find(b"\n") + 1
+    digest, size = manager.blobs.put("You are a monk.")
+    monk = (json.dumps({"name": "monk", "size": size, "hash": digest, "terms": [], "tag": "ROLE"})
+            + "\n").encode("utf-8")
+    new = old[:header_end] + monk + old[header_end:]
+    assert new[len(old) - 1:len(old)] != b"\n"
+    if in_place:
+        with open(journal_path, "r+b") as f:
+            f.write(new)
+    else:
+        snippet_manager.atomic_write(journal_path, new)
+
+    assert names(manager) == ["monk", "pirate", "poet"]
+
+
+def test_failed_import_leaves_no_pack_behind(path):
+    manager = SnippetManager(path)
+
+    def records():
+        yield {"tag": "role", "name": "pirate", "content": "You are a pirate."}
+        raise OSError("export file went away")
+
+    with pytest.raises(OSError):
+        manager.import_snippets(records())
+    pack_dir = manager.blobs.pack_dir
+    assert os.listdir(pack_dir) == []
+    assert names(manager) == []
+
+
+# --- Several processes on one library ---
+
+def _save_many(path, worker, count, compact_every, start):
+    snippet_manager.COMPACT_EVERY = compact_every
+    manager = SnippetManager(path)
+    start.wait()
+    for i in range(count):
+        assert manager.save_snippet("task", f"w{worker}-{i}", f"Task {i} from worker {worker}.")
+    manager.compact()
+
+
+@pytest.mark.parametrize("compact_every", [snippet_manager.COMPACT_EVERY, 7])
+def test_two_processes_saving_at_once(path, compact_every):
+    ctx = multiprocessing.get_context()
+    start = ctx.Event()
+    count = 40
+    workers = [ctx.Process(target=_save_many, args=(path, worker, count, compact_every, start))
+               for worker in range(2)]
+    for process in workers:
+        process.start()
+    start.set()
+    for process in workers:
+        process.join(timeout=60)
+        assert process.exitcode == 0
+
+    saved = names(SnippetManager(path), "TASK")
+    expected = {f"w{worker}-{i}" for worker in range(2) for i in range(count)}
+    assert len(saved) == len(expected)  # nothing lost, nothing twice
+    assert set(saved) == expected
+    # Each process's saves stay in the order it made them
+    for worker in range(2):
+        assert [n for n in saved if n.startswith(f"w{worker}-")] == [f"w{worker}-{i}" for i in range(count)]
+
+
+def test_watcher_hears_other_processes(path):
+    manager = SnippetManager(path, auto_refresh=False)
+    manager.load_snippets("TASK")
+    manager.watch(interval=0.02)
+    try:
+        ctx = multiprocessing.get_context()
+        start = ctx.Event()
+        start.set()
+        process = ctx.Process(target=_save_many, args=(path, 0, 10, snippet_manager.COMPACT_EVERY, start))
+        process.start()
+        process.join(timeout=60)
+        assert process.exitcode == 0
+        deadline = time.monotonic() + 5
+        while len(manager.load_snippets("TASK")) < 10 and time.monotonic() < deadline:
+            time.sleep(0.02)
+    finally:
+        manager.close()
+    assert names(manager, "TASK") == [f"w0-{i}" for i in range(10)]
@@ -0,0 +1,48 @@
+"""Snippet search ranking and recall.
+
+Run from the repo root:  python -m pytest tests
+"""
+from snippet_search import CONTENT_TERMS, SnippetSearchIndex, extract_terms
+
+
+def entry(name, body=""):
+    return {"name": name, "size": len(body), "hash": name, "terms": extract_terms(body)}
+
+
+def names(index, query, limit=20):
+    return [e["name"] for e in index.search(query, limit)]
+
+
+def test_buckets_rank_prefix_word_substring_content():
+    index = SnippetSearchIndex.build([
+        entry("code reviewer"),          # mid-word
+        entry("notes", "please view the diff"),
+        entry("senior view writer"),     # word start
+        entry("viewer"),                 # prefix
+    ])
+    assert names(index, "view") == ["viewer", "senior view writer", "code reviewer", "notes"]
+
+
+def test_short_queries_match_mid_word():
+    index = SnippetSearchIndex.build([entry(f"filler {i}") for i in range(100)] + [entry("mysql tips")])
+    assert names(index, "ql") == ["mysql tips"]
+    assert names(index, "q") == ["mysql tips"]
+
+
+def test_added_snippets_are_found_by_word():
+    index = SnippetSearchIndex.build([entry("alpha one")])
+    index.add(entry("beta two"))
+    assert names(index, "two") == ["beta two"]
+    assert names(index, "tw") == ["beta two"]
+
+
+def test_common_substring_fills_the_limit():
+    index = SnippetSearchIndex.build([entry(f"reviewer {i}") for i in range(5000)])
+    assert len(names(index, "view", limit=20)) == 20
+
+
+def test_only_the_first_content_terms_are_searchable():
+    words = [f"word{chr(97 + i // 26)}{chr(97 + i % 26)}" for i in range(CONTENT_TERMS + 1)]
+    index = SnippetSearchIndex.build([entry("long", " ".join(words))])
+    assert names(index, words[CONTENT_TERMS - 1]) == ["long"]
+    assert names(index, words[CONTENT_TERMS]) == []
@@ -0,0 +1,81 @@
+"""Token counting: tokenizer choice and the background counter.
+
+Run from the repo root:  python -m pytest tests
+"""
+import base64
+import threading
+
+import pytest
+
+import token_counter
+from prompt_document import BlockData
+from token_counter import BPETokenizer, HeuristicTokenizer, TokenCounter, load_ranks, load_tokenizer
+
+MERGES = [b"he", b"ll", b"llo", b"hello", b" w", b"or", b" wor", b"ld", b" world"]
+
+
+@pytest.fixture
+def vocab(tmp_path):
+    """A tiny rank file in the tiktoken format: every byte, then a few merges"""
+    tokens = [bytes([i]) for i in range(256)] + MERGES
+    path = tmp_path / "vocab.tiktoken"
+    path.write_bytes(b"".join(base64.b64encode(t) + b" %d\n" % rank for rank, t in enumerate(tokens)))
+    return str(path)
+
+
+def test_local_vocab_goes_through_tiktoken_when_installed(vocab):
+    pytest.importorskip("tiktoken")
+    tokenizer = load_tokenizer(vocab)
+    assert isinstance(tokenizer, token_counter.TiktokenTokenizer)
+    assert tokenizer.count("hello world") == 2
+    assert tokenizer.count("hello world") == BPETokenizer(load_ranks(vocab)).count("hello world")
+
+
+def test_no_vocab_and_no_tiktoken_falls_back_to_an_estimate(tmp_path, monkeypatch):
+    monkeypatch.setitem(__import__("sys").modules, "tiktoken", None)  # import fails
+    tokenizer = load_tokenizer(str(tmp_path / "missing.tiktoken"))
+    assert isinstance(tokenizer, HeuristicTokenizer)
+    assert TokenCounter(lambda total: None, tokenizer).estimated
+
+
+class Block:
+    saved_tokens = None
+
+    def __init__(self, text, fail=False):
+        self._text = text
+        self.fail = fail
+
+    @property
+    def text(self):
+        if self.fail:
+            raise OSError("bodies file is gone")
+        return self._text
+
+
+def test_worker_survives_a_failing_block():
+    totals = []
+    settled = threading.Event()
+
+    def on_total(total):
+        totals.append(total)
+        if total == 3:
+            settled.set()
+
+    counter = TokenCounter(on_total, HeuristicTokenizer())
+    counter.update(Block("", fail=True))
+    counter.update(Block("x" * 12))  # 3 tokens, counted after the failure
+    assert settled.wait(5)
+    assert counter.total == 3
+
+
+def test_saved_count_skips_reading_the_body():
+    def load():
+        raise AssertionError("body read despite a saved count")
+
+    settled = threading.Event()
+    tokenizer = HeuristicTokenizer()
+    counter = TokenCounter(lambda total: total == 42 and settled.set(), tokenizer)
+    block = BlockData("ROLE", 1, source=(load, 1, (tokenizer.name, 42)))
+    counter.update(block)
+    assert settled.wait(5)
+    assert not block.loaded
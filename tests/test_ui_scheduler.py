@@ -0,0 +1,68 @@
+"""UpdateScheduler: marks from any thread coalesce into one update per frame, sent on the page loop.
+
+Run from the repo root:  python -m pytest tests
+"""
+import asyncio
+import threading
+
+import pytest
+
+from ui_scheduler import UpdateScheduler
+
+
+class Control:
+    page = True  # still on the page
+
+
+class Page:
+    """Just what the scheduler uses: the session loop and update()"""
+    connection = None
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.updates = []
+        self.threads = set()
+        self.sent = threading.Event()
+
+    def update(self, *controls):
+        self.updates.append(controls)
+        self.threads.add(threading.get_ident())
+        self.sent.set()
+
+
+@pytest.fixture
+def session():
+    """A running session loop and its thread"""
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield loop, thread
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+    loop.close()
+
+
+def test_marks_from_several_threads_make_one_update(session):
+    loop, loop_thread = session
+    page = Page(loop)
+    ui = UpdateScheduler(page, frame_seconds=0.05)
+    controls = [Control() for _ in range(4)]
+    workers = [threading.Thread(target=ui.mark, args=(control,)) for control in controls]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    ui.mark(controls[0])  # marked twice, sent once
+
+    assert page.sent.wait(5)
+    assert len(page.updates) == 1
+    assert sorted(map(id, page.updates[0])) == sorted(map(id, controls))
+    assert page.threads == {loop_thread.ident}
+
+
+def test_marking_after_the_session_loop_closed_is_a_no_op():
+    loop = asyncio.new_event_loop()
+    loop.close()
+    page = Page(loop)
+    UpdateScheduler(page).mark(Control())
+    assert page.updates == []
@@ -0,0 +1,129 @@
+"""Workspace autosave: journal replay order, crash recovery and the one-writer lock.
+
+Run from the repo root:  python -m pytest tests
+"""
+import pytest
+
+import workspace_store
+from prompt_document import PromptDocument
+from workspace_store import WorkspaceLocked, WorkspaceStore
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "workspace.json")
+
+
+def session(path):
+    """A store attached to a fresh document, like one app start"""
+    document = PromptDocument()
+    store = WorkspaceStore(path, interval=0)
+    store.attach(document)
+    return store, document
+
+
+def restored(path):
+    store, document = session(path)
+    state = [(block.tag_name, block.indent_level, block.text) for block in document.blocks]
+    store.close()
+    return state
+
+
+def test_replays_put_del_and_order(path):
+    store, document = session(path)
+    role = document.add("ROLE", 1, "You are a pirate.")
+    task = document.add("TASK", 1, "Find the treasure.")
+    notes = document.add("NOTES", 2, "draft")
+    store.close()
+
+    store, document = session(path)
+    role, task, notes = document.blocks
+    document.delete(task)
+    document.move(notes, 0)
+    document.set_text(role, "You are a poet.")
+    document.indent(notes, 1)
+    store.close()
+
+    assert restored(path) == [("NOTES", 1, "draft"), ("ROLE", 1, "You are a poet.")]
+
+
+def test_order_then_append_in_one_batch(path):
+    store, document = session(path)
+    document.add("ROLE", 1, "a")
+    second = document.add("TASK", 1, "b")
+    document.move(second, 0)
+    document.add("CONTEXT", 1, "c")  # appended after the reorder, so it goes last
+    store.close()
+
+    assert [tag for tag, _, _ in restored(path)] == ["TASK", "ROLE", "CONTEXT"]
+
+
+def test_clear_drops_everything_before_it(path):
+    store, document = session(path)
+    document.add("ROLE", 1, "old")
+    document.add("TASK", 1, "old")
+    store.close()
+
+    store, document = session(path)
+    document.clear()
+    document.add("CONTEXT", 1, "new")
+    store.close()
+
+    assert restored(path) == [("CONTEXT", 1, "new")]
+
+
+def test_replay_after_compaction(path, monkeypatch):
+    monkeypatch.setattr(workspace_store, "COMPACT_EVERY", 3)
+    store, document = session(path)
+    blocks = [document.add("TASK", 1, f"step {i}") for i in range(5)]
+    store.save()  # 5 records, so this snapshot folds them in
+    document.delete(blocks[1])
+    document.move(blocks[4], 0)
+    store.close()
+
+    assert [text for _, _, text in restored(path)] == ["step 4", "step 0", "step 2", "step 3"]
+
+
+def test_snapshot_keeps_token_counts(path):
+    store = WorkspaceStore(path, interval=0, count_tokens=lambda text: ("words", len(text.split())))
+    document = PromptDocument()
+    store.attach(document)
+    document.add("ROLE", 1, "You are a pirate.")
+    store.save()
+    store.compact()
+    store.close()
+
+    store = WorkspaceStore(path, interval=0)
+    document = PromptDocument()
+    store.attach(document)
+    (block,) = document.blocks
+    assert block.saved_tokens == ("words", 4)
+    assert not block.loaded  # the count came with the snapshot, not from the body
+    document.set_text(block, "You are a poet.")
+    assert block.saved_tokens is None  # stale once the text changes
+    store.close()
+
+
+def test_torn_last_journal_line(path):
+    store, document = session(path)
+    document.add("ROLE", 1, "kept")
+    store.close()
+    with open(path + workspace_store.JOURNAL_SUFFIX, "a", encoding="utf-8") as f:
+        f.write('{"op": "put", "id": 9, "ta')  # crash mid-write
+
+    assert restored(path) == [("ROLE", 1, "kept")]
+
+    # Edits after the crash land after the good records, not glued to the torn one
+    store, document = session(path)
+    document.add("TASK", 1, "after")
+    store.close()
+    assert restored(path) == [("ROLE", 1, "kept"), ("TASK", 1, "after")]
+
+
+def test_one_writer_per_workspace(path):
+    store, _ = session(path)
+    with pytest.raises(WorkspaceLocked):
+        WorkspaceStore(path).attach(PromptDocument())
+    store.close()
+    other, _ = session(path)  # free again once the first one closed
+    other.close()
@@ -0,0 +1,332 @@
+import argparse
+import base64
+import hashlib
+import math
+import os
+import re
+import sys
+import threading
+import urllib.request
+
+import perf
+from task_scope import cpu_pool
+
+# Byte-level BPE ranks in the tiktoken text format ("<base64 token> <rank>" per line),
+# e.g. cl100k_base.tiktoken. Override with PROMPTMASTER_VOCAB.
+VOCAB_FILE = os.getenv(
+    "PROMPTMASTER_VOCAB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "tokenizer.tiktoken"),
+)
+
+# Where `python token_counter.py --fetch` gets cl100k_base from (the file tiktoken uses)
+VOCAB_URL = "https://openaipublic.blob.core.windows.net/encodings/cl100k_base.tiktoken"
+VOCAB_SHA256 = "223921b76ee99bde995b7ff738513eef100fb51d18c93597a113bcffe865b2a7"
+TIKTOKEN_ENCODING = "cl100k_base"
+
+# cl100k_base's own pre-tokenizer, used with the local rank file when tiktoken is installed
+CL100K_PATTERN = (r"""'(?i:[sdmt]|ll|ve|re)|[^\r\n\p{L}\p{N}]?+\p{L}++|\p{N}{1,3}+| ?[^\s\p{L}\p{N}]++[\r\n]*+"""
+                  r"""|\s++$|\s*[\r\n]|\s+(?!\S)|\s""")
+
+# Without tiktoken: an approximation of that pattern with what the stdlib `re` supports
+# (no possessive quantifiers or \p{...} classes), so counts can differ slightly from
+# tiktoken's on unusual text
+_PIECE_RE = re.compile(
+    r"'(?i:[sdmt]|ll|ve|re)|[^\r\n\w]?[^\W\d_]+|\d{1,3}| ?[^\s\w]+[\r\n]*|\s*[\r\n]+|\s+(?!\S)|\s+"
+)
+PIECE_CACHE_SIZE = 50_000
+
+
+def load_ranks(path):
+    ranks = {}
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                token, rank = line.split()
+                ranks[base64.b64decode(token)] = int(rank)
+    return ranks
+
+
+class BPETokenizer:
+    """Counts tokens with byte-pair merges from a local rank file, in pure Python. Works
+    offline; used when tiktoken isn't installed. Its pre-tokenizer only approximates
+    cl100k_base's, so counts are close to tiktoken's but not always identical."""
+    name = "cl100k-approx"
+
+    def __init__(self, ranks):
+        self.ranks = ranks
+        self._cache = {}  # text piece -> token count; most prompts reuse the same words
+
+    def _bpe_count(self, piece: bytes):
+        ranks = self.ranks
+        if piece in ranks:
+            return 1
+        parts = [piece[i:i + 1] for i in range(len(piece))]
+        while len(parts) > 1:
+            # Merge the adjacent pair with the lowest rank, like the reference encoder
+            best_rank, best_i = None, None
+            for i in range(len(parts) - 1):
+                rank = ranks.get(parts[i] + parts[i + 1])
+                if rank is not None and (best_rank is None or rank < best_rank):
+                    best_rank, best_i = rank, i
+            if best_i is None:
+                break
+            parts[best_i:best_i + 2] = [parts[best_i] + parts[best_i + 1]]
+        return len(parts)
+
+    def count(self, text):
+        cache = self._cache
+        total = 0
+        for piece in _PIECE_RE.findall(text):
+            n = cache.get(piece)
+            if n is None:
+                n = self._bpe_count(piece.encode("utf-8"))
+                if len(cache) >= PIECE_CACHE_SIZE:
+                    cache.clear()
+                cache[piece] = n
+            total += n
+        return total
+
+
+class TiktokenTokenizer:
+    """cl100k_base through tiktoken: exact counts"""
+    name = "cl100k"
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+
+    def count(self, text):
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+
+class HeuristicTokenizer:
+    """Last resort when no vocabulary can be loaded: the old chars / 4 estimate"""
+    name = "chars/4"
+    estimate = True
+
+    def count(self, text):
+        return math.ceil(len(text) / 4)
+
+
+def load_tokenizer(path=VOCAB_FILE):
+    """tiktoken when it's installed, with the local rank file if there is one (else tiktoken
+    downloads and caches cl100k_base itself); without tiktoken, the local rank file through
+    BPETokenizer; else the chars / 4 estimate, which is reported once"""
+    ranks = None
+    try:
+        ranks = load_ranks(path)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Error loading tokenizer vocab: {e}")
+    try:
+        import tiktoken
+        if ranks is not None:
+            return TiktokenTokenizer(tiktoken.Encoding(TIKTOKEN_ENCODING, pat_str=CL100K_PATTERN,
+                                                       mergeable_ranks=ranks, special_tokens={}))
+        return TiktokenTokenizer(tiktoken.get_encoding(TIKTOKEN_ENCODING))
+    except ImportError:
+        pass
+    except Exception as e:
+        print(f"Error loading tiktoken {TIKTOKEN_ENCODING}: {e}")
+    if ranks is not None:
+        return BPETokenizer(ranks)
+    print(f"Token counts are estimates (chars / 4): no vocabulary at {path} and tiktoken "
+          f"couldn't provide {TIKTOKEN_ENCODING}. Run `python token_counter.py --fetch`.")
+    return HeuristicTokenizer()
+
+
+def fetch_vocab(path=VOCAB_FILE, url=VOCAB_URL, sha256=VOCAB_SHA256):
+    """Downloads the rank file, checks its hash and swaps it in; returns the path"""
+    with urllib.request.urlopen(url, timeout=60) as response:
+        data = response.read()
+    digest = hashlib.sha256(data).hexdigest()
+    if sha256 and digest != sha256:
+        raise ValueError(f"{url} has sha256 {digest}, expected {sha256}")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return path
+
+
+class TokenCounter:
+    """Keeps a token count per block and a running total.
+
+    update() only queues the block's latest text; a background thread recounts
+    just the blocks that changed and reports the new total through on_total.
+    Attached files are counted on the CPU pool (count_attachment), so a big log
+    never holds up the count for a block being typed in. Totals are numbered as
+    they change, and on_total never gets one older than the last it was given.
+    """
+
+    def __init__(self, on_total, tokenizer=None):
+        self.on_total = on_total
+        self._tokenizer = tokenizer
+        self._counts = {}       # block -> tokens
+        self._pending = {}      # block -> latest text not yet counted
+        self._live = set()      # blocks still in the workspace
+        self._total = 0
+        self._seq = 0           # bumped with every change to _total
+        self._published = 0     # _seq of the last total handed to on_total
+        self._publish_lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._tokenizer_lock = threading.Lock()
+        threading.Thread(target=self._worker, daemon=True).start()
+
+    @property
+    def total(self):
+        return self._total
+
+    @property
+    def estimated(self):
+        """True when counts are the chars / 4 fallback rather than real BPE counts"""
+        return getattr(self._tokenizer, "estimate", False)
+
+    @property
+    def tokenizer(self):
+        if self._tokenizer is None:
+            with self._tokenizer_lock:
+                if self._tokenizer is None:
+                    self._tokenizer = load_tokenizer()
+        return self._tokenizer
+
+    def count_text(self, text):
+        """(tokenizer name, tokens) for text, outside the running total. The workspace
+        saves these with its snapshots so a restored body needn't be read to be counted."""
+        tokenizer = self.tokenizer
+        return tokenizer.name, tokenizer.count(text)
+
+    def update(self, block, text=None):
+        """text=None reads block.text on the worker, so a lazily restored body loads there"""
+        with self._cond:
+            self._pending[block] = text
+            self._live.add(block)
+            self._cond.notify()
+
+    def count_attachment(self, block, on_progress=None):
+        """Counts block.attachment chunk by chunk in the background. The total
+        moves up as chunks are counted; on_progress(tokens, done) follows along."""
+        with self._cond:
+            self._pending.pop(block, None)
+            self._live.add(block)
+
+        def progress(n):
+            self._set_count(block, n)
+            if on_progress is not None:
+                on_progress(n, False)
+
+        def run():
+            try:
+                with perf.timer("attachment_count"):
+                    n = block.attachment.count_tokens(self.tokenizer, progress, lambda: block in self._live)
+            except (OSError, ValueError) as e:
+                print(f"Error counting attachment tokens: {e}")
+                return
+            if n is not None and on_progress is not None:
+                on_progress(n, True)
+
+        # Shares the CPU pool with the UI's other off-loop work instead of a thread per file
+        cpu_pool().submit(run)
+
+    def _snapshot(self):
+        """Numbers the current total; call with _cond held"""
+        self._seq += 1
+        return self._seq, self._total
+
+    def _publish(self, snapshot):
+        # Callers race to get here from different threads: drop whatever was overtaken
+        seq, total = snapshot
+        with self._publish_lock:
+            if seq <= self._published:
+                return
+            self._published = seq
+            self.on_total(total)
+
+    def _set_count(self, block, n):
+        with self._cond:
+            if block not in self._live:
+                return
+            self._total += n - self._counts.get(block, 0)
+            self._counts[block] = n
+            snapshot = self._snapshot()
+        self._publish(snapshot)
+
+    def remove(self, block):
+        with self._cond:
+            self._pending.pop(block, None)
+            self._live.discard(block)
+            self._total -= self._counts.pop(block, 0)
+            snapshot = self._snapshot()
+        self._publish(snapshot)
+
+    def retain(self, blocks):
+        """Drops counts for blocks that are no longer in the workspace"""
+        keep = set(blocks)
+        with self._cond:
+            self._live &= keep
+            for block in [b for b in self._counts if b not in keep]:
+                self._total -= self._counts.pop(block)
+            for block in [b for b in self._pending if b not in keep]:
+                del self._pending[block]
+            snapshot = self._snapshot()
+        self._publish(snapshot)
+
+    def clear(self):
+        with self._cond:
+            self._counts.clear()
+            self._pending.clear()
+            self._live.clear()
+            self._total = 0
+            snapshot = self._snapshot()
+        self._publish(snapshot)
+
+    def _worker(self):
+        tokenizer = self.tokenizer
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                block, text = self._pending.popitem()
+
+            n = None
+            try:
+                saved = block.saved_tokens if text is None else None
+                if saved is not None and saved[0] == tokenizer.name:
+                    n = saved[1]  # counted when the snapshot was written; the body stays on disk
+                else:
+                    if text is None:
+                        text = block.text  # a lazy body is read from disk here
+                    with perf.timer("token_count"):
+                        n = tokenizer.count(text)
+            except Exception as e:
+                # One bad block mustn't stop the count for the rest of the session
+                print(f"Error counting tokens: {e}")
+
+            with self._cond:
+                # Skip if the block was deleted or edited again while we were counting
+                if n is not None and block not in self._pending and block in self._live:
+                    self._total += n - self._counts.get(block, 0)
+                    self._counts[block] = n
+                snapshot = self._snapshot()
+                idle = not self._pending
+            if idle:  # whatever this item did, the total settles once the queue is empty
+                self._publish(snapshot)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Token counting vocabulary.")
+    parser.add_argument("--fetch", action="store_true", help=f"download {TIKTOKEN_ENCODING} to the vocab path")
+    parser.add_argument("--vocab", default=VOCAB_FILE, help=f"rank file (default {VOCAB_FILE})")
+    args = parser.parse_args(argv)
+    if args.fetch:
+        try:
+            print(f"Saved {fetch_vocab(args.vocab)}", file=sys.stderr)
+        except (OSError, ValueError) as e:
+            print(f"Error fetching tokenizer vocab: {e}", file=sys.stderr)
+            return 1
+    print(f"tokenizer: {type(load_tokenizer(args.vocab)).__name__}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
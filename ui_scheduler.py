@@ -0,0 +1,160 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import perf
+
+FRAME_SECONDS = 1 / 60
+
+# PROMPTMASTER_UI_STATS=1 prints what each user action sent to the client.
+# PROMPTMASTER_UI_COALESCE=0 flushes on every mark, for before/after comparisons.
+STATS_ENABLED = os.getenv("PROMPTMASTER_UI_STATS") == "1"
+COALESCE = os.getenv("PROMPTMASTER_UI_COALESCE", "1") != "0"
+
+
+class UpdateStats:
+    def __init__(self):
+        self.events = 0     # times the action ran
+        self.updates = 0    # messages sent to the client
+        self.controls = 0   # controls included in those messages
+        self.bytes = 0      # approximate serialized size
+
+    def __repr__(self):
+        return (f"{self.events} event(s), {self.updates} update(s), "
+                f"{self.controls} control(s), ~{self.bytes} bytes")
+
+
+class UpdateScheduler:
+    """Collects dirty controls and sends them to the client at most once per frame.
+
+    Handlers call mark(control, ...) instead of page.update(). Only the marked
+    controls are sent, in a single page.update(*controls) call. mark_page() is
+    for changes that need a full update (dialogs, snack bars). The flush runs on
+    the page's event loop, from any thread that marks.
+    """
+
+    def __init__(self, page, frame_seconds=FRAME_SECONDS):
+        self.page = page
+        self.frame_seconds = frame_seconds
+        self.stats = {}           # action name -> UpdateStats
+
+        self._lock = threading.Lock()
+        self._dirty = {}          # id(control) -> control, in mark order
+        self._full = False
+        self._scheduled = False   # a flush is waiting on the page loop
+        self._local = threading.local()
+        self._frame_action = None # action that opened the pending frame
+        self._frame_started = None
+        self._sending_action = None
+
+        if STATS_ENABLED:
+            self._hook_connection()
+
+    # --- Marking ---
+
+    def mark(self, *controls):
+        with self._lock:
+            for control in controls:
+                self._dirty[id(control)] = control
+            self._schedule()
+
+    def mark_page(self):
+        with self._lock:
+            self._full = True
+            self._schedule()
+
+    def _schedule(self):
+        if self._frame_action is None:
+            self._frame_action = self._current_action()
+        if self._frame_started is None and perf.ENABLED:
+            self._frame_started = time.perf_counter()
+        loop = self.page.loop
+        try:
+            if not COALESCE:
+                loop.call_soon_threadsafe(self.flush)
+            elif not self._scheduled:
+                # One callback on the page loop per frame, rather than a timer thread per frame
+                loop.call_soon_threadsafe(loop.call_later, self.frame_seconds, self.flush)
+                self._scheduled = True
+        except RuntimeError:
+            pass  # the loop is closed: the session is gone, nothing to send to
+
+    # --- Flushing ---
+
+    def flush(self):
+        with self._lock:
+            self._scheduled = False
+            # Skip controls removed from the page since they were marked (e.g. scrolled out)
+            controls = [c for c in self._dirty.values() if getattr(c, "page", None) is not None]
+            full = self._full
+            action = self._frame_action or "other"
+            self._dirty.clear()
+            self._full = False
+            self._frame_action = None
+            frame_started, self._frame_started = self._frame_started, None
+        if not controls and not full:
+            return
+
+        self._sending_action = action
+        try:
+            with perf.timer("page_update"):
+                if full:
+                    self.page.update()
+                else:
+                    self.page.update(*controls)
+        finally:
+            self._sending_action = None
+        if frame_started is not None:
+            perf.observe("mark_to_update", time.perf_counter() - frame_started)
+
+        if STATS_ENABLED:
+            self._stats_for(action).controls += len(controls) if not full else 1
+            print(f"[ui] {action}: {self._stats_for(action)}")
+
+    # --- Instrumentation ---
+
+    def _current_action(self):
+        return getattr(self._local, "action", None)
+
+    def _stats_for(self, action):
+        stats = self.stats.get(action)
+        if stats is None:
+            stats = self.stats[action] = UpdateStats()
+        return stats
+
+    @contextmanager
+    def action(self, name):
+        """Labels everything marked inside the block, e.g. with ui.action("add_block"):"""
+        previous = self._current_action()
+        self._local.action = name
+        if STATS_ENABLED:
+            self._stats_for(name).events += 1
+        try:
+            yield
+        finally:
+            self._local.action = previous
+
+    def _hook_connection(self):
+        """Counts every message the page sends, including ones that bypass the scheduler
+        (focus(), control.update() from worker threads)."""
+        conn = self.page.connection
+        send = getattr(conn, "send_commands", None)
+        if send is None:
+            return
+
+        def counting_send(session_id, commands):
+            action = self._sending_action or self._current_action() or "other"
+            stats = self._stats_for(action)
+            stats.updates += 1
+            try:
+                stats.bytes += len(json.dumps(commands, default=lambda o: getattr(o, "__dict__", str(o))))
+            except Exception:
+                pass
+            return send(session_id, commands)
+
+        conn.send_commands = counting_send
+
+    def report(self):
+        return "\n".join(f"{name}: {stats}" for name, stats in sorted(self.stats.items()))
@@ -0,0 +1,429 @@
+import atexit
+import json
+import mmap
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+from functools import partial
+
+import perf
+from attachments import Attachment
+from prompt_document import BlockData
+from file_util import FileLock, atomic_write
+
+WORKSPACE_FILE = os.getenv("PROMPTMASTER_WORKSPACE", "workspace.json")
+
+# In web mode every browser gets a workspace of its own in here, named by a random key
+WORKSPACE_DIR = os.getenv("PROMPTMASTER_WORKSPACE_DIR", "workspaces")
+_KEY_RE = re.compile(r"[0-9a-f]{32}")
+
+# Changes since the last snapshot are appended here, a batch per autosave
+JOURNAL_SUFFIX = ".journal"
+LOCK_SUFFIX = ".lock"
+AUTOSAVE_SECONDS = 1.0
+COMPACT_EVERY = 500               # journal records before folding into a new snapshot
+COMPACT_BYTES = 4 * 1024 * 1024
+
+
+class WorkspaceLocked(Exception):
+    """Another session or process already has this workspace open"""
+
+
+def new_workspace_key():
+    return uuid.uuid4().hex
+
+
+def workspace_path(key=None):
+    """The desktop app's single workspace for key=None, else the one for that key.
+    Keys come back from the browser, so anything but our own format is refused."""
+    if key is None:
+        return WORKSPACE_FILE
+    if not isinstance(key, str) or not _KEY_RE.fullmatch(key):
+        raise ValueError(f"not a workspace key: {key!r}")
+    return os.path.join(WORKSPACE_DIR, f"{key}.json")
+
+
+class BodyReader:
+    """Memory-mapped view of a snapshot's bodies file; bodies are decoded on demand"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+
+    def read(self, offset, length):
+        if self._map is None or length == 0:
+            return ""
+        return self._map[offset:offset + length].decode("utf-8")
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+
+class WorkspaceStore:
+    """Keeps the workspace on disk so closing the app doesn't lose it.
+
+    Layout: WORKSPACE_FILE holds block metadata, bodies sit back to back in a
+    separate bodies file (so restore can leave them on disk until read), and the
+    journal collects put/del/order/clear records written since that snapshot.
+    Attached files are stored by path only.
+
+    Edits only touch in-memory bookkeeping on the calling thread. A background
+    thread writes the changed blocks about once a second and compacts the
+    journal into a fresh snapshot when it grows. With count_tokens (text ->
+    (tokenizer, tokens)) the snapshot also keeps each body's token count, so a
+    restored body can be counted without reading it.
+
+    One writer per workspace: attach() holds a lock file next to it until
+    close(), and raises WorkspaceLocked if another session or process has it.
+    """
+
+    def __init__(self, path=WORKSPACE_FILE, interval=AUTOSAVE_SECONDS, count_tokens=None):
+        self.path = path
+        self.journal_path = path + JOURNAL_SUFFIX
+        self.interval = interval
+        self.count_tokens = count_tokens
+        self.document = None
+
+        self._lock = threading.Lock()
+        self._save_lock = threading.RLock()  # one save (or compaction) at a time, close() included
+        self._wake = threading.Event()
+        self._ids = {}              # BlockData -> persistent id
+        self._order = {}            # BlockData -> None, mirrors the document order
+        self._ops = []              # structural changes not yet written, in order
+        self._dirty = {}            # BlockData -> None, text or level changed
+        self._next_id = 1
+        self._generation = 0
+        self._reader = None
+        self._journal = None
+        self._journal_records = 0
+        self._journal_bytes = 0
+        self._journal_stale = True  # rewrite the journal header before appending
+        self._thread = None
+        self._closed = False
+        self._held = ExitStack()    # the workspace lock, from attach() to close()
+
+    # --- Restore ---
+
+    def _load_base(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                base = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"Error loading workspace: {e}")
+            return {}
+
+        self._generation = base.get("generation", 0)
+        self._next_id = base.get("next_id", 1)
+        bodies = base.get("bodies")
+        if bodies:
+            try:
+                self._reader = BodyReader(os.path.join(os.path.dirname(os.path.abspath(self.path)), bodies))
+            except OSError as e:
+                print(f"Error opening workspace bodies: {e}")
+                return {}
+
+        entries = {}
+        tokens = base.get("tokens") or []
+        for i, (block_id, tag, level, color, offset, length, lines, *attach) in enumerate(base.get("blocks", [])):
+            source = (partial(self._reader.read, offset, length), lines)
+            if i < len(tokens) and tokens[i]:
+                source += (tuple(tokens[i]),)
+            entries[block_id] = {
+                "tag": tag, "level": level, "color": color, "source": source,
+                "attach": attach[0] if attach else None,
+            }
+        return entries
+
+    def _replay_journal(self, entries):
+        try:
+            with open(self.journal_path, encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            return
+        if not lines:
+            return
+        try:
+            header = json.loads(lines[0])
+        except ValueError:
+            header = {}
+        if header.get("base") != self._generation:
+            return  # Left over from before the last snapshot; already folded in
+
+        self._journal_stale = False
+        self._journal_records = len(lines) - 1
+        self._journal_bytes = sum(len(line) + 1 for line in lines)
+        for number, line in enumerate(lines[1:], 1):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Torn last line from a crash; everything before it is good. Cut it off,
+                # or the next autosave would append to it and be lost along with it.
+                good = lines[:number]
+                atomic_write(self.journal_path, "".join(line + "\n" for line in good).encode("utf-8"))
+                self._journal_records = len(good) - 1
+                self._journal_bytes = sum(len(line) + 1 for line in good)
+                break
+            op = record.get("op")
+            if op == "put":
+                entry = entries.setdefault(record["id"], {})
+                entry.update(tag=record["tag"], level=record["level"], color=record.get("color"),
+                             attach=record.get("attach"))
+                if "text" in record:
+                    entry["text"] = record["text"]
+                    entry.pop("source", None)
+                self._next_id = max(self._next_id, record["id"] + 1)
+            elif op == "del":
+                entries.pop(record["id"], None)
+            elif op == "order":
+                entries = {i: entries[i] for i in record["ids"] if i in entries} | entries
+            elif op == "clear":
+                entries = {}
+        return entries
+
+    def restore(self, document):
+        """Fills an empty document with the saved workspace. Returns the block count."""
+        with perf.timer("workspace_restore"):
+            entries = self._load_base()
+            replayed = self._replay_journal(entries)
+            if replayed is not None:
+                entries = replayed
+            for block_id, entry in entries.items():
+                if "tag" not in entry:
+                    continue
+                attachment = None
+                if entry.get("attach"):
+                    try:
+                        attachment = Attachment(entry["attach"])
+                        attachment.preview()
+                    except OSError as e:
+                        # Keep the block so the user sees what went missing
+                        print(f"Error restoring attachment: {e}")
+                        entry = dict(entry, text=f"[missing attachment: {entry['attach']}]", source=None)
+                block = BlockData(entry["tag"], entry["level"], entry.get("color"),
+                                  text=entry.get("text", ""), source=entry.get("source"), attachment=attachment)
+                self._ids[block] = block_id
+                self._order[block] = None
+                document.append(block)
+        return len(entries)
+
+    def _acquire(self):
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        if not self._held.enter_context(FileLock(self.path + LOCK_SUFFIX).hold(blocking=False)):
+            self._held.close()
+            raise WorkspaceLocked(f"{self.path} is open in another session")
+
+    def attach(self, document):
+        """Restores into `document`, then autosaves every later change until close()"""
+        self._acquire()
+        self.document = document
+        count = self.restore(document)
+        document.subscribe(self._on_change)
+        self._thread = threading.Thread(target=self._run, name="autosave", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+        return count
+
+    # --- Change tracking (runs on the editing thread, so it stays O(1)) ---
+
+    def _on_change(self, event, block):
+        with self._lock:
+            if event in ("text", "indent"):
+                self._dirty[block] = None
+            elif event == "append":
+                block_id = self._next_id
+                self._next_id += 1
+                self._ids[block] = block_id
+                self._order[block] = None
+                self._ops.append(("append", block, block_id))
+            elif event == "delete":
+                block_id = self._ids.pop(block, None)
+                self._order.pop(block, None)
+                self._dirty.pop(block, None)
+                if block_id is not None:
+                    self._ops.append(("delete", None, block_id))
+            elif event == "move":
+                self._order = dict.fromkeys(self.document.blocks)
+                self._ops.append(("order", None, [self._ids[b] for b in self._order]))
+            elif event == "clear":
+                self._ids.clear()
+                self._order.clear()
+                self._dirty.clear()
+                self._ops.append(("clear", None, None))
+        if not self._wake.is_set():
+            self._wake.set()
+
+    # --- Writing (background thread) ---
+
+    def _put(self, block, block_id):
+        record = {"op": "put", "id": block_id, "tag": block.tag_name,
+                  "level": block.indent_level, "color": block.border_color}
+        if block.attachment is not None:
+            record["attach"] = block.attachment.path  # only the path; the file stays where it is
+        if block.loaded:
+            record["text"] = block.text  # an untouched lazy body is already in the snapshot
+        return record
+
+    def _take_records(self):
+        with self._lock:
+            ops, self._ops = self._ops, []
+            dirty, self._dirty = self._dirty, {}
+            dirty_ids = [(block, self._ids[block]) for block in dirty if block in self._ids]
+
+        records = []
+        written = set()
+        for kind, block, value in ops:
+            if kind == "append":
+                records.append(self._put(block, value))
+                written.add(block)
+            elif kind == "delete":
+                records.append({"op": "del", "id": value})
+            elif kind == "order":
+                records.append({"op": "order", "ids": value})
+            elif kind == "clear":
+                records.append({"op": "clear"})
+        records.extend(self._put(block, block_id) for block, block_id in dirty_ids if block not in written)
+        return records
+
+    def save(self):
+        """Appends everything changed since the last save to the journal"""
+        with self._save_lock:
+            self._save()
+
+    def _save(self):
+        records = self._take_records()
+        if not records:
+            return
+        with perf.timer("autosave"):
+            data = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+            try:
+                if self._journal_stale or self._journal is None:
+                    if self._journal is not None:
+                        self._journal.close()
+                    mode = "w" if self._journal_stale else "a"
+                    self._journal = open(self.journal_path, mode, encoding="utf-8")
+                    if self._journal_stale:
+                        self._journal.write(json.dumps({"base": self._generation}) + "\n")
+                        self._journal_records = 0
+                        self._journal_bytes = 0
+                        self._journal_stale = False
+                self._journal.write(data)
+                self._journal.flush()
+                self._journal_records += len(records)
+                self._journal_bytes += len(data)
+            except OSError as e:
+                print(f"Error autosaving workspace: {e}")
+                return
+        if self._journal_records >= COMPACT_EVERY or self._journal_bytes >= COMPACT_BYTES:
+            self.compact()
+
+    def compact(self):
+        """Writes a fresh snapshot (metadata + bodies) and starts an empty journal"""
+        with self._save_lock:
+            self._compact()
+
+    def _tokens(self, block, text):
+        if self.count_tokens is None or block.attachment is not None:
+            return None  # attached files are counted from the file itself
+        try:
+            return self.count_tokens(text)
+        except Exception as e:
+            print(f"Error counting workspace tokens: {e}")
+            return None
+
+    def _compact(self):
+        with self._lock:
+            blocks = list(self._order)
+            ids = [self._ids[block] for block in blocks]
+            next_id = self._next_id
+
+        with perf.timer("workspace_compact"):
+            generation = self._generation + 1
+            bodies_name = f"{os.path.basename(self.path)}.bodies.{generation}"
+            bodies_path = os.path.join(os.path.dirname(os.path.abspath(self.path)), bodies_name)
+            chunks = []
+            rows = []
+            tokens = []
+            offset = 0
+            for block, block_id in zip(blocks, ids):
+                saved = block.saved_tokens
+                text = block.text  # loads lazy bodies, so nothing points at the old file afterwards
+                tokens.append(saved or self._tokens(block, text))
+                data = text.encode("utf-8")
+                chunks.append(data)
+                row = [block_id, block.tag_name, block.indent_level, block.border_color,
+                       offset, len(data), text.count("\n") + 1]
+                if block.attachment is not None:
+                    row.append(block.attachment.path)
+                rows.append(row)
+                offset += len(data)
+            base = {"generation": generation, "next_id": next_id, "bodies": bodies_name, "blocks": rows,
+                    "tokens": tokens}
+            try:
+                # Bodies first: the old snapshot stays valid until the new one replaces it
+                atomic_write(bodies_path, b"".join(chunks))
+                atomic_write(self.path, json.dumps(base).encode("utf-8"))
+            except OSError as e:
+                print(f"Error compacting workspace: {e}")
+                return
+
+            old_bodies = os.path.join(os.path.dirname(bodies_path),
+                                      f"{os.path.basename(self.path)}.bodies.{self._generation}")
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+            self._generation = generation
+            self._journal_stale = True
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            try:
+                os.remove(old_bodies)
+            except OSError:
+                pass
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait()
+            if self._closed:
+                break
+            # Let a burst of keystrokes settle into one write
+            time.sleep(self.interval)
+            self._wake.clear()
+            with self._save_lock:
+                if self._closed:
+                    break  # close() does the final save once it has the lock
+                try:
+                    self._save()
+                except Exception as e:
+                    print(f"Error autosaving workspace: {e}")
+
+    def close(self):
+        """Final save, then lets go of the workspace (when the session ends, or on exit)"""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        # Waits out a save or compaction the thread is still in; after that it won't start another
+        with self._save_lock:
+            self._save()
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+        atexit.unregister(self.close)
+        self._held.close()